@@ -26,19 +26,106 @@ class Settings:
     AWS_SECRET_KEY: str = config('AWS_SECRET_KEY', default='')
     AWS_REGION: str = config('AWS_REGION', default='us-east-1')
     S3_BUCKET: str = config('S3_BUCKET', default='cetec-documents')
+    # Ingestion downloads: objects up to the threshold stay in memory, larger ones stream to disk
+    S3_SPOOL_MAX_MEMORY_BYTES: int = config('S3_SPOOL_MAX_MEMORY_BYTES', default=8 * 1024 * 1024, cast=int)
+    S3_DOWNLOAD_CHUNK_BYTES: int = config('S3_DOWNLOAD_CHUNK_BYTES', default=1024 * 1024, cast=int)
+    S3_SPOOL_DIR: str = config('S3_SPOOL_DIR', default='')  # '' = system temp dir
+    S3_WEBHOOK_TOKEN: str = config('S3_WEBHOOK_TOKEN', default='')  # shared secret (?token= or X-Webhook-Token); empty: no check
+    S3_WEBHOOK_DEBOUNCE_SECONDS: float = config('S3_WEBHOOK_DEBOUNCE_SECONDS', default=30, cast=float)  # quiet time before a subject's batch is ingested
+    S3_WEBHOOK_MAX_WAIT_SECONDS: float = config('S3_WEBHOOK_MAX_WAIT_SECONDS', default=300, cast=float)  # upper bound while uploads keep arriving
+    S3_WEBHOOK_EVENT_TTL_SECONDS: float = config('S3_WEBHOOK_EVENT_TTL_SECONDS', default=86400, cast=float)  # dedupe window for retried notifications
     
     # A2A Configuration
     A2A_DEFAULT_SERVER_URL: str = config('A2A_DEFAULT_SERVER_URL', default='http://localhost:8001')
     
     # Vector Store
     VECTOR_STORE_URL: str = config('VECTOR_STORE_URL', default='http://localhost:6333')
+    VECTOR_STORE_BACKEND: str = config('VECTOR_STORE_BACKEND', default='qdrant')  # qdrant | numpy
+    NUMPY_STORE_DIR: str = config('NUMPY_STORE_DIR', default='var/vectors')
+    NUMPY_STORE_DTYPE: str = config('NUMPY_STORE_DTYPE', default='float32')  # float32 | float16
     # RAG
     QDRANT_URL: str = config('QDRANT_URL', default='http://localhost:6333')
     QDRANT_API_KEY: str = config('QDRANT_API_KEY', default='')
     QDRANT_COLLECTION_NAME: str = config('QDRANT_COLLECTION_NAME', default='documents')
+    # Shared client (one per endpoint, closed on shutdown)
+    QDRANT_PREFER_GRPC: bool = config('QDRANT_PREFER_GRPC', default=False, cast=bool)
+    QDRANT_GRPC_PORT: int = config('QDRANT_GRPC_PORT', default=6334, cast=int)
+    QDRANT_TIMEOUT_SECONDS: int = config('QDRANT_TIMEOUT_SECONDS', default=10, cast=int)
+    QDRANT_POOL_SIZE: int = config('QDRANT_POOL_SIZE', default=32, cast=int)
+    QDRANT_KEEPALIVE_SECONDS: float = config('QDRANT_KEEPALIVE_SECONDS', default=30, cast=float)
+    # Collection layout (applied on create and reconciled on existing collections)
+    QDRANT_ON_DISK: bool = config('QDRANT_ON_DISK', default=False, cast=bool)  # original vectors on disk (mmap)
+    QDRANT_HNSW_M: int = config('QDRANT_HNSW_M', default=16, cast=int)
+    QDRANT_HNSW_EF_CONSTRUCT: int = config('QDRANT_HNSW_EF_CONSTRUCT', default=100, cast=int)
+    QDRANT_HNSW_ON_DISK: bool = config('QDRANT_HNSW_ON_DISK', default=False, cast=bool)
+    QDRANT_QUANTIZATION: str = config('QDRANT_QUANTIZATION', default='none')  # none | scalar | binary
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = config('QDRANT_QUANTIZATION_ALWAYS_RAM', default=True, cast=bool)
+    # Default search params (overridable per call)
+    QDRANT_SEARCH_HNSW_EF: int = config('QDRANT_SEARCH_HNSW_EF', default=0, cast=int)  # 0 = server default
+    QDRANT_SEARCH_RESCORE: bool = config('QDRANT_SEARCH_RESCORE', default=True, cast=bool)
+    QDRANT_SEARCH_OVERSAMPLING: float = config('QDRANT_SEARCH_OVERSAMPLING', default=2.0, cast=float)
+    # Lexical retrieval: BM25-style sparse vectors next to the dense ones. Only collections
+    # created with it on get the sparse vector; older ones are written and searched dense-only
+    QDRANT_SPARSE_ENABLED: bool = config('QDRANT_SPARSE_ENABLED', default=True, cast=bool)
+    QDRANT_SEARCH_MODE: str = config('QDRANT_SEARCH_MODE', default='dense')  # dense | sparse | hybrid | auto
+    QDRANT_HYBRID_PREFETCH_FACTOR: int = config('QDRANT_HYBRID_PREFETCH_FACTOR', default=4, cast=int)
+    # Retrieval result cache
+    SEARCH_CACHE_ENABLED: bool = config('SEARCH_CACHE_ENABLED', default=True, cast=bool)
+    SEARCH_CACHE_MAX_ENTRIES: int = config('SEARCH_CACHE_MAX_ENTRIES', default=2048, cast=int)
+    SEARCH_CACHE_TTL_SECONDS: float = config('SEARCH_CACHE_TTL_SECONDS', default=300, cast=float)
+    SEARCH_CACHE_SHARED: bool = config('SEARCH_CACHE_SHARED', default=True, cast=bool)  # invalidations via Mongo, seen by every process
+    # Keep chunk text in Mongo (compressed) instead of the Qdrant payload
+    CHUNK_TEXT_STORE_ENABLED: bool = config('CHUNK_TEXT_STORE_ENABLED', default=False, cast=bool)
+
+    # Embeddings
+    EMBEDDING_MODEL_NAME: str = config('EMBEDDING_MODEL_NAME', default='sentence-transformers/all-MiniLM-L6-v2')
+    EMBEDDING_BACKEND: str = config('EMBEDDING_BACKEND', default='torch')  # torch | onnx
+    EMBEDDING_ONNX_DIR: str = config('EMBEDDING_ONNX_DIR', default='models/onnx')
+    EMBEDDING_ONNX_QUANTIZE: bool = config('EMBEDDING_ONNX_QUANTIZE', default=True, cast=bool)
+    EMBEDDING_ONNX_THREADS: int = config('EMBEDDING_ONNX_THREADS', default=0, cast=int)
+    EMBEDDING_MAX_BATCH_SIZE: int = config('EMBEDDING_MAX_BATCH_SIZE', default=64, cast=int)
+    EMBEDDING_TOKEN_BUDGET: int = config('EMBEDDING_TOKEN_BUDGET', default=8192, cast=int)  # padded tokens per forward pass
+    EMBEDDING_PRELOAD: bool = config('EMBEDDING_PRELOAD', default=True, cast=bool)
+    EMBEDDING_EXECUTOR_MAX_BATCH: int = config('EMBEDDING_EXECUTOR_MAX_BATCH', default=32, cast=int)
+    EMBEDDING_EXECUTOR_MAX_WAIT_MS: float = config('EMBEDDING_EXECUTOR_MAX_WAIT_MS', default=5.0, cast=float)
+    EMBEDDING_EXECUTOR_MAX_QUEUE: int = config('EMBEDDING_EXECUTOR_MAX_QUEUE', default=256, cast=int)
+    EMBEDDING_EXECUTOR_BULK_SLICE: int = config('EMBEDDING_EXECUTOR_BULK_SLICE', default=256, cast=int)
+    EMBEDDING_CACHE_ENABLED: bool = config('EMBEDDING_CACHE_ENABLED', default=True, cast=bool)
+    EMBEDDING_CACHE_TTL_DAYS: int = config('EMBEDDING_CACHE_TTL_DAYS', default=30, cast=int)
+    EMBEDDING_CACHE_MAX_ENTRIES: int = config('EMBEDDING_CACHE_MAX_ENTRIES', default=500000, cast=int)  # LRU cap (~1.5 KB each); 0 = TTL only
     
 
 
+    # Ingestion job queue
+    INGESTION_WORKERS: int = config('INGESTION_WORKERS', default=2, cast=int)  # worker coroutines per process
+    INGESTION_WORKERS_IN_API: bool = config('INGESTION_WORKERS_IN_API', default=True, cast=bool)  # false: run `python -m app.worker`
+    INGESTION_LEASE_SECONDS: float = config('INGESTION_LEASE_SECONDS', default=60, cast=float)
+    INGESTION_MAX_ATTEMPTS: int = config('INGESTION_MAX_ATTEMPTS', default=3, cast=int)
+    INGESTION_RETRY_BACKOFF_SECONDS: float = config('INGESTION_RETRY_BACKOFF_SECONDS', default=30, cast=float)
+    INGESTION_POLL_SECONDS: float = config('INGESTION_POLL_SECONDS', default=2, cast=float)
+    INGESTION_EVENTS_MIN_INTERVAL_SECONDS: float = config('INGESTION_EVENTS_MIN_INTERVAL_SECONDS', default=0.5, cast=float)  # progress publish throttle
+    INGESTION_EVENTS_POLL_SECONDS: float = config('INGESTION_EVENTS_POLL_SECONDS', default=2, cast=float)  # jobs running in another process
+    INGESTION_EVENTS_KEEPALIVE_SECONDS: float = config('INGESTION_EVENTS_KEEPALIVE_SECONDS', default=15, cast=float)
+    INGESTION_REAP_SECONDS: float = config('INGESTION_REAP_SECONDS', default=30, cast=float)  # stale-lease scan interval
+    INGESTION_CANCEL_POLL_SECONDS: float = config('INGESTION_CANCEL_POLL_SECONDS', default=1, cast=float)  # cross-replica cancel check
+    # Per-job pipeline: workers per stage and bounded queue between stages
+    INGESTION_FETCH_CONCURRENCY: int = config('INGESTION_FETCH_CONCURRENCY', default=4, cast=int)
+    INGESTION_PARSE_CONCURRENCY: int = config('INGESTION_PARSE_CONCURRENCY', default=2, cast=int)
+    INGESTION_CHUNK_CONCURRENCY: int = config('INGESTION_CHUNK_CONCURRENCY', default=1, cast=int)
+    INGESTION_EMBED_CONCURRENCY: int = config('INGESTION_EMBED_CONCURRENCY', default=2, cast=int)
+    INGESTION_UPSERT_CONCURRENCY: int = config('INGESTION_UPSERT_CONCURRENCY', default=2, cast=int)
+    INGESTION_STAGE_QUEUE_SIZE: int = config('INGESTION_STAGE_QUEUE_SIZE', default=4, cast=int)
+    INGESTION_DEDUP_ENABLED: bool = config('INGESTION_DEDUP_ENABLED', default=True, cast=bool)  # copy vectors of identical PDFs
+    # PDF text extraction: page ranges in a process pool
+    PDF_EXTRACT_WORKERS: int = config('PDF_EXTRACT_WORKERS', default=0, cast=int)  # 0 = CPU count, 1 = no pool
+    PDF_EXTRACT_TASKS_PER_WORKER: int = config('PDF_EXTRACT_TASKS_PER_WORKER', default=2, cast=int)
+    PDF_EXTRACT_MAX_PAGES_PER_TASK: int = config('PDF_EXTRACT_MAX_PAGES_PER_TASK', default=32, cast=int)
+    PDF_EXTRACT_MIN_PARALLEL_PAGES: int = config('PDF_EXTRACT_MIN_PARALLEL_PAGES', default=16, cast=int)
+
+    # Readiness probes (/readyz)
+    READINESS_CACHE_SECONDS: float = config('READINESS_CACHE_SECONDS', default=5, cast=float)
+    READINESS_PROBE_TIMEOUT_SECONDS: float = config('READINESS_PROBE_TIMEOUT_SECONDS', default=2, cast=float)
+
     # Application
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Student Chat + Ingestion API"
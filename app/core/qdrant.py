@@ -0,0 +1,63 @@
+from typing import Dict, Optional, Tuple
+import httpx
+from qdrant_client import AsyncQdrantClient
+from app.core.config import settings
+
+
+class QdrantClientPool:
+    """
+    One AsyncQdrantClient per Qdrant endpoint (url + api key), shared by every QdrantStore.
+
+    REST clients keep up to QDRANT_POOL_SIZE keep-alive connections open for
+    QDRANT_KEEPALIVE_SECONDS; with QDRANT_PREFER_GRPC the client talks gRPC
+    (port QDRANT_GRPC_PORT) over one long-lived HTTP/2 channel with keepalive pings.
+    Clients are created on first use and closed by the application lifespan.
+    """
+
+    def __init__(self):
+        self.clients: Dict[Tuple[str, str, bool], AsyncQdrantClient] = {}
+
+    def get(self, url: str, api_key: Optional[str] = None, prefer_grpc: Optional[bool] = None) -> AsyncQdrantClient:
+        prefer_grpc = settings.QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+        key = (url, api_key or "", prefer_grpc)
+        client = self.clients.get(key)
+        if client is None:
+            client = AsyncQdrantClient(
+                url=url,
+                api_key=api_key or None,
+                prefer_grpc=prefer_grpc,
+                grpc_port=settings.QDRANT_GRPC_PORT,
+                timeout=settings.QDRANT_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.QDRANT_POOL_SIZE,
+                    max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+                    keepalive_expiry=settings.QDRANT_KEEPALIVE_SECONDS,
+                ),
+                grpc_options={
+                    "grpc.keepalive_time_ms": int(settings.QDRANT_KEEPALIVE_SECONDS * 1000),
+                    "grpc.keepalive_permit_without_calls": 1,
+                },
+            )
+            self.clients[key] = client
+        return client
+
+    async def close(self):
+        clients, self.clients = list(self.clients.values()), {}
+        for client in clients:
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+
+qdrant_pool = QdrantClientPool()
+
+
+def get_qdrant_client(url: str, api_key: Optional[str] = None, prefer_grpc: Optional[bool] = None) -> AsyncQdrantClient:
+    """Shared client for this endpoint (created on first use)."""
+    return qdrant_pool.get(url, api_key, prefer_grpc)
+
+
+async def close_qdrant_clients():
+    """Close every pooled client (application shutdown)."""
+    await qdrant_pool.close()
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import boto3
+from app.core.config import settings
+from app.core.database import db
+from app.core.qdrant import get_qdrant_client
+from app.utils.embedding_executor import get_embedding_executor
+from app.utils.logger import Logger
+
+
+class Readiness:
+    """
+    Dependency probes behind /readyz.
+
+    - Each registered check is an async callable that raises when the dependency is unusable.
+    - `refresh()` runs every check concurrently, each bounded by `timeout_seconds`, and
+      records status plus latency; results are served from cache for `ttl_seconds`
+      so load-balancer polling does not hammer Mongo/Qdrant/S3.
+    - Concurrent callers during a refresh wait for it instead of starting another.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0, timeout_seconds: float = 2.0):
+        self.logger = Logger()
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.checks: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.checked_at: Optional[datetime] = None
+        self._checked_monotonic = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def register(self, name: str, check: Callable[[], Awaitable[Any]]):
+        self.checks[name] = check
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.results) and all(r["status"] == "ok" for r in self.results.values())
+
+    async def _probe(self, check: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), self.timeout_seconds)
+            result: Dict[str, Any] = {"status": "ok"}
+        except asyncio.TimeoutError:
+            result = {"status": "error", "error": f"timed out after {self.timeout_seconds}s"}
+        except Exception as e:
+            result = {"status": "error", "error": f"{e.__class__.__name__}: {e}"}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    async def refresh(self) -> Dict[str, Dict[str, Any]]:
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._probe(self.checks[n]) for n in names))
+        self.results = dict(zip(names, results))
+        self.checked_at = datetime.utcnow()
+        self._checked_monotonic = time.monotonic()
+        failing = [n for n, r in self.results.items() if r["status"] != "ok"]
+        if failing:
+            self.logger.warning(f"Readiness: not ready ({', '.join(failing)})")
+        return self.results
+
+    async def status(self) -> Dict[str, Any]:
+        """Cached report: {"status": "ready"|"not_ready", "checked_at", "cached", "checks"}."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        cached = True
+        async with self._lock:
+            if not self.results or time.monotonic() - self._checked_monotonic > self.ttl_seconds:
+                await self.refresh()
+                cached = False
+        return {
+            "status": "ready" if self.ready else "not_ready",
+            "checked_at": self.checked_at.isoformat() + "Z",
+            "cached": cached,
+            "checks": self.results,
+        }
+
+
+async def check_mongo():
+    if db.client is None:
+        raise RuntimeError("not connected")
+    await db.client.admin.command("ping")
+
+
+async def check_qdrant():
+    await get_qdrant_client(settings.QDRANT_URL, settings.QDRANT_API_KEY).get_collections()
+
+
+_s3_client = None
+
+
+async def check_s3():
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client(
+            's3',
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_KEY,
+            region_name=settings.AWS_REGION
+        )
+    await asyncio.to_thread(_s3_client.head_bucket, Bucket=settings.S3_BUCKET)
+
+
+async def check_embedder():
+    if not get_embedding_executor().warmed_up:
+        raise RuntimeError("embedding model not loaded/warmed up")
+
+
+readiness = Readiness(
+    ttl_seconds=settings.READINESS_CACHE_SECONDS,
+    timeout_seconds=settings.READINESS_PROBE_TIMEOUT_SECONDS,
+)
+readiness.register("mongo", check_mongo)
+if settings.VECTOR_STORE_BACKEND.lower() == "qdrant":
+    readiness.register("qdrant", check_qdrant)
+readiness.register("s3", check_s3)
+if settings.EMBEDDING_PRELOAD:
+    # Without preload the model loads lazily on first use, so it cannot gate readiness
+    readiness.register("embedder", check_embedder)
@@ -1,9 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
 from app.core.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.database import connect_to_mongo, close_mongo_connection, db
+from app.core.qdrant import close_qdrant_clients
+from app.core.readiness import readiness
+from app.services.ingestion_worker import IngestionWorkerPool
+from app.utils.embeddings import get_embedder
+from app.utils.embedding_executor import get_embedding_executor
+from app.utils.pdf_handler import shutdown_pdf_pools
+from app.utils.search_cache import search_cache
 from app.routers import (
     meta, auth, subjects, documents, ingestion, 
     chat, a2a, webhooks
@@ -14,8 +22,29 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     await connect_to_mongo()
+    if settings.SEARCH_CACHE_SHARED:
+        search_cache.share_generations(db.database["search_generations"])
+    if settings.EMBEDDING_PRELOAD:
+        # Load the shared embedding model once, off the event loop
+        await asyncio.to_thread(get_embedder)
+    await get_embedding_executor().start()
+    if settings.EMBEDDING_PRELOAD:
+        # Throwaway batches so the first real query does not pay kernel/allocator start-up
+        await get_embedding_executor().warm_up()
+    # Probe Mongo/Qdrant/S3 (concurrently) so /readyz is accurate from the first poll
+    await readiness.refresh()
+    workers = None
+    if settings.INGESTION_WORKERS_IN_API and settings.INGESTION_WORKERS > 0:
+        workers = IngestionWorkerPool(db.database)
+        await workers.start()
     yield
     # Shutdown
+    if workers is not None:
+        # Running jobs are released back to the queue for another worker/replica
+        await workers.close()
+    await get_embedding_executor().close()
+    await close_qdrant_clients()
+    shutdown_pdf_pools()
     await close_mongo_connection()
 
 def create_application() -> FastAPI:
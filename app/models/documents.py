@@ -17,6 +17,7 @@ class Document(BaseModel):
     size: int
     status: DocumentStatus
     created_at: datetime
+    sha256: Optional[str] = None  # content hash, once known (upload or first ingestion)
 
 class UploadFile(BaseModel):
     filename: str
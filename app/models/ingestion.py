@@ -10,8 +10,8 @@ class IngestionMode(str, Enum):
     REINGEST = "reingest"  # Re-process already ingested documents
 
 class IngestionOptions(BaseModel):
-    chunk_size: int = 1000
-    chunk_overlap: int = 150
+    chunk_size: int = 256  # tokens (capped at the embedder's 510-token window)
+    chunk_overlap: int = 40  # tokens carried over from the previous chunk, in whole sentences
     embed_model: str = "text-embedding-3-large"
     append: bool = True
 
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from typing import List
 from app.core.auth import get_current_user, get_current_teacher_or_admin
 from app.models.auth import User
@@ -42,15 +43,49 @@ async def get_ingestion_job(
         raise HTTPException(status_code=404, detail="Ingestion job not found")
     return job
 
+@router.get("/ingestions/{job_id}/events", tags=["Ingestion"])
+async def ingestion_job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """Stream job progress as server-sent events (`progress` updates, then one `end`)"""
+    ingestion_service = IngestionService(db)
+    initial = await ingestion_service.get_job_event(job_id)
+    if initial is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return StreamingResponse(
+        ingestion_service.stream_job_events(job_id, initial),
+        media_type="text/event-stream",
+        # No proxy buffering or caching: events must reach the browser as they happen
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/ingestions/{job_id}/cancel", status_code=status.HTTP_202_ACCEPTED, tags=["Ingestion"])
 async def cancel_ingestion(
     job_id: str,
+    rollback: bool = False,
     current_user: User = Depends(get_current_teacher_or_admin),
     db=Depends(get_database)
 ):
-    """Cancel ingestion job (best effort)"""
+    """
+    Cancel ingestion job. `rollback=true` deletes the vectors it wrote and restores document
+    statuses; documents whose re-ingestion already finished are kept (job field `rollback_kept`)
+    """
     ingestion_service = IngestionService(db)
-    success = await ingestion_service.cancel_ingestion(job_id, current_user)
+    success = await ingestion_service.cancel_ingestion(job_id, current_user, rollback=rollback)
     if not success:
         raise HTTPException(status_code=404, detail="Ingestion job not found")
     return {"message": "Cancel requested"}
+
+@router.post("/ingestions/{job_id}/resume", status_code=status.HTTP_202_ACCEPTED, tags=["Ingestion"])
+async def resume_ingestion(
+    job_id: str,
+    current_user: User = Depends(get_current_teacher_or_admin),
+    db=Depends(get_database)
+):
+    """Requeue a failed or canceled job; it skips the documents it already finished"""
+    ingestion_service = IngestionService(db)
+    if not await ingestion_service.resume_ingestion(job_id, current_user):
+        raise HTTPException(status_code=404, detail="Ingestion job not found or not resumable")
+    return {"message": "Resume requested"}
@@ -1,4 +1,7 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.readiness import readiness
+from app.utils.search_cache import search_cache
 
 router = APIRouter()
 
@@ -9,5 +12,11 @@ async def health_check():
 
 @router.get("/readyz", tags=["Meta"])
 async def readiness_check():
-    """Readiness probe"""
-    return {"status": "ready"}
+    """Readiness probe: 200 only when every dependency check passes (results cached briefly)"""
+    report = await readiness.status()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
+
+@router.get("/stats", tags=["Meta"])
+async def runtime_stats():
+    """In-process cache counters"""
+    return {"search_cache": search_cache.stats()}
@@ -1,17 +1,32 @@
-from fastapi import APIRouter, Request, status
-from typing import Dict, Any
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.core.database import get_database
+from app.services.webhook_service import S3WebhookService
 
 router = APIRouter()
 
 @router.post("/webhooks/s3", status_code=status.HTTP_204_NO_CONTENT, tags=["Webhooks"])
-async def handle_s3_webhook(request: Request):
-    """Receive S3 object-created notifications (optional)"""
-    # Parse S3 notification payload
-    payload = await request.json()
+async def handle_s3_webhook(
+    request: Request,
+    token: Optional[str] = None,
+    x_webhook_token: Optional[str] = Header(None),
+    db=Depends(get_database)
+):
+    """Receive S3 object-created notifications (direct or via SNS) and queue batched ingestions"""
+    if settings.S3_WEBHOOK_TOKEN:
+        supplied = x_webhook_token or token or ""
+        if not hmac.compare_digest(supplied, settings.S3_WEBHOOK_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid webhook token")
     
-    # Process S3 event (e.g., trigger ingestion)
-    # Implementation would depend on your S3 event structure
+    # Parse S3 notification payload (SNS posts JSON as text/plain)
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
     
+    await S3WebhookService(db).handle_notification(payload)
     return None
 
 @router.post("/webhooks/a2a/{server_id}/callback", status_code=status.HTTP_204_NO_CONTENT, tags=["Webhooks"])
@@ -1,3 +1,4 @@
+import base64
 from typing import List, Optional
 from uuid import uuid4
 from datetime import datetime
@@ -10,7 +11,9 @@ from app.models.documents import (
     Document, DocumentsResponse, UploadRequest, UploadPresignResponse,
     UploadCompleteRequest, DocumentStatus, UploadInfo
 )
-from app.utils.qdrant_client import QdrantStore
+from app.utils.vector_store import create_vector_store, subject_collection_resolver
+from app.utils.chunk_store import ChunkTextStore
+from app.utils.s3_stream import HashingReader
 from app.utils.logger import Logger
 from app.core.config import settings
 
@@ -27,11 +30,10 @@ class DocumentService:
             config=Config(signature_version='s3v4')
         )
         
-        # Initialize Qdrant store for vector cleanup
-        self.qdrant_store = QdrantStore(
-            url=settings.QDRANT_URL,
-            api_key=settings.QDRANT_API_KEY,
-            collection_name=settings.QDRANT_COLLECTION_NAME or "academia_docs"
+        # Initialize vector store for vector cleanup
+        self.qdrant_store = create_vector_store(
+            chunk_store=ChunkTextStore(db["chunk_texts"]) if settings.CHUNK_TEXT_STORE_ENABLED else None,
+            collection_resolver=subject_collection_resolver(db)
         )
 
     async def get_documents(
@@ -64,7 +66,8 @@ class DocumentService:
                 mime=doc["mime"],
                 size=doc["size"],
                 status=DocumentStatus(doc["status"]),
-                created_at=doc["created_at"]
+                created_at=doc["created_at"],
+                sha256=doc.get("sha256")
             )
             documents.append(document)
         
@@ -140,8 +143,31 @@ class DocumentService:
             {"$set": {"status": DocumentStatus.UPLOADED.value}}
         )
         
+        # Record content hashes S3 already computed (the ingestion download hashes the rest)
+        cursor = self.collection.find(
+            {"_id": {"$in": complete_request.doc_ids}, "subject_slug": subject_slug, "sha256": None},
+            {"s3_key": 1}
+        )
+        async for doc in cursor:
+            sha256 = self._s3_sha256(doc["s3_key"])
+            if sha256:
+                await self.collection.update_one({"_id": doc["_id"]}, {"$set": {"sha256": sha256}})
+        
         return complete_request.doc_ids
 
+    def _s3_sha256(self, s3_key: str) -> Optional[str]:
+        """Hex SHA-256 of an S3 object from its stored checksum, if it has a full-object one"""
+        try:
+            head = self.s3_client.head_object(Bucket=settings.S3_BUCKET, Key=s3_key, ChecksumMode="ENABLED")
+        except Exception as e:
+            self.logger.warning(f"Could not read checksum of {s3_key}: {str(e)}")
+            return None
+        checksum = head.get("ChecksumSHA256")
+        # Multipart uploads report a checksum of part checksums ("...-N"), not of the content
+        if not checksum or "-" in checksum:
+            return None
+        return base64.b64decode(checksum).hex()
+
     async def get_document(
         self,
         subject_slug: str,
@@ -165,7 +191,8 @@ class DocumentService:
             mime=doc["mime"],
             size=doc["size"],
             status=DocumentStatus(doc["status"]),
-            created_at=doc["created_at"]
+            created_at=doc["created_at"],
+            sha256=doc.get("sha256")
         )
 
     async def delete_document(
@@ -186,8 +213,9 @@ class DocumentService:
         
         # Delete from vector store first (most important for RAG consistency)
         try:
-            self.logger.info(f"Deleting vectors for document {doc_id} from Qdrant")
-            deleted_count = await self.qdrant_store.delete_by_doc(doc_id)
+            vector_store = await self.qdrant_store.for_subject(subject_slug)
+            self.logger.info(f"Deleting vectors for document {doc_id} from '{vector_store.collection_name}'")
+            deleted_count = await vector_store.delete_by_doc(doc_id)
             self.logger.info(f"Deleted {deleted_count} vector chunks for document {doc_id}")
         except Exception as e:
             self.logger.error(f"Failed to delete vectors for document {doc_id}: {str(e)}")
@@ -234,20 +262,8 @@ class DocumentService:
         doc_id = str(uuid4())
         s3_key = f"docentes/{subject_slug}/{doc_id}_{file.filename}"
         
-        # Upload file to S3
-        try:
-            self.s3_client.upload_fileobj(
-                file.file,
-                settings.S3_BUCKET,
-                s3_key,
-                ExtraArgs={
-                    'ContentType': file.content_type or 'application/octet-stream'
-                }
-            )
-        except Exception as e:
-            raise Exception(f"Failed to upload file to S3: {str(e)}")
-        
-        # Create document record in database
+        # Create document record in database before the object exists, so the S3
+        # notification for it (see S3WebhookService) finds this record instead of creating one
         doc_record = {
             "_id": doc_id,
             "subject_slug": subject_slug,
@@ -255,6 +271,7 @@ class DocumentService:
             "s3_key": s3_key,
             "mime": file.content_type or 'application/octet-stream',
             "size": file.size or 0,
+            "sha256": None,
             "status": DocumentStatus.UPLOADED.value,
             "created_at": datetime.utcnow(),
             "created_by": user.id
@@ -263,13 +280,31 @@ class DocumentService:
         try:
             await self.collection.insert_one(doc_record)
         except Exception as e:
-            # If database insert fails, try to cleanup S3 object
-            try:
-                self.s3_client.delete_object(Bucket=settings.S3_BUCKET, Key=s3_key)
-            except:
-                pass
             raise Exception(f"Failed to save document metadata: {str(e)}")
         
+        # Upload file to S3, hashing it on the way (ingestion copies vectors of identical files)
+        reader = HashingReader(file.file)
+        try:
+            self.s3_client.upload_fileobj(
+                reader,
+                settings.S3_BUCKET,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': file.content_type or 'application/octet-stream'
+                }
+            )
+        except Exception as e:
+            # No object was stored: drop the record
+            await self.collection.delete_one({"_id": doc_id})
+            raise Exception(f"Failed to upload file to S3: {str(e)}")
+        
+        doc_record["size"] = file.size or reader.size
+        doc_record["sha256"] = reader.hexdigest()
+        await self.collection.update_one(
+            {"_id": doc_id},
+            {"$set": {"size": doc_record["size"], "sha256": doc_record["sha256"]}}
+        )
+        
         # Return the created document
         return Document(
             id=doc_id,
@@ -277,7 +312,8 @@ class DocumentService:
             filename=file.filename,
             s3_key=s3_key,
             mime=file.content_type or 'application/octet-stream',
-            size=file.size or 0,
+            size=doc_record["size"],
             status=DocumentStatus.UPLOADED,
-            created_at=doc_record["created_at"]
+            created_at=doc_record["created_at"],
+            sha256=doc_record["sha256"]
         )
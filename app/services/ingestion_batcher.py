@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from app.core.config import settings
+from app.models.auth import User, UserRole
+from app.models.ingestion import IngestionMode, IngestionRequest
+from app.utils.logger import Logger
+
+# Owner of the jobs started from S3 notifications
+WEBHOOK_USER = User(id="s3-webhook", email="s3-webhook@example.com", roles=[UserRole.ADMIN])
+
+
+class IngestionBatcher:
+    """
+    Coalesces documents arriving for a subject (S3 upload notifications) into one
+    ingestion job per debounce window, kept in the `pending_ingestions` collection
+    so every replica feeds the same batch.
+
+    - add: merges doc_ids into the subject's pending batch; each add pushes the flush
+      back by `debounce_seconds`, but never past `max_wait_seconds` after the first one.
+    - flush_due: atomically takes every due batch (find_one_and_delete), so exactly one
+      worker pool turns it into a SELECTED ingestion job.
+    """
+
+    def __init__(self, db, *, debounce_seconds: Optional[float] = None, max_wait_seconds: Optional[float] = None):
+        self.logger = Logger()
+        self.db = db
+        self.collection = db["pending_ingestions"]
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else settings.S3_WEBHOOK_DEBOUNCE_SECONDS
+        self.max_wait_seconds = max_wait_seconds if max_wait_seconds is not None else settings.S3_WEBHOOK_MAX_WAIT_SECONDS
+
+    async def add(self, subject_slug: str, doc_ids: Iterable[str], now: Optional[datetime] = None):
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return
+        now = now or datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": subject_slug},
+            {
+                "$addToSet": {"doc_ids": {"$each": doc_ids}},
+                "$set": {"last_event_at": now},
+                "$setOnInsert": {"first_event_at": now},
+            },
+            upsert=True,
+        )
+        self.logger.debug(f"Queued {len(doc_ids)} document(s) for the next '{subject_slug}' ingestion batch")
+
+    async def flush_due(self, now: Optional[datetime] = None) -> List[str]:
+        """Start one ingestion job per due batch; returns the job IDs."""
+        now = now or datetime.utcnow()
+        due = {"$or": [
+            {"last_event_at": {"$lte": now - timedelta(seconds=self.debounce_seconds)}},
+            {"first_event_at": {"$lte": now - timedelta(seconds=self.max_wait_seconds)}},
+        ]}
+        job_ids = []
+        while True:
+            batch = await self.collection.find_one_and_delete(due)
+            if batch is None:
+                return job_ids
+            job_id = await self._start_job(batch)
+            if job_id:
+                job_ids.append(job_id)
+
+    async def _start_job(self, batch: dict) -> Optional[str]:
+        # Imported here: the service pulls in S3/PDF/vector-store dependencies
+        from app.services.ingestion_service import IngestionService
+
+        subject_slug, doc_ids = batch["_id"], sorted(batch["doc_ids"])
+        request = IngestionRequest(mode=IngestionMode.SELECTED, doc_ids=doc_ids)
+        try:
+            job = await IngestionService(self.db).start_ingestion(subject_slug, request, WEBHOOK_USER)
+        except Exception as e:
+            # Put the documents back so the next flush retries them
+            self.logger.error(f"Could not start batched ingestion for '{subject_slug}': {e}")
+            await self.add(subject_slug, doc_ids)
+            return None
+        self.logger.info(f"Started batched ingestion {job.job_id} for '{subject_slug}' ({len(doc_ids)} documents)")
+        return job.job_id
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from app.core.config import settings
+from app.models.ingestion import IngestionStatus
+
+
+class IngestionCanceled(Exception):
+    """Raised inside a running job once it has been canceled (locally or from another replica)."""
+
+
+class CancellationToken:
+    """
+    Cancellation state of one running job.
+
+    `cancel()` (same process) interrupts the job task at its current await, so S3 reads,
+    PDF extraction and embedding batches are abandoned at once. `checkpoint()` runs
+    between pipeline stages and polls the job record, at most every `poll_seconds`,
+    to pick up cancels issued on another replica. `is_canceled` is safe to read from
+    threads (e.g. a streaming S3 download checks it between chunks).
+    """
+
+    def __init__(self, job_id: str, collection=None, task: Optional[asyncio.Task] = None, poll_seconds: Optional[float] = None):
+        self.job_id = job_id
+        self.collection = collection
+        self.task = task
+        self.poll_seconds = settings.INGESTION_CANCEL_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.rollback = False
+        self._canceled = threading.Event()
+        self._last_poll = 0.0
+
+    def is_canceled(self) -> bool:
+        return self._canceled.is_set()
+
+    def mark(self, rollback: bool = False):
+        """Record the cancel without interrupting the task (it stops at its next checkpoint)."""
+        self.rollback = self.rollback or rollback
+        self._canceled.set()
+
+    def cancel(self, rollback: bool = False):
+        """Record the cancel and interrupt the job task right away."""
+        self.mark(rollback)
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def checkpoint(self):
+        """Raise IngestionCanceled if the job was canceled here or in the job record."""
+        if not self.is_canceled() and self.collection is not None:
+            now = time.monotonic()
+            if now - self._last_poll >= self.poll_seconds:
+                self._last_poll = now
+                doc = await self.collection.find_one({"_id": self.job_id}, {"status": 1, "cancel_rollback": 1})
+                if doc and doc.get("status") == IngestionStatus.CANCELED.value:
+                    self.mark(bool(doc.get("cancel_rollback")))
+        if self.is_canceled():
+            raise IngestionCanceled(f"Ingestion job {self.job_id} was canceled")
+
+
+# Tokens of the jobs running in this process
+_TOKENS: Dict[str, CancellationToken] = {}
+
+
+def register_job(job_id: str, collection, task: asyncio.Task) -> CancellationToken:
+    token = CancellationToken(job_id, collection, task)
+    _TOKENS[job_id] = token
+    return token
+
+
+def unregister_job(job_id: str):
+    _TOKENS.pop(job_id, None)
+
+
+def token_for(job_id: str, collection=None) -> CancellationToken:
+    """The running job's token, or a standalone one (polling `collection`) when the job runs outside a pool."""
+    return _TOKENS.get(job_id) or CancellationToken(job_id, collection)
+
+
+def cancel_local_job(job_id: str, rollback: bool = False) -> bool:
+    """Interrupt `job_id` if it runs in this process; returns whether it did."""
+    token = _TOKENS.get(job_id)
+    if token is None:
+        return False
+    token.cancel(rollback)
+    return True
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+from app.core.config import settings
+from app.models.ingestion import IngestionStatus
+from app.utils.logger import Logger
+
+TERMINAL_STATUSES = {IngestionStatus.COMPLETED.value, IngestionStatus.FAILED.value, IngestionStatus.CANCELED.value}
+
+# Reads a job's current event from Mongo (None if the job does not exist)
+EventLoader = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class IngestionEventHub:
+    """
+    In-process pub/sub of ingestion progress, fanned out to SSE watchers.
+
+    - Jobs running in this process publish straight from the pipeline (no database reads).
+    - Jobs running elsewhere (another replica, `python -m app.worker`) are polled from Mongo
+      by one task per job, shared by all of its watchers, only while someone watches.
+    - Each watcher has a small bounded queue; a slow one loses the oldest events, which is
+      harmless because every event is a full snapshot.
+    """
+
+    def __init__(self, poll_seconds: Optional[float] = None, keepalive_seconds: Optional[float] = None, queue_size: int = 16):
+        self.logger = Logger()
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.INGESTION_EVENTS_POLL_SECONDS
+        self.keepalive_seconds = keepalive_seconds if keepalive_seconds is not None else settings.INGESTION_EVENTS_KEEPALIVE_SECONDS
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._local: Set[str] = set()
+        self._pollers: Dict[str, asyncio.Task] = {}
+
+    def attach(self, job_id: str):
+        """The job's emitter runs in this process from now on."""
+        self._local.add(job_id)
+
+    def detach(self, job_id: str):
+        self._local.discard(job_id)
+        if job_id not in self._subscribers:
+            self._latest.pop(job_id, None)
+
+    def publish(self, job_id: str, event: Dict[str, Any]):
+        # Snapshots are kept only while the job runs here or is watched
+        if job_id in self._local or job_id in self._subscribers:
+            self._latest[job_id] = event
+        for queue in self._subscribers.get(job_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def close_job(self, job_id: str, status: str, **fields: Any):
+        """Final (or requeued) status of a job that ran here; watchers of a terminal job are released."""
+        self.publish(job_id, {**self._latest.get(job_id, {"job_id": job_id}), **fields, "status": status})
+        self.detach(job_id)
+
+    async def watch(self, job_id: str, load: EventLoader, initial: Optional[Dict[str, Any]] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield the job's current snapshot, then every update until it reaches a terminal
+        status; None is yielded every `keepalive_seconds` without updates.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            event = self._latest.get(job_id) or initial or await load()
+            if event is None:
+                return
+            yield event
+            if event.get("status") in TERMINAL_STATUSES:
+                return
+            if job_id not in self._pollers:
+                self._pollers[job_id] = asyncio.create_task(self._poll(job_id, load, event))
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            watchers = self._subscribers.get(job_id)
+            if watchers is not None:
+                watchers.discard(queue)
+                if not watchers:
+                    del self._subscribers[job_id]
+                    poller = self._pollers.pop(job_id, None)
+                    if poller is not None:
+                        poller.cancel()
+                    if job_id not in self._local:
+                        self._latest.pop(job_id, None)
+
+    async def _poll(self, job_id: str, load: EventLoader, last: Optional[Dict[str, Any]]):
+        while job_id in self._subscribers:
+            await asyncio.sleep(self.poll_seconds)
+            if job_id in self._local:
+                continue  # published directly by the pipeline
+            try:
+                event = await load()
+            except Exception as e:
+                self.logger.warning(f"[Job {job_id}] Progress poll failed: {e}")
+                continue
+            if event is not None and event != last:
+                last = event
+                self.publish(job_id, event)
+
+
+class JobProgress:
+    """
+    Live stage-level counters of one running job: pages parsed, chunks embedded and
+    vectors upserted, with rates since the job (re)started and a document-based ETA.
+    Changes are published to the hub at most every `min_interval` unless forced.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        *,
+        docs_total: int = 0,
+        docs_done: int = 0,
+        vectors: int = 0,
+        hub: Optional[IngestionEventHub] = None,
+        min_interval: Optional[float] = None,
+    ):
+        self.job_id = job_id
+        self.hub = hub or ingestion_events
+        self.min_interval = min_interval if min_interval is not None else settings.INGESTION_EVENTS_MIN_INTERVAL_SECONDS
+        self.status = IngestionStatus.RUNNING.value
+        self.counters = {
+            "docs_total": docs_total,
+            "docs_done": docs_done,
+            "vectors": vectors,
+            "pages_parsed": 0,
+            "chunks_embedded": 0,
+            "vectors_upserted": 0,
+        }
+        self.stages: Optional[Callable[[], Dict[str, Any]]] = None
+        # A resumed job starts with documents done; rates count this run's work only
+        self._docs_at_start = docs_done
+        self._started = time.monotonic()
+        self._last_publish = 0.0
+
+    def add(self, **deltas: int):
+        for name, delta in deltas.items():
+            self.counters[name] += delta
+        self.publish()
+
+    def update(self, **values: int):
+        self.counters.update(values)
+        self.publish(force=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        c = self.counters
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        docs_rate = (c["docs_done"] - self._docs_at_start) / elapsed
+        remaining = max(c["docs_total"] - c["docs_done"], 0)
+        if remaining == 0:
+            eta = 0.0
+        else:
+            eta = round(remaining / docs_rate, 1) if docs_rate > 0 else None
+        event = {
+            "job_id": self.job_id,
+            "status": self.status,
+            **c,
+            "pages_per_second": round(c["pages_parsed"] / elapsed, 2),
+            "chunks_per_second": round(c["chunks_embedded"] / elapsed, 2),
+            "vectors_per_second": round(c["vectors_upserted"] / elapsed, 2),
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta,
+        }
+        if self.stages is not None:
+            event["stages"] = {
+                name: {k: s[k] for k in ("processed", "failed", "queue_depth", "items_per_second")}
+                for name, s in self.stages().items()
+            }
+        return event
+
+    def publish(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.min_interval:
+            return
+        self._last_publish = now
+        self.hub.publish(self.job_id, self.snapshot())
+
+
+# Shared by the API routes and the worker pool of this process
+ingestion_events = IngestionEventHub()
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
+from app.utils.logger import Logger
+
+# End-of-stream marker; one is queued per downstream worker
+_DONE = object()
+
+
+class PipelineStage:
+    """
+    One step of a StagedPipeline: `handler(item)` runs on `concurrency` workers.
+
+    The handler returns the item for the next stage, or None to drop it (the handler
+    is then responsible for any bookkeeping the dropped item needs).
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], concurrency: int = 1):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, int(concurrency))
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self._first_start: Optional[float] = None
+        self._last_end: Optional[float] = None
+
+    def stats(self, queue: Optional[asyncio.Queue] = None) -> Dict[str, Any]:
+        """Counters plus throughput over the stage's active window (first start to last finish)."""
+        active = (self._last_end - self._first_start) if self._first_start and self._last_end else 0.0
+        handled = self.processed + self.dropped
+        return {
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(handled / active, 2) if active > 0 else None,
+            "queue_depth": queue.qsize() if queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages connected by bounded asyncio queues.
+
+    Every stage has its own worker count, so network-, CPU- and database-bound steps
+    overlap across items instead of running one item at a time; a full queue blocks
+    the stage feeding it (backpressure), so a fast producer never buffers more than
+    `queue_size` items per stage. Handler errors go to `on_error(stage_name, item, exc)`
+    and the item is dropped; without `on_error` (or for an `abort_on` exception type)
+    the first error aborts the run, cancelling every stage.
+    """
+
+    def __init__(
+        self,
+        stages: List[PipelineStage],
+        *,
+        queue_size: int = 4,
+        on_error: Optional[Callable[[str, Any, BaseException], Awaitable[None]]] = None,
+        abort_on: Tuple[Type[BaseException], ...] = (),
+        logger: Optional[Logger] = None,
+    ):
+        if not stages:
+            raise ValueError("StagedPipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self.on_error = on_error
+        self.abort_on = abort_on
+        self.logger = logger or Logger()
+        self._queues: List[asyncio.Queue] = []
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage counters, throughput and current/max depth of the queue feeding each stage."""
+        queues = self._queues or [None] * len(self.stages)
+        return {stage.name: stage.stats(queue) for stage, queue in zip(self.stages, queues)}
+
+    async def run(self, source: Union[Iterable[Any], AsyncIterable[Any]]) -> Dict[str, Dict[str, Any]]:
+        """Feed every item of `source` through the stages; returns the final stats."""
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [asyncio.create_task(self._feed(source))]
+        for index in range(len(self.stages)):
+            tasks.append(asyncio.create_task(self._run_stage(index)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return self.stats()
+
+    async def _put(self, index: int, item: Any):
+        queue = self._queues[index]
+        await queue.put(item)
+        stage = self.stages[index]
+        stage.max_queue_depth = max(stage.max_queue_depth, queue.qsize())
+
+    async def _feed(self, source: Union[Iterable[Any], AsyncIterable[Any]]):
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await self._put(0, item)
+        else:
+            for item in source:
+                await self._put(0, item)
+        for _ in range(self.stages[0].concurrency):
+            await self._queues[0].put(_DONE)
+
+    async def _run_stage(self, index: int):
+        stage = self.stages[index]
+        await asyncio.gather(*(self._stage_worker(index) for _ in range(stage.concurrency)))
+        if index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].concurrency):
+                await self._queues[index + 1].put(_DONE)
+
+    async def _stage_worker(self, index: int):
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            started = time.perf_counter()
+            if stage._first_start is None:
+                stage._first_start = started
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stage.failed += 1
+                if self.on_error is None or isinstance(e, self.abort_on):
+                    raise
+                self.logger.error(f"Pipeline stage '{stage.name}' failed: {e}")
+                await self.on_error(stage.name, item, e)
+                continue
+            finally:
+                stage._last_end = time.perf_counter()
+                stage.busy_seconds += stage._last_end - started
+            if result is None:
+                stage.dropped += 1
+                continue
+            stage.processed += 1
+            if index + 1 < len(self.stages):
+                await self._put(index + 1, result)
@@ -0,0 +1,174 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from pymongo import ASCENDING, ReturnDocument
+from app.core.config import settings
+from app.models.ingestion import IngestionStatus
+from app.utils.logger import Logger
+
+# Wakes in-process workers as soon as a job is enqueued (other replicas pick it up on their next poll)
+_job_available: Optional[asyncio.Event] = None
+_job_available_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _job_event() -> asyncio.Event:
+    global _job_available, _job_available_loop
+    loop = asyncio.get_running_loop()
+    if _job_available is None or _job_available_loop is not loop:
+        _job_available, _job_available_loop = asyncio.Event(), loop
+    return _job_available
+
+
+def notify_job_available():
+    _job_event().set()
+
+
+async def wait_for_job(timeout: float):
+    """Sleep until a job is enqueued in this process or `timeout` elapses."""
+    event = _job_event()
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    event.clear()
+
+
+class IngestionQueue:
+    """
+    The `ingestion_jobs` collection used as a durable work queue.
+
+    - claim: atomically moves the oldest due QUEUED job to RUNNING, stamping
+      `lease_owner` and `lease_expires_at`; only one worker (on any replica) wins.
+    - heartbeat: extends the lease while the job runs; returns False once the
+      lease is lost (job canceled or handed to another worker).
+    - fail: requeues with exponential backoff (`available_at`) until
+      `max_attempts`, then marks the job FAILED with the last error.
+    - release: puts a job back untouched (worker shutdown), without using an attempt.
+    - requeue_expired: hands RUNNING jobs whose lease ran out (worker crashed or
+      was killed) back to the queue, or FAILS them once out of attempts; they
+      resume from their checkpoints.
+    """
+
+    _indexes_ready = False
+
+    def __init__(
+        self,
+        collection,
+        *,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+    ):
+        self.logger = Logger()
+        self.collection = collection
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.INGESTION_LEASE_SECONDS
+        self.max_attempts = max_attempts if max_attempts is not None else settings.INGESTION_MAX_ATTEMPTS
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else settings.INGESTION_RETRY_BACKOFF_SECONDS
+
+    async def ensure_indexes(self):
+        if IngestionQueue._indexes_ready:
+            return
+        await self.collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        IngestionQueue._indexes_ready = True
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the next due job for `worker_id`, or None if nothing is due."""
+        now = datetime.utcnow()
+        job = await self.collection.find_one_and_update(
+            # Jobs created before the queue existed have no available_at: treat them as due
+            {"status": IngestionStatus.QUEUED.value, "available_at": {"$not": {"$gt": now}}},
+            {
+                "$set": {
+                    "status": IngestionStatus.RUNNING.value,
+                    "lease_owner": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "started_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job:
+            self.logger.info(f"[Job {job['_id']}] Claimed by {worker_id} (attempt {job['attempts']})")
+        return job
+
+    def _owned(self, job_id: str, worker_id: str) -> Dict[str, Any]:
+        return {"_id": job_id, "lease_owner": worker_id, "status": IngestionStatus.RUNNING.value}
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        result = await self.collection.update_one(
+            self._owned(job_id, worker_id),
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job_id: str, worker_id: str, docs_done: int, vectors: int):
+        await self.collection.update_one(
+            self._owned(job_id, worker_id),
+            {"$set": {
+                "status": IngestionStatus.COMPLETED.value,
+                "docs_done": docs_done,
+                "vectors": vectors,
+                "finished_at": datetime.utcnow(),
+                "lease_owner": None,
+                "lease_expires_at": None,
+            }},
+        )
+
+    async def fail(self, job: Dict[str, Any], worker_id: str, error: str) -> str:
+        """Requeue with backoff or mark FAILED; returns the status the job now has."""
+        attempts = job.get("attempts", 1)
+        if attempts < self.max_attempts:
+            delay = self.backoff_seconds * 2 ** (attempts - 1)
+            update = {
+                "status": IngestionStatus.QUEUED.value,
+                "available_at": datetime.utcnow() + timedelta(seconds=delay),
+            }
+            self.logger.warning(f"[Job {job['_id']}] Attempt {attempts} failed ({error}); retrying in {delay:.0f}s")
+        else:
+            update = {"status": IngestionStatus.FAILED.value, "finished_at": datetime.utcnow()}
+            self.logger.error(f"[Job {job['_id']}] Failed after {attempts} attempts: {error}")
+        update.update({"last_error": error, "lease_owner": None, "lease_expires_at": None})
+        await self.collection.update_one(self._owned(job["_id"], worker_id), {"$set": update})
+        return update["status"]
+
+    async def requeue_expired(self) -> int:
+        """Requeue (or fail, when out of attempts) RUNNING jobs whose lease expired; returns how many."""
+        now = datetime.utcnow()
+        # Jobs started before leases existed have none: nobody is heartbeating them either
+        expired = {
+            "status": IngestionStatus.RUNNING.value,
+            "$or": [{"lease_expires_at": {"$lt": now}}, {"lease_expires_at": None}],
+        }
+        abandoned = {"lease_owner": None, "lease_expires_at": None, "last_error": "Lease expired: worker stopped responding"}
+        failed = await self.collection.update_many(
+            {**expired, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {**abandoned, "status": IngestionStatus.FAILED.value, "finished_at": now}},
+        )
+        requeued = await self.collection.update_many(
+            expired,
+            {"$set": {**abandoned, "status": IngestionStatus.QUEUED.value, "available_at": now}},
+        )
+        if failed.modified_count or requeued.modified_count:
+            self.logger.warning(
+                f"Stale leases: requeued {requeued.modified_count} job(s), failed {failed.modified_count} out of attempts"
+            )
+        return requeued.modified_count + failed.modified_count
+
+    async def release(self, job_id: str, worker_id: str):
+        result = await self.collection.update_one(
+            self._owned(job_id, worker_id),
+            {
+                "$set": {
+                    "status": IngestionStatus.QUEUED.value,
+                    "available_at": datetime.utcnow(),
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                },
+                "$inc": {"attempts": -1},
+            },
+        )
+        if result.matched_count:
+            self.logger.info(f"[Job {job_id}] Released by {worker_id}")
@@ -1,21 +1,45 @@
-from typing import List, Optional
+from typing import IO, AsyncIterator, List, Optional, Tuple
 from uuid import uuid4
 from datetime import datetime
 import asyncio
-import tempfile
-import os
+import hashlib
 import boto3
 from app.models.auth import User
 from app.models.ingestion import (
-    IngestionRequest, IngestionJob, IngestionStatus, IngestionMode
+    IngestionRequest, IngestionJob, IngestionStatus, IngestionMode, IngestionOptions
 )
 from app.models.documents import DocumentStatus
+from app.services.ingestion_queue import notify_job_available
+from app.services.ingestion_pipeline import PipelineStage, StagedPipeline
+from app.services.ingestion_cancel import CancellationToken, IngestionCanceled, cancel_local_job, token_for
+from app.services.ingestion_events import JobProgress, format_sse, ingestion_events, TERMINAL_STATUSES
 from app.utils.pdf_handler import PDFHandler
-from app.utils.qdrant_client import QdrantStore
+from app.utils.chunker import chunk_pages, embedder_token_counter
+from app.utils.s3_stream import DownloadAborted, download_to_spool
+from app.utils.vector_store import create_vector_store, subject_collection_resolver
+from app.utils.qdrant_client import chunk_content_hash, chunk_point_id
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.embeddings import embedding_model_id
+from app.utils.chunk_store import ChunkTextStore
 from app.utils.logger import Logger
 from app.core.config import settings
 
+# Checkpoint states of documents a resumed job does not process again
+FINISHED_CHECKPOINTS = ("ingested", "skipped")
+
+
+def _touched(previous_status: Optional[str], synced: bool = False, vectors: int = 0) -> dict:
+    """What a job wrote for one document, as needed to roll it back (see _finish_canceled)"""
+    return {
+        "previous_status": previous_status or DocumentStatus.UPLOADED.value,
+        "points": set(),  # point IDs upserted by this run
+        "synced": synced,  # upsert + stale-point deletion finished
+        "vectors": vectors
+    }
+
 class IngestionService:
+    _dedup_index_ready = False
+
     def __init__(self, db):
         self.db = db
         self.collection = db["ingestion_jobs"]
@@ -33,11 +57,11 @@ class IngestionService:
         # Initialize PDF handler
         self.pdf_handler = PDFHandler()
         
-        # Initialize Qdrant store
-        self.qdrant_store = QdrantStore(
-            url=settings.QDRANT_URL,
-            api_key=settings.QDRANT_API_KEY,
-            collection_name=settings.QDRANT_COLLECTION_NAME or "academia_docs"
+        # Initialize vector store (Qdrant or local NumPy, per VECTOR_STORE_BACKEND)
+        self.qdrant_store = create_vector_store(
+            embedding_cache=EmbeddingCache(db["embedding_cache"]) if settings.EMBEDDING_CACHE_ENABLED else None,
+            chunk_store=ChunkTextStore(db["chunk_texts"]) if settings.CHUNK_TEXT_STORE_ENABLED else None,
+            collection_resolver=subject_collection_resolver(db)
         )
 
     async def start_ingestion(
@@ -51,17 +75,7 @@ class IngestionService:
         job_id = str(uuid4())
         
         # Count documents to process and provide diagnostic info
-        if ingestion_request.mode == IngestionMode.NEW:
-            docs_query = {"subject_slug": subject_slug, "status": DocumentStatus.UPLOADED.value}
-        elif ingestion_request.mode == IngestionMode.SELECTED and ingestion_request.doc_ids:
-            docs_query = {"subject_slug": subject_slug, "status": DocumentStatus.UPLOADED.value, "_id": {"$in": ingestion_request.doc_ids}}
-        elif ingestion_request.mode == IngestionMode.ALL:
-            docs_query = {"subject_slug": subject_slug, "status": {"$in": [DocumentStatus.UPLOADED.value, DocumentStatus.INGESTED.value]}}
-        elif ingestion_request.mode == IngestionMode.REINGEST:
-            docs_query = {"subject_slug": subject_slug, "status": DocumentStatus.INGESTED.value}
-        else:
-            # Default to NEW mode
-            docs_query = {"subject_slug": subject_slug, "status": DocumentStatus.UPLOADED.value}
+        docs_query = self._docs_query(subject_slug, ingestion_request)
             
         self.logger.debug(f"MongoDB docs_query: {docs_query}")
         docs_total = await self.documents_collection.count_documents(docs_query)
@@ -86,15 +100,17 @@ class IngestionService:
             "logs_url": None,
             "created_at": datetime.utcnow(),
             "created_by": user.id,
-            "request": ingestion_request.dict()
+            "request": ingestion_request.dict(),
+            # Queue bookkeeping (see IngestionQueue)
+            "attempts": 0,
+            "available_at": datetime.utcnow()
         }
         self.logger.debug(f"Inserting job record: {job_doc}")
         await self.collection.insert_one(job_doc)
         self.logger.info(f"Ingestion job {job_id} created and queued.")
         
-        # Start the actual ingestion process in the background
-        self.logger.info(f"Dispatching background ingestion task for job {job_id}...")
-        asyncio.create_task(self._process_ingestion(job_id, subject_slug, docs_query))
+        # Workers (in this process or a separate `python -m app.worker`) claim it from the queue
+        notify_job_available()
         
         self.logger.info(f"Ingestion job {job_id} started for subject {subject_slug}.")
         return IngestionJob(
@@ -141,14 +157,14 @@ class IngestionService:
         user: User
     ) -> Optional[IngestionJob]:
         """Get a specific ingestion job"""
-        self.logger.info(f"Getting ingestion job {job_id} for user {user.id}")
+        self.logger.debug(f"Getting ingestion job {job_id} for user {user.id}")
         doc = await self.collection.find_one({"_id": job_id})
         
         if not doc:
             self.logger.warning(f"Ingestion job {job_id} not found in database")
             return None
         
-        self.logger.info(f"Found job {job_id}: status={doc['status']}, docs_total={doc['docs_total']}, docs_done={doc['docs_done']}, vectors={doc['vectors']}")
+        self.logger.debug(f"Found job {job_id}: status={doc['status']}, docs_total={doc['docs_total']}, docs_done={doc['docs_done']}, vectors={doc['vectors']}")
         
         return IngestionJob(
             job_id=str(doc["_id"]),
@@ -160,167 +176,553 @@ class IngestionService:
             logs_url=doc.get("logs_url")
         )
 
+    async def get_job_event(self, job_id: str) -> Optional[dict]:
+        """The job's latest progress snapshot as stored in Mongo (see JobProgress)"""
+        doc = await self.collection.find_one(
+            {"_id": job_id},
+            {"status": 1, "docs_total": 1, "docs_done": 1, "vectors": 1, "progress": 1}
+        )
+        if not doc:
+            return None
+        return {
+            **(doc.get("progress") or {}),
+            "job_id": job_id,
+            "status": doc["status"],
+            "docs_total": doc.get("docs_total", 0),
+            "docs_done": doc.get("docs_done", 0),
+            "vectors": doc.get("vectors", 0)
+        }
+
+    async def stream_job_events(self, job_id: str, initial: Optional[dict] = None) -> AsyncIterator[str]:
+        """
+        Server-sent events for one job: `progress` for every update, `end` once it finishes.
+        Watchers share the in-process hub, so they add no per-watcher database reads.
+        """
+        async for event in ingestion_events.watch(job_id, lambda: self.get_job_event(job_id), initial):
+            if event is None:
+                yield ": keepalive\n\n"
+            elif event.get("status") in TERMINAL_STATUSES:
+                yield format_sse("end", event)
+            else:
+                yield format_sse("progress", event)
+
     async def cancel_ingestion(
         self,
         job_id: str,
-        user: User
+        user: User,
+        rollback: bool = False
     ) -> bool:
-        """Cancel an ingestion job"""
+        """
+        Cancel an ingestion job. A running job stops at once if it runs in this process,
+        otherwise at its next stage checkpoint (or lease heartbeat) on its own replica.
+        rollback=True undoes what it wrote where that is possible; by default everything is kept.
+        Documents that were not ingested before the job lose their vectors and go back to their
+        previous status. A re-ingested document whose sync had not finished loses only the points
+        this run wrote (its old ones were not deleted yet); one whose sync finished already lost its
+        old points, so it is kept and listed in the job's `rollback_kept`.
+        """
         result = await self.collection.update_one(
             {
                 "_id": job_id,
                 "status": {"$in": [IngestionStatus.QUEUED.value, IngestionStatus.RUNNING.value]}
             },
-            {"$set": {"status": IngestionStatus.CANCELED.value}}
+            {"$set": {
+                "status": IngestionStatus.CANCELED.value,
+                "cancel_rollback": rollback,
+                "canceled_at": datetime.utcnow(),
+                "canceled_by": user.id
+            }}
         )
         
-        # In a real implementation, you would also signal the worker to stop
+        if result.modified_count > 0 and cancel_local_job(job_id, rollback):
+            self.logger.info(f"Ingestion job {job_id} interrupted in this process (rollback={rollback})")
         
         return result.modified_count > 0
 
-    async def _process_ingestion(self, job_id: str, subject_slug: str, docs_query: dict):
+    async def resume_ingestion(
+        self,
+        job_id: str,
+        user: User
+    ) -> bool:
+        """
+        Queue a FAILED or CANCELED job again with fresh attempts. It keeps its checkpoints,
+        so finished documents are skipped and a half-upserted document continues after
+        its last stored chunk batch (a rolled-back job has none and starts over).
+        """
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {
+                "_id": job_id,
+                "status": {"$in": [IngestionStatus.FAILED.value, IngestionStatus.CANCELED.value]}
+            },
+            {"$set": {
+                "status": IngestionStatus.QUEUED.value,
+                "attempts": 0,
+                "available_at": now,
+                "cancel_rollback": False,
+                "finished_at": None,
+                "resumed_at": now,
+                "resumed_by": user.id
+            }}
+        )
+        if result.modified_count == 0:
+            return False
+        
+        self.logger.info(f"Ingestion job {job_id} requeued for resume by {user.id}")
+        notify_job_available()
+        return True
+
+    def _docs_query(self, subject_slug: str, ingestion_request: IngestionRequest) -> dict:
+        """Mongo query selecting the documents an ingestion request covers"""
+        if ingestion_request.mode == IngestionMode.NEW:
+            return {"subject_slug": subject_slug, "status": DocumentStatus.UPLOADED.value}
+        elif ingestion_request.mode == IngestionMode.SELECTED and ingestion_request.doc_ids:
+            return {"subject_slug": subject_slug, "status": DocumentStatus.UPLOADED.value, "_id": {"$in": ingestion_request.doc_ids}}
+        elif ingestion_request.mode == IngestionMode.ALL:
+            return {"subject_slug": subject_slug, "status": {"$in": [DocumentStatus.UPLOADED.value, DocumentStatus.INGESTED.value]}}
+        elif ingestion_request.mode == IngestionMode.REINGEST:
+            return {"subject_slug": subject_slug, "status": DocumentStatus.INGESTED.value}
+        # Default to NEW mode
+        return {"subject_slug": subject_slug, "status": DocumentStatus.UPLOADED.value}
+
+    async def run_job(self, job: dict) -> Tuple[int, int]:
+        """Run a job claimed from the queue; returns (docs_done, vectors) or raises for a retry"""
+        ingestion_request = IngestionRequest(**(job.get("request") or {}))
+        docs_query = self._docs_query(job["subject_slug"], ingestion_request)
+        return await self._process_ingestion(
+            job["_id"], job["subject_slug"], docs_query, ingestion_request.options,
+            cancel_token=token_for(job["_id"], self.collection),
+            checkpoints=job.get("checkpoints"),
+            docs_total=job.get("docs_total")
+        )
+
+    async def _process_ingestion(
+        self,
+        job_id: str,
+        subject_slug: str,
+        docs_query: dict,
+        options: Optional[IngestionOptions] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        checkpoints: Optional[dict] = None,
+        docs_total: Optional[int] = None
+    ) -> Tuple[int, int]:
         self.logger.info(f"[Job {job_id}] Starting background ingestion for subject '{subject_slug}' with query: {docs_query}")
+        cancel_token = cancel_token or token_for(job_id, self.collection)
+        # doc_id -> {"state", "vectors", "chunk_id", "content_hash"} saved by earlier attempts
+        checkpoints = checkpoints or {}
         try:
-            # Update job status to running
-            self.logger.info(f"[Job {job_id}] Setting status to RUNNING.")
-            await self.collection.update_one(
-                {"_id": job_id},
-                {"$set": {"status": IngestionStatus.RUNNING.value}}
-            )
+            # Route to the subject's collection, creating it on first use
+            vector_store = await self.qdrant_store.for_subject(subject_slug, create=True)
+            self.logger.info(f"[Job {job_id}] Using vector collection '{vector_store.collection_name}'")
             
-            # Initialize Qdrant collection
-            self.logger.info(f"[Job {job_id}] Initializing Qdrant collection...")
-            await self.qdrant_store.init_store()
+            # touched: doc_id -> what this job wrote for it (see _touched), used by a rollback
+            finished = [c for c in checkpoints.values() if c.get("state") in FINISHED_CHECKPOINTS]
+            progress = {
+                "docs": len(finished),
+                "vectors": sum(c.get("vectors", 0) for c in finished),
+                "touched": {
+                    doc_id: _touched(c.get("previous_status"), c.get("state") == DocumentStatus.INGESTED.value, c.get("vectors", 0))
+                    for doc_id, c in checkpoints.items()
+                }
+            }
+            if checkpoints:
+                self.logger.info(f"[Job {job_id}] Resuming: {len(finished)} documents already done, {len(checkpoints) - len(finished)} to redo or continue")
+            if docs_total is None:
+                docs_total = await self.documents_collection.count_documents(docs_query)
             
-            # Get all documents to process
-            cursor = self.documents_collection.find(docs_query)
-            docs_processed = 0
-            total_vectors = 0
+            # Live progress for SSE watchers (see ingestion_events)
+            tracker = JobProgress(job_id, docs_total=docs_total, docs_done=progress["docs"], vectors=progress["vectors"])
+            ingestion_events.attach(job_id)
+            pipeline = self._build_pipeline(
+                job_id, subject_slug, vector_store, progress, options or IngestionOptions(), cancel_token, checkpoints, tracker
+            )
+            tracker.stages = pipeline.stats
+            tracker.publish(force=True)
             
-            # Check if there are any documents to process
-            has_documents = False
-            async for doc in cursor:
-                has_documents = True
-                try:
-                    self.logger.info(f"[Job {job_id}] Processing document {doc['_id']}: {doc['filename']}")
-                    
-                    # Download PDF from S3
-                    self.logger.debug(f"[Job {job_id}] Downloading {doc['s3_key']} from S3...")
-                    pdf_content = await self._download_pdf_from_s3(doc['s3_key'])
-                    
-                    if pdf_content:
-                        self.logger.debug(f"[Job {job_id}] PDF downloaded. Extracting text...")
-                        # Extract text from PDF
-                        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                            temp_file.write(pdf_content)
-                            temp_file_path = temp_file.name
-                        
-                        try:
-                            text = self.pdf_handler.read(temp_file_path)
-                            self.logger.debug(f"[Job {job_id}] Extracted text length: {len(text)}")
-                            
-                            if text.strip():
-                                # Chunk the text
-                                chunks = self.pdf_handler.chunk(text, chunk_size=1000)
-                                self.logger.debug(f"[Job {job_id}] Chunked into {len(chunks)} chunks.")
-                                
-                                # Prepare chunks for Qdrant
-                                qdrant_chunks = []
-                                for chunk_idx, chunk_text in enumerate(chunks):
-                                    if chunk_text.strip():
-                                        qdrant_chunks.append({
-                                            "text": chunk_text,
-                                            "subject": self._map_subject_to_category(subject_slug),
-                                            "s3_uri": f"s3://{settings.S3_BUCKET}/{doc['s3_key']}",
-                                            "doc_id": doc['_id'],
-                                            "page": 1,  # PDF page detection could be improved
-                                            "chunk_id": chunk_idx,
-                                            "title": doc['filename'],
-                                            "topics": []
-                                        })
-                                self.logger.debug(f"[Job {job_id}] Prepared {len(qdrant_chunks)} Qdrant chunks.")
-                                
-                                # Upload to Qdrant
-                                if qdrant_chunks:
-                                    try: 
-                                        self.logger.info(f"[Job {job_id}] Uploading {len(qdrant_chunks)} chunks to Qdrant...")
-                                        await self.qdrant_store.upsert_chunks(qdrant_chunks)
-                                        total_vectors += len(qdrant_chunks)
-                                    except Exception as e:
-                                        self.logger.error(f"[Job {job_id}] Failed to upload chunks to Qdrant: {str(e)}")
-                                        raise                        
-                                    # Update document status to ingested
-                                    await self.documents_collection.update_one(
-                                        {"_id": doc['_id']},
-                                        {"$set": {"status": DocumentStatus.INGESTED.value}}
-                                    )
-                                    self.logger.info(f"[Job {job_id}] Successfully ingested {len(qdrant_chunks)} chunks from {doc['filename']}")
-                                else:
-                                    self.logger.warning(f"[Job {job_id}] No valid chunks extracted from {doc['filename']}")
-                            else:
-                                self.logger.warning(f"[Job {job_id}] No text extracted from {doc['filename']}")
-                                
-                        finally:
-                            # Clean up temp file
-                            if os.path.exists(temp_file_path):
-                                os.unlink(temp_file_path)
-                                self.logger.debug(f"[Job {job_id}] Deleted temp file {temp_file_path}")
-                    else:
-                        self.logger.error(f"[Job {job_id}] Failed to download {doc['s3_key']} from S3")
-                        
-                    docs_processed += 1
-                    
-                    # Update job progress
-                    self.logger.info(f"[Job {job_id}] Progress: {docs_processed} docs processed, {total_vectors} vectors so far.")
-                    await self.collection.update_one(
-                        {"_id": job_id},
-                        {"$set": {
-                            "docs_done": docs_processed,
-                            "vectors": total_vectors
-                        }}
-                    )
-                    
-                except Exception as e:
-                    self.logger.error(f"[Job {job_id}] Error processing document {doc['_id']}: {str(e)}")
-                    # Mark document as failed
-                    await self.documents_collection.update_one(
-                        {"_id": doc['_id']},
-                        {"$set": {"status": DocumentStatus.FAILED.value}}
-                    )
-                    docs_processed += 1
+            # Documents stream through fetch -> parse -> chunk -> embed -> upsert -> status
+            cursor = self.documents_collection.find(docs_query)
+            try:
+                stage_stats = await pipeline.run(cursor)
+            except (IngestionCanceled, asyncio.CancelledError):
+                if not cancel_token.is_canceled():
+                    raise  # worker shutdown or lost lease, not a cancel
+                await self._finish_canceled(job_id, vector_store, progress, cancel_token.rollback)
+                raise IngestionCanceled(f"Ingestion job {job_id} was canceled") from None
             
             # Handle case where no documents were found
-            if not has_documents:
+            if not progress["docs"]:
                 self.logger.info(f"[Job {job_id}] No documents found matching query. All documents may already be ingested.")
             
-            # Update job status to completed
-            self.logger.info(f"[Job {job_id}] COMPLETED: {docs_processed} docs, {total_vectors} vectors.")
-            await self.collection.update_one(
-                {"_id": job_id},
-                {"$set": {
-                    "status": IngestionStatus.COMPLETED.value,
-                    "docs_done": docs_processed,
-                    "vectors": total_vectors
-                }}
-            )
+            await self.collection.update_one({"_id": job_id}, {"$set": {"stages": stage_stats}})
+            self.logger.info(f"[Job {job_id}] Stage stats: {stage_stats}")
+            
+            # The queue marks the job COMPLETED (or retries/fails it if we raise)
+            self.logger.info(f"[Job {job_id}] COMPLETED: {progress['docs']} docs, {progress['vectors']} vectors.")
+            return progress["docs"], progress["vectors"]
             
+        except IngestionCanceled:
+            raise
         except Exception as e:
             self.logger.error(f"[Job {job_id}] Ingestion job failed: {str(e)}")
-            # Update job status to failed
+            raise
+        finally:
+            # The worker publishes the final status (ingestion_events.close_job)
+            ingestion_events.detach(job_id)
+
+    async def _finish_canceled(self, job_id: str, vector_store, progress: dict, rollback: bool):
+        """
+        Record where a canceled job stopped; with rollback, undo what it wrote (see cancel_ingestion).
+        Only vectors that did not exist before the job are deleted. Points written for a re-ingested
+        document by an earlier attempt of a resumed job cannot be told apart from its old ones and stay.
+        """
+        touched = progress["touched"]
+        ingested = DocumentStatus.INGESTED.value
+        update = {"$set": {
+            "docs_done": progress["docs"],
+            "vectors": progress["vectors"],
+            "rolled_back": bool(rollback and touched),
+            "finished_at": datetime.utcnow()
+        }}
+        if rollback:
+            # A finished re-sync already deleted the document's old points: undoing it would lose them
+            kept = sorted(d for d, t in touched.items() if t["previous_status"] == ingested and t["synced"])
+            undone = sorted(d for d in touched if d not in kept)
+            new_docs = [d for d in undone if touched[d]["previous_status"] != ingested]
+            partial_points = [p for d in undone if touched[d]["previous_status"] == ingested for p in touched[d]["points"]]
+            deleted = 0
+            if new_docs:
+                # Not ingested before the job: none of their vectors predate it
+                deleted += await vector_store.delete_by_docs(new_docs)
+            if partial_points:
+                deleted += await vector_store.delete_points(partial_points)
+            for status in {touched[d]["previous_status"] for d in undone}:
+                await self.documents_collection.update_many(
+                    {"_id": {"$in": [d for d in undone if touched[d]["previous_status"] == status]}},
+                    {"$set": {"status": status}}
+                )
+            update["$set"].update({
+                "docs_done": len(kept),
+                "vectors": sum(touched[d]["vectors"] for d in kept),
+                "rollback_kept": kept
+            })
+            if undone:
+                # Nothing of these is left, so a resume redoes them (kept ones stay finished)
+                update["$unset"] = {f"checkpoints.{d}": "" for d in undone}
+            self.logger.info(f"[Job {job_id}] Rolled back ~{deleted} vectors from {len(undone)} documents, kept {len(kept)} re-ingested")
+        await self.collection.update_one({"_id": job_id, "status": IngestionStatus.CANCELED.value}, update)
+        self.logger.info(f"[Job {job_id}] CANCELED after {progress['docs']} docs ({'rolled back' if rollback else 'vectors kept'}).")
+
+    def _build_pipeline(
+        self,
+        job_id: str,
+        subject_slug: str,
+        vector_store,
+        progress: dict,
+        options: IngestionOptions,
+        cancel_token: CancellationToken,
+        checkpoints: Optional[dict] = None,
+        tracker: Optional[JobProgress] = None
+    ) -> StagedPipeline:
+        """
+        One pipeline per job; each item is a per-document context dict that the stages fill in.
+        A document that fails in any stage is marked FAILED and the job carries on.
+        Progress is checkpointed on the job record under `checkpoints.<doc_id>`: the last
+        chunk of every upserted batch while a document is being written, then its final
+        state; a retried or resumed job skips what its checkpoints say is done.
+        """
+        checkpoints = checkpoints or {}
+        tracker = tracker or JobProgress(job_id)
+        category = self._map_subject_to_category(subject_slug)
+        count_tokens = embedder_token_counter()
+        # Vectors can be copied between documents only if they were chunked and embedded alike
+        signature = f"{embedding_model_id()}|{options.chunk_size}|{options.chunk_overlap}"
+
+        def doc_chunk(doc: dict, **fields) -> dict:
+            return {
+                "subject": category,
+                "s3_uri": f"s3://{settings.S3_BUCKET}/{doc['s3_key']}",
+                "doc_id": doc['_id'],
+                "title": doc['filename'],
+                "topics": [],
+                **fields
+            }
+        pipeline: Optional[StagedPipeline] = None
+
+        async def finish(ctx: dict, status: Optional[DocumentStatus], state: Optional[str] = None):
+            doc = ctx["doc"]
+            if status is not None:
+                await self.documents_collection.update_one(
+                    {"_id": doc['_id']},
+                    {"$set": {"status": status.value, **ctx.get("doc_fields", {})}}
+                )
+            progress["docs"] += 1
+            progress["vectors"] += ctx.get("vectors", 0)
+            touched = progress["touched"].get(doc['_id'])
+            if touched is None and status is not None:
+                # Changed before reaching upsert (e.g. FAILED in parse): a rollback restores its status
+                touched = progress["touched"][doc['_id']] = _touched(doc.get("status"))
+            if touched is not None:
+                touched["vectors"] = ctx.get("vectors", 0)
+            
+            # Update job progress
+            self.logger.info(f"[Job {job_id}] Progress: {progress['docs']} docs processed, {progress['vectors']} vectors so far.")
+            tracker.update(docs_done=progress["docs"], vectors=progress["vectors"])
+            update = {
+                "docs_done": progress["docs"],
+                "vectors": progress["vectors"],
+                "stages": pipeline.stats(),
+                # Read by watchers on other replicas (get_job_event)
+                "progress": tracker.snapshot()
+            }
+            state = state or (status.value if status is not None else None)
+            if state is not None:
+                # Written after the document's status, so a finished checkpoint implies it
+                update[f"checkpoints.{doc['_id']}.state"] = state
+                update[f"checkpoints.{doc['_id']}.vectors"] = ctx.get("vectors", 0)
+                update[f"checkpoints.{doc['_id']}.previous_status"] = (touched or _touched(doc.get("status")))["previous_status"]
+            await self.collection.update_one({"_id": job_id}, {"$set": update})
+
+        async def save_batch_checkpoint(doc_id: str, chunk_id, content_hash: Optional[str], count: int):
+            tracker.add(vectors_upserted=count)
             await self.collection.update_one(
                 {"_id": job_id},
-                {"$set": {"status": IngestionStatus.FAILED.value}}
+                {"$set": {f"checkpoints.{doc_id}": {
+                    "state": "partial",
+                    "chunk_id": chunk_id,
+                    "content_hash": content_hash,
+                    "previous_status": progress["touched"][doc_id]["previous_status"],
+                    "updated_at": datetime.utcnow()
+                }}}
+            )
+
+        async def fetch(doc: dict) -> Optional[dict]:
+            saved = checkpoints.get(doc['_id'])
+            if saved and saved.get("state") in FINISHED_CHECKPOINTS:
+                # Done by an earlier attempt and already counted in progress
+                self.logger.info(f"[Job {job_id}] Skipping document {doc['_id']}: {saved['state']} before resume")
+                return None
+            ctx = {"doc": doc, "doc_fields": {"ingest_signature": signature}}
+            self.logger.info(f"[Job {job_id}] Processing document {doc['_id']}: {doc['filename']}")
+            sha256 = doc.get("sha256")
+            if sha256 and await copy_duplicate(ctx, sha256):
+                return ctx
+            
+            # Hash while downloading when the upload did not record it
+            hasher = hashlib.sha256() if not sha256 else None
+            self.logger.debug(f"[Job {job_id}] Downloading {doc['s3_key']} from S3...")
+            try:
+                ctx["pdf"] = await self._download_pdf_from_s3(doc['s3_key'], should_stop=cancel_token.is_canceled, hasher=hasher)
+            except DownloadAborted:
+                # Stopped by a cancel: the document is not done, the job is
+                raise IngestionCanceled(f"Ingestion job {job_id} was canceled") from None
+            if ctx["pdf"] is None:
+                self.logger.error(f"[Job {job_id}] Failed to download {doc['s3_key']} from S3")
+                await finish(ctx, None)
+                return None
+            if hasher is not None:
+                sha256 = hasher.hexdigest()
+                await self.documents_collection.update_one({"_id": doc['_id']}, {"$set": {"sha256": sha256}})
+                if await copy_duplicate(ctx, sha256):
+                    ctx.pop("pdf").close()
+            return ctx
+
+        async def copy_duplicate(ctx: dict, sha256: str) -> bool:
+            """Take the chunks and vectors of an ingested document with the same bytes, if any"""
+            if not settings.INGESTION_DEDUP_ENABLED:
+                return False
+            doc = ctx["doc"]
+            found = await self._find_ingested_duplicate(doc['_id'], sha256, signature)
+            if found is None:
+                return False
+            source_id, chunks = found
+            ctx["chunks"] = [
+                doc_chunk(
+                    doc,
+                    text=c["text"],
+                    page=c.get("page"),
+                    page_end=c.get("page_end", c.get("page")),
+                    chunk_id=c["chunk_id"],
+                    vector=c["vector"]
+                )
+                for c in chunks
+            ]
+            ctx["doc_fields"]["copied_from"] = source_id
+            self.logger.info(f"[Job {job_id}] {doc['_id']} has the same content as {source_id}: copying its {len(chunks)} chunks")
+            return True
+
+        async def parse(ctx: dict) -> Optional[dict]:
+            if "chunks" in ctx:
+                return ctx  # copied from a duplicate
+            # PDF parsing is CPU-bound: page ranges go to the extraction process pool
+            pdf = ctx.pop("pdf")
+            try:
+                ctx["pages"] = await self._extract_pages(pdf)
+            finally:
+                # Frees the in-memory spool or deletes the on-disk one
+                pdf.close()
+            self.logger.debug(f"[Job {job_id}] Extracted {len(ctx['pages'])} pages")
+            tracker.add(pages_parsed=len(ctx["pages"]))
+            if not any(page.strip() for page in ctx["pages"]):
+                self.logger.warning(f"[Job {job_id}] No text extracted from {ctx['doc']['filename']}")
+                await finish(ctx, None, "skipped")
+                return None
+            return ctx
+
+        async def chunk(ctx: dict) -> Optional[dict]:
+            if "chunks" in ctx:
+                return ctx  # copied from a duplicate
+            doc = ctx["doc"]
+            # Token-sized, sentence-aligned chunks that know their pages (tokenizing is CPU work)
+            chunks = await asyncio.to_thread(
+                list,
+                chunk_pages(
+                    ctx.pop("pages"),
+                    chunk_size=options.chunk_size,
+                    chunk_overlap=options.chunk_overlap,
+                    count_tokens=count_tokens
+                )
+            )
+            
+            # Prepare chunks for Qdrant
+            ctx["chunks"] = [
+                doc_chunk(
+                    doc,
+                    text=chunk["text"],
+                    page=chunk["page_start"],
+                    page_end=chunk["page_end"],
+                    chunk_id=chunk["chunk_id"]
+                )
+                for chunk in chunks
+            ]
+            self.logger.debug(f"[Job {job_id}] Prepared {len(ctx['chunks'])} Qdrant chunks.")
+            if not ctx["chunks"]:
+                self.logger.warning(f"[Job {job_id}] No valid chunks extracted from {doc['filename']}")
+                await finish(ctx, None, "skipped")
+                return None
+            return ctx
+
+        async def embed(ctx: dict) -> dict:
+            # Only new or changed chunks are embedded (see QdrantStore.plan_document); copied ones carry vectors
+            ctx["plan"] = await vector_store.plan_document(ctx["doc"]['_id'], ctx["chunks"])
+            saved = checkpoints.get(ctx["doc"]['_id'])
+            if saved and saved.get("state") == "partial":
+                ctx["plan"]["to_upsert"] = self._after_checkpoint(saved, ctx["chunks"], ctx["plan"]["to_upsert"])
+                self.logger.info(f"[Job {job_id}] Continuing {ctx['doc']['_id']} after chunk {saved.get('chunk_id')}: {len(ctx['plan']['to_upsert'])} chunks left")
+            await vector_store.embed_chunks(ctx["plan"]["to_upsert"])
+            tracker.add(chunks_embedded=len(ctx["plan"]["to_upsert"]))
+            return ctx
+
+        async def upsert(ctx: dict) -> dict:
+            self.logger.info(f"[Job {job_id}] Syncing {len(ctx['chunks'])} chunks to Qdrant...")
+            doc_id = ctx["doc"]['_id']
+            touched = progress["touched"].setdefault(doc_id, _touched(ctx["doc"].get("status")))
+            plan = ctx.pop("plan")
+            # Deterministic IDs: only new or changed chunks get points that did not exist before
+            touched["points"].update(
+                chunk_point_id(doc_id, c["chunk_id"], c.get("content_hash") or chunk_content_hash(c["text"]))
+                for c in plan["to_upsert"]
             )
+            sync_stats = await vector_store.apply_document_plan(
+                plan,
+                on_batch=lambda chunk_id, content_hash, count: save_batch_checkpoint(doc_id, chunk_id, content_hash, count)
+            )
+            touched["synced"] = True
+            self.logger.debug(f"[Job {job_id}] Sync stats for {ctx['doc']['_id']}: {sync_stats}")
+            ctx["vectors"] = len(ctx["chunks"])
+            return ctx
+
+        async def update_status(ctx: dict) -> dict:
+            await finish(ctx, DocumentStatus.INGESTED)
+            self.logger.info(f"[Job {job_id}] Successfully ingested {ctx['vectors']} chunks from {ctx['doc']['filename']}")
+            return ctx
 
-    async def _download_pdf_from_s3(self, s3_key: str) -> bytes:
-        """Download PDF content from S3"""
+        async def on_error(stage: str, item: dict, exc: BaseException):
+            # fetch receives the raw document; later stages receive its context
+            ctx = item if "doc" in item else {"doc": item}
+            self.logger.error(f"[Job {job_id}] Error processing document {ctx['doc']['_id']} in stage '{stage}': {str(exc)}")
+            ctx["vectors"] = 0
+            # Mark document as failed
+            await finish(ctx, DocumentStatus.FAILED)
+
+        def guarded(handler):
+            # Stop between stages once the job is canceled, here or on another replica
+            async def run(item):
+                await cancel_token.checkpoint()
+                return await handler(item)
+            return run
+
+        pipeline = StagedPipeline(
+            [
+                PipelineStage("fetch", guarded(fetch), settings.INGESTION_FETCH_CONCURRENCY),
+                PipelineStage("parse", guarded(parse), settings.INGESTION_PARSE_CONCURRENCY),
+                PipelineStage("chunk", guarded(chunk), settings.INGESTION_CHUNK_CONCURRENCY),
+                PipelineStage("embed", guarded(embed), settings.INGESTION_EMBED_CONCURRENCY),
+                PipelineStage("upsert", guarded(upsert), settings.INGESTION_UPSERT_CONCURRENCY),
+                # A single writer keeps docs_done/vectors updates in order
+                PipelineStage("status", update_status, 1),
+            ],
+            queue_size=settings.INGESTION_STAGE_QUEUE_SIZE,
+            on_error=on_error,
+            abort_on=(IngestionCanceled,),
+            logger=self.logger,
+        )
+        return pipeline
+
+    @staticmethod
+    def _after_checkpoint(saved: dict, chunks: List[dict], to_upsert: List[dict]) -> List[dict]:
+        """
+        Drop the chunks an earlier attempt already upserted (up to its last checkpointed batch).
+        Trusted only if that chunk still has the same content: if chunking changed, everything is synced.
+        """
+        last = saved.get("chunk_id")
+        stored = next((c for c in chunks if c["chunk_id"] == last), None)
+        if stored is None or chunk_content_hash(stored["text"]) != saved.get("content_hash"):
+            return to_upsert
+        return [c for c in to_upsert if c["chunk_id"] > last]
+
+    async def _extract_pages(self, pdf: IO[bytes]) -> List[str]:
+        """Per-page text of a downloaded PDF, in page order"""
+        return await self.pdf_handler.read_pages_parallel(pdf)
+
+    async def _find_ingested_duplicate(self, doc_id: str, sha256: str, signature: str) -> Optional[Tuple[str, List[dict]]]:
+        """(source doc_id, its stored chunks with vectors) of another ingested document with these bytes"""
+        if not type(self)._dedup_index_ready:
+            await self.documents_collection.create_index([("sha256", 1), ("status", 1)])
+            type(self)._dedup_index_ready = True
+        cursor = self.documents_collection.find({
+            "sha256": sha256,
+            "status": DocumentStatus.INGESTED.value,
+            "ingest_signature": signature,
+            "_id": {"$ne": doc_id}
+        }).limit(3)
+        async for source in cursor:
+            try:
+                # The copy may live in another subject's collection
+                store = await self.qdrant_store.for_subject(source["subject_slug"])
+                chunks = await store.export_document(source["_id"])
+            except Exception as e:
+                self.logger.warning(f"Could not read vectors of duplicate {source['_id']}: {str(e)}")
+                continue
+            if chunks:
+                return source["_id"], chunks
+        return None
+
+    async def _download_pdf_from_s3(self, s3_key: str, should_stop=None, hasher=None) -> Optional[IO[bytes]]:
+        """
+        Stream a PDF from S3 into a memory-bounded spool (see download_to_spool); the caller closes it.
+        Returns None if the download fails; raises DownloadAborted when `should_stop` ended it.
+        """
         try:
-            response = self.s3_client.get_object(Bucket=settings.S3_BUCKET, Key=s3_key)
-            return response['Body'].read()
+            # boto3 is blocking, so the download runs in a thread; should_stop ends it between chunks
+            return await asyncio.to_thread(
+                download_to_spool, self.s3_client, settings.S3_BUCKET, s3_key, should_stop=should_stop, hasher=hasher
+            )
+        except DownloadAborted:
+            raise
         except Exception as e:
             self.logger.error(f"Failed to download {s3_key} from S3: {str(e)}")
             return None
-    
+
     def _map_subject_to_category(self, subject_slug: str) -> str:
         """Map subject slug to a standard category for Qdrant filtering"""
         # Simple mapping - could be more sophisticated
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import socket
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.models.ingestion import IngestionStatus
+from app.services.ingestion_batcher import IngestionBatcher
+from app.services.ingestion_cancel import CancellationToken, IngestionCanceled, register_job, unregister_job
+from app.services.ingestion_events import ingestion_events
+from app.services.ingestion_queue import IngestionQueue, notify_job_available, wait_for_job
+from app.utils.logger import Logger
+
+
+class IngestionWorkerPool:
+    """
+    `concurrency` worker coroutines that claim jobs from the IngestionQueue and run them.
+
+    Runs inside the API process (lifespan) or standalone (`python -m app.worker`);
+    any number of pools on any number of replicas can share one queue.
+    While a job runs its lease is renewed every `lease_seconds / 3`; if the lease
+    is lost the job task is cancelled. A job canceled through the API is interrupted
+    via its CancellationToken (see ingestion_cancel) and is not requeued. On close,
+    running jobs are cancelled and released back to the queue so another worker picks them up.
+    Every pool also requeues jobs whose lease expired (a replica crashed mid-job) every
+    `reap_seconds`; the next claim resumes them from their checkpoints. Pending S3 upload
+    batches (see IngestionBatcher) are turned into jobs once their debounce window closes.
+    """
+
+    def __init__(
+        self,
+        db,
+        concurrency: Optional[int] = None,
+        *,
+        poll_seconds: Optional[float] = None,
+        reap_seconds: Optional[float] = None,
+        queue: Optional[IngestionQueue] = None,
+    ):
+        self.logger = Logger()
+        self.db = db
+        self.concurrency = concurrency if concurrency is not None else settings.INGESTION_WORKERS
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.INGESTION_POLL_SECONDS
+        self.reap_seconds = reap_seconds if reap_seconds is not None else settings.INGESTION_REAP_SECONDS
+        self.queue = queue or IngestionQueue(db["ingestion_jobs"])
+        self.batcher = IngestionBatcher(db)
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._workers:
+            return
+        await self.queue.ensure_indexes()
+        self._workers = [
+            asyncio.create_task(self._worker_loop(f"{self.worker_prefix}:{n}"))
+            for n in range(self.concurrency)
+        ]
+        self._workers.append(asyncio.create_task(self._reaper_loop()))
+        self._workers.append(asyncio.create_task(self._batch_loop()))
+        self.logger.info(f"Ingestion worker pool started ({self.concurrency} workers, {self.worker_prefix})")
+
+    async def close(self):
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if workers:
+            self.logger.info("Ingestion worker pool stopped")
+
+    async def _worker_loop(self, worker_id: str):
+        while True:
+            try:
+                job = await self.queue.claim(worker_id)
+            except Exception as e:
+                self.logger.error(f"{worker_id}: claim failed: {e}")
+                job = None
+            if job is None:
+                await wait_for_job(self.poll_seconds)
+                continue
+            await self._run(job, worker_id)
+
+    async def _reaper_loop(self):
+        while True:
+            try:
+                if await self.queue.requeue_expired():
+                    notify_job_available()
+            except Exception as e:
+                self.logger.error(f"Stale lease check failed: {e}")
+            await asyncio.sleep(self.reap_seconds)
+
+    async def _batch_loop(self):
+        while True:
+            try:
+                # start_ingestion wakes the local workers itself
+                await self.batcher.flush_due()
+            except Exception as e:
+                self.logger.error(f"Batched ingestion flush failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _run(self, job: Dict[str, Any], worker_id: str):
+        # Imported here: the service pulls in S3/PDF/vector-store dependencies
+        from app.services.ingestion_service import IngestionService
+
+        job_task = asyncio.create_task(IngestionService(self.db).run_job(job))
+        token = register_job(job["_id"], self.queue.collection, job_task)
+        heartbeat = asyncio.create_task(self._heartbeat(job["_id"], worker_id, job_task, token))
+        try:
+            docs_done, vectors = await job_task
+            await self.queue.complete(job["_id"], worker_id, docs_done, vectors)
+            ingestion_events.close_job(job["_id"], IngestionStatus.COMPLETED.value, docs_done=docs_done, vectors=vectors, eta_seconds=0.0)
+        except IngestionCanceled:
+            # The cancel already set the status; the service recorded progress (and rollback)
+            self.logger.info(f"[Job {job['_id']}] Canceled on {worker_id}")
+            ingestion_events.close_job(job["_id"], IngestionStatus.CANCELED.value)
+        except asyncio.CancelledError:
+            if token.is_canceled() and job_task.done():
+                self.logger.info(f"[Job {job['_id']}] Canceled on {worker_id}")
+                ingestion_events.close_job(job["_id"], IngestionStatus.CANCELED.value)
+                return
+            if heartbeat.done():
+                # Lease lost: someone else owns (or canceled) the job; nothing to write back
+                self.logger.warning(f"[Job {job['_id']}] Lease lost; stopped on {worker_id}")
+                return
+            job_task.cancel()
+            await asyncio.gather(job_task, return_exceptions=True)
+            await asyncio.shield(self.queue.release(job["_id"], worker_id))
+            ingestion_events.close_job(job["_id"], IngestionStatus.QUEUED.value)
+            raise
+        except Exception as e:
+            status = await self.queue.fail(job, worker_id, f"{e.__class__.__name__}: {e}")
+            ingestion_events.close_job(job["_id"], status)
+        finally:
+            heartbeat.cancel()
+            unregister_job(job["_id"])
+
+    async def _heartbeat(self, job_id: str, worker_id: str, job_task: asyncio.Task, token: CancellationToken):
+        interval = max(self.queue.lease_seconds / 3, 0.05)
+        while not job_task.done():
+            await asyncio.sleep(interval)
+            try:
+                alive = await self.queue.heartbeat(job_id, worker_id)
+            except Exception as e:
+                # Transient Mongo error: keep working, the lease has slack for a missed beat
+                self.logger.warning(f"[Job {job_id}] Heartbeat failed: {e}")
+                continue
+            if not alive:
+                # Canceled from another replica: stop like a local cancel (honoring rollback);
+                # otherwise the lease went to someone else and the job just stops here
+                doc = await self.queue.collection.find_one({"_id": job_id}, {"status": 1, "cancel_rollback": 1})
+                if doc and doc.get("status") == IngestionStatus.CANCELED.value:
+                    token.cancel(bool(doc.get("cancel_rollback")))
+                else:
+                    job_task.cancel()
+                return
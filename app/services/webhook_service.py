@@ -0,0 +1,171 @@
+import asyncio
+import json
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote_plus
+from uuid import uuid4
+import boto3
+from botocore.exceptions import ClientError
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.models.documents import DocumentStatus
+from app.services.ingestion_batcher import IngestionBatcher, WEBHOOK_USER
+from app.utils.logger import Logger
+from app.core.config import settings
+
+# Keys written by the upload endpoints: "<subject>/<doc_id>_<file>" or "docentes/<subject>/<doc_id>_<file>"
+_DOC_ID_PREFIX = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_")
+
+
+class S3WebhookService:
+    """
+    Turns S3 ObjectCreated notifications (direct, or wrapped in an SNS envelope) into
+    batched ingestions:
+
+    - each delivery is recorded in `s3_events` under bucket/key/sequencer, so SNS or S3
+      retries of the same event are ignored;
+    - the object is checked with a HEAD request (forged or stale events are dropped);
+    - the key is mapped to its document, or a document is created for PDFs uploaded
+      straight to a subject's prefix; a known document that is not UPLOADED (failed, or
+      ingested before the object was replaced) is marked UPLOADED again;
+    - documents are handed to the IngestionBatcher, which coalesces them per subject.
+    """
+
+    _indexes_ready = False
+
+    def __init__(self, db, s3_client=None, batcher: Optional[IngestionBatcher] = None):
+        self.db = db
+        self.documents_collection = db["documents"]
+        self.events_collection = db["s3_events"]
+        self.logger = Logger()
+        self.s3_client = s3_client or boto3.client(
+            's3',
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_KEY,
+            region_name=settings.AWS_REGION
+        )
+        self.batcher = batcher or IngestionBatcher(db)
+
+    async def _ensure_indexes(self):
+        if S3WebhookService._indexes_ready:
+            return
+        # Delivery records only need to outlive the notification retry window
+        await self.events_collection.create_index(
+            [("received_at", ASCENDING)], expireAfterSeconds=int(settings.S3_WEBHOOK_EVENT_TTL_SECONDS)
+        )
+        await self.documents_collection.create_index("s3_key")
+        S3WebhookService._indexes_ready = True
+
+    @staticmethod
+    def object_created_records(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """ObjectCreated records of a notification; SNS envelopes are unwrapped, test events ignored."""
+        if payload.get("Type") == "Notification" and isinstance(payload.get("Message"), str):
+            try:
+                payload = json.loads(payload["Message"])
+            except ValueError:
+                return []
+        return [
+            r for r in payload.get("Records") or []
+            if str(r.get("eventName", "")).startswith("ObjectCreated:") and r.get("s3")
+        ]
+
+    async def handle_notification(self, payload: Dict[str, Any]) -> Dict[str, int]:
+        """Process one notification; returns counts of queued, duplicate and ignored records."""
+        if payload.get("Type") == "SubscriptionConfirmation":
+            # Not fetched automatically: confirming is an operator decision
+            self.logger.warning(f"SNS subscription confirmation received; confirm it at {payload.get('SubscribeURL')}")
+            return {"queued": 0, "duplicates": 0, "ignored": 0}
+
+        await self._ensure_indexes()
+        counts = {"queued": 0, "duplicates": 0, "ignored": 0}
+        by_subject: Dict[str, List[str]] = defaultdict(list)
+        for record in self.object_created_records(payload):
+            bucket = record["s3"].get("bucket", {}).get("name")
+            obj = record["s3"].get("object", {})
+            key = unquote_plus(obj.get("key", ""))
+            if bucket != settings.S3_BUCKET or not key:
+                counts["ignored"] += 1
+                continue
+            event_id = f"{bucket}/{key}@{obj.get('sequencer') or obj.get('eTag') or ''}"
+            if not await self._first_delivery(event_id):
+                counts["duplicates"] += 1
+                continue
+            try:
+                doc = await self._document_for(key)
+            except Exception:
+                # Let the sender's retry through: the failure may be transient
+                await self.events_collection.delete_one({"_id": event_id})
+                raise
+            if doc is None:
+                counts["ignored"] += 1
+                continue
+            by_subject[doc["subject_slug"]].append(doc["_id"])
+            counts["queued"] += 1
+
+        for subject_slug, doc_ids in by_subject.items():
+            await self.batcher.add(subject_slug, doc_ids)
+        self.logger.info(f"S3 notification processed: {counts}")
+        return counts
+
+    async def _first_delivery(self, event_id: str) -> bool:
+        try:
+            await self.events_collection.insert_one({"_id": event_id, "received_at": datetime.utcnow()})
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _document_for(self, key: str) -> Optional[dict]:
+        """The document stored at `key` (created if a PDF landed under a known subject), or None."""
+        try:
+            head = await asyncio.to_thread(self.s3_client.head_object, Bucket=settings.S3_BUCKET, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                raise
+            self.logger.warning(f"Ignoring notification for missing object {key}")
+            return None
+
+        doc = await self.documents_collection.find_one({"s3_key": key})
+        if doc is not None and doc.get("status") != DocumentStatus.UPLOADED.value:
+            # New content at the key (e.g. a presigned upload whose earlier ingestion failed because
+            # the object was not there yet): make it pending again, or the SELECTED job skips it.
+            # The recorded hash may be of the old content; ingestion hashes the download instead.
+            doc = await self.documents_collection.find_one_and_update(
+                {"_id": doc["_id"]},
+                {"$set": {"status": DocumentStatus.UPLOADED.value, "size": head.get("ContentLength", doc.get("size", 0))},
+                 "$unset": {"sha256": ""}},
+                return_document=ReturnDocument.AFTER
+            )
+        if doc is not None:
+            return doc
+
+        subject_slug = self._subject_from_key(key)
+        if not subject_slug or not key.lower().endswith(".pdf"):
+            return None
+        if not await self.db["subjects"].find_one({"slug": subject_slug}, {"_id": 1}):
+            return None
+        filename = _DOC_ID_PREFIX.sub("", key.rsplit("/", 1)[-1])
+        # Upsert on the key: concurrent deliveries for one object create one document
+        return await self.documents_collection.find_one_and_update(
+            {"s3_key": key},
+            {"$setOnInsert": {
+                "_id": str(uuid4()),
+                "subject_slug": subject_slug,
+                "filename": filename,
+                "mime": head.get("ContentType") or "application/pdf",
+                "size": head.get("ContentLength", 0),
+                "status": DocumentStatus.UPLOADED.value,
+                "created_at": datetime.utcnow(),
+                "created_by": WEBHOOK_USER.id
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _subject_from_key(key: str) -> Optional[str]:
+        parts = key.split("/")
+        if parts[0] == "docentes":
+            parts = parts[1:]
+        return parts[0] if len(parts) >= 2 and parts[0] else None
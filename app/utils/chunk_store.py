@@ -0,0 +1,67 @@
+import zlib
+from typing import Dict, Iterable, List
+from bson.binary import Binary
+from pymongo import UpdateOne
+from app.utils.logger import Logger
+
+
+class ChunkTextStore:
+    """
+    Chunk text kept outside Qdrant, in a Mongo collection keyed by point ID.
+
+    - Value: zlib-compressed UTF-8 text as BSON binary (PDF text compresses ~3x).
+    - `doc_id` is stored alongside so a document's texts can be dropped in one call.
+    - Reads are one `$in` query per search, only for the final top-k hits.
+    """
+
+    _indexes_ready = False
+
+    def __init__(self, collection, compression_level: int = 6):
+        self.logger = Logger()
+        self.collection = collection
+        self.compression_level = compression_level
+
+    async def _ensure_indexes(self):
+        if ChunkTextStore._indexes_ready:
+            return
+        await self.collection.create_index("doc_id")
+        ChunkTextStore._indexes_ready = True
+
+    async def put_many(self, items: Iterable[Dict[str, str]]):
+        """Store texts; each item has `point_id`, `doc_id` and `text` (idempotent upserts)."""
+        ops = [
+            UpdateOne(
+                {"_id": item["point_id"]},
+                {"$set": {
+                    "doc_id": item.get("doc_id"),
+                    "text": Binary(zlib.compress(item["text"].encode("utf-8"), self.compression_level)),
+                }},
+                upsert=True,
+            )
+            for item in items
+        ]
+        if not ops:
+            return
+        await self._ensure_indexes()
+        await self.collection.bulk_write(ops, ordered=False)
+
+    async def get_many(self, point_ids: List[str]) -> Dict[str, str]:
+        """Return {point_id: text} for every stored ID (missing IDs are simply absent)."""
+        if not point_ids:
+            return {}
+        found: Dict[str, str] = {}
+        cursor = self.collection.find({"_id": {"$in": list(set(point_ids))}}, {"text": 1})
+        async for doc in cursor:
+            found[doc["_id"]] = zlib.decompress(doc["text"]).decode("utf-8")
+        self.logger.debug(f"Chunk store: fetched {len(found)}/{len(set(point_ids))} texts")
+        return found
+
+    async def delete_many(self, point_ids: List[str]):
+        if point_ids:
+            await self.collection.delete_many({"_id": {"$in": list(point_ids)}})
+
+    async def delete_by_doc(self, doc_id: str):
+        await self.collection.delete_many({"doc_id": doc_id})
+
+    async def delete_by_docs(self, doc_ids: List[str]):
+        await self.collection.delete_many({"doc_id": {"$in": list(doc_ids)}})
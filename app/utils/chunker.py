@@ -0,0 +1,122 @@
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+from app.core.config import settings
+from app.utils.embeddings import loaded_embedders
+
+# The embedder truncates at 512 tokens including [CLS]/[SEP]; longer chunks would lose their tail
+MAX_CHUNK_TOKENS = 510
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Sentence end: . ! ? followed by whitespace and something that starts a sentence
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[¿¡]?[A-ZÁÉÍÓÚÑÜ0-9])")
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+TokenCounter = Callable[[str], int]
+
+
+def approximate_token_count(text: str) -> int:
+    """Words plus punctuation marks: close to WordPiece counts for prose, no tokenizer needed."""
+    return len(_APPROX_TOKEN.findall(text))
+
+
+def embedder_token_counter() -> TokenCounter:
+    """Count with the loaded embedding model's tokenizer; fall back to the approximation (never loads the model)."""
+    embedder = loaded_embedders().get(f"{settings.EMBEDDING_MODEL_NAME}:{settings.EMBEDDING_BACKEND}")
+    if embedder is None or not embedder.is_loaded:
+        return approximate_token_count
+    tokenizer = embedder.tokenizer
+    return lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def _segments(page_text: str, count_tokens: TokenCounter, max_tokens: int) -> Iterator[Tuple[str, int, bool]]:
+    """(sentence, tokens, ends_paragraph) for one page; sentences longer than max_tokens are split between words."""
+    for paragraph in _PARAGRAPH_BREAK.split(page_text):
+        # PDF extraction breaks lines inside paragraphs; keep the words, drop the layout
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        sentences = _SENTENCE_BREAK.split(paragraph)
+        for i, sentence in enumerate(sentences):
+            last = i == len(sentences) - 1
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield sentence, tokens, last
+                continue
+            words = sentence.split(" ")
+            piece: List[str] = []
+            piece_tokens = 0
+            for word in words:
+                word_tokens = count_tokens(word)
+                if piece and piece_tokens + word_tokens > max_tokens:
+                    yield " ".join(piece), piece_tokens, False
+                    piece, piece_tokens = [], 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            if piece:
+                yield " ".join(piece), piece_tokens, last
+
+
+def chunk_pages(
+    pages: Iterable[str],
+    *,
+    chunk_size: int,
+    chunk_overlap: int = 0,
+    count_tokens: TokenCounter = approximate_token_count,
+    paragraph_fill: float = 0.75,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield chunks of at most `chunk_size` tokens from per-page text, one page at a time.
+
+    Chunks end on sentence boundaries (words only when a single sentence is too long),
+    and early on a paragraph boundary once `paragraph_fill` of the budget is used. Each
+    chunk starts with the last sentences of the previous one, up to `chunk_overlap`
+    tokens. Yields {"text", "chunk_id", "page_start", "page_end", "tokens"}, pages 1-based.
+    """
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_TOKENS))
+    chunk_overlap = max(0, min(chunk_overlap, chunk_size // 2))
+    window: List[Tuple[str, int, int, bool]] = []  # (sentence, tokens, page, ends_paragraph)
+    window_tokens = 0
+    fresh = 0  # sentences in the window not yet emitted (the rest is overlap)
+    chunk_id = 0
+
+    def emit() -> Dict[str, Any]:
+        nonlocal window, window_tokens, fresh, chunk_id
+        parts: List[str] = []
+        for i, (sentence, _, _, ends_paragraph) in enumerate(window):
+            parts.append(sentence)
+            if i < len(window) - 1:
+                parts.append("\n\n" if ends_paragraph else " ")
+        chunk = {
+            "text": "".join(parts),
+            "chunk_id": chunk_id,
+            "page_start": window[0][2],
+            "page_end": window[-1][2],
+            "tokens": window_tokens,
+        }
+        chunk_id += 1
+        # Carry whole trailing sentences into the next chunk as overlap
+        carried: List[Tuple[str, int, int, bool]] = []
+        carried_tokens = 0
+        for segment in reversed(window):
+            if carried_tokens + segment[1] > chunk_overlap:
+                break
+            carried.insert(0, segment)
+            carried_tokens += segment[1]
+        window, window_tokens, fresh = carried, carried_tokens, 0
+        return chunk
+
+    for page_number, page_text in enumerate(pages, start=1):
+        for sentence, tokens, ends_paragraph in _segments(page_text or "", count_tokens, chunk_size):
+            if fresh and window_tokens + tokens > chunk_size:
+                yield emit()
+            # Overlap that cannot fit next to this sentence is dropped rather than overflow
+            while window and window_tokens + tokens > chunk_size:
+                window_tokens -= window.pop(0)[1]
+            window.append((sentence, tokens, page_number, ends_paragraph))
+            window_tokens += tokens
+            fresh += 1
+            if ends_paragraph and window_tokens >= chunk_size * paragraph_fill:
+                yield emit()
+
+    if fresh:
+        yield emit()
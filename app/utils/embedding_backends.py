@@ -0,0 +1,139 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict
+import numpy as np
+from app.utils.logger import Logger
+
+# Max cosine distance allowed between a backend's vector and the fp32 torch vector
+# for the same text; within it, vectors can share a collection built by the torch
+# path. Enforced by tests/test_embedding_backends.py on chunks from data/.
+ONNX_INT8_COSINE_TOLERANCE = 0.02
+# fp32 ONNX export is numerically equivalent to torch up to float rounding
+ONNX_FP32_COSINE_TOLERANCE = 1e-4
+
+
+class EmbeddingBackend(ABC):
+    """
+    Runs the transformer forward pass for already tokenized inputs.
+
+    Tokenization stays in Embedder so every backend sees identical input ids
+    and returns the same CLS-token pooling the existing collection was built with.
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def encode(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        """Return a (batch, dim) float32 array of CLS embeddings."""
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        try:
+            from transformers import AutoModel
+            import torch
+        except ImportError:
+            raise ImportError("Please install transformers and torch: pip install transformers torch")
+        self.torch = torch
+        self.model = AutoModel.from_pretrained(model_name)
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model.to(self.device)
+        self.model.eval()
+
+    def encode(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        tensors = {k: self.torch.from_numpy(v).to(self.device) for k, v in inputs.items()}
+        with self.torch.no_grad():
+            outputs = self.model(**tensors)
+        return outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    ONNX Runtime CPU backend, optionally with int8 dynamic (weight-only) quantization.
+
+    The model is exported from the Hugging Face checkpoint on first use and cached
+    under `onnx_dir`; later processes load the cached file without torch.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, onnx_dir: str = "models/onnx", quantize: bool = True, num_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("Please install onnxruntime: pip install onnxruntime")
+        self.logger = Logger()
+        self.quantize = quantize
+        if quantize:
+            self.name = "onnx-int8"
+
+        model_dir = Path(onnx_dir) / model_name.replace("/", "__")
+        fp32_path = model_dir / "model.onnx"
+        int8_path = model_dir / "model.int8.onnx"
+        if not fp32_path.exists():
+            self._export(model_name, fp32_path)
+        if quantize and not int8_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+            self.logger.info(f"Quantized ONNX model written to {int8_path}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(int8_path if quantize else fp32_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _export(self, model_name: str, path: Path):
+        try:
+            from transformers import AutoModel, AutoTokenizer
+            import torch
+        except ImportError:
+            raise ImportError("Exporting to ONNX needs transformers and torch: pip install transformers torch")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        sample = tokenizer(["warm up"], return_tensors="pt")
+        # Positional order must follow the model's forward() signature
+        names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[n] for n in names),
+                str(path),
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        self.logger.info(f"Exported {model_name} to ONNX at {path}")
+
+    def encode(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        feed = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+        (last_hidden_state,) = self.session.run(["last_hidden_state"], feed)
+        return last_hidden_state[:, 0, :].astype(np.float32)
+
+
+def create_backend(
+    backend: str,
+    model_name: str,
+    *,
+    onnx_dir: str = "models/onnx",
+    onnx_quantize: bool = True,
+    onnx_threads: int = 0,
+) -> EmbeddingBackend:
+    if backend == "torch":
+        return TorchBackend(model_name)
+    if backend == "onnx":
+        return OnnxBackend(model_name, onnx_dir=onnx_dir, quantize=onnx_quantize, num_threads=onnx_threads)
+    raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'torch' or 'onnx')")
@@ -0,0 +1,142 @@
+import hashlib
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from bson.binary import Binary
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.utils.embeddings import embedding_model_id
+from app.utils.logger import Logger
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache stored in a Mongo collection.
+
+    - Key: sha256 of (model id, normalized chunk text), so unchanged chunks
+      re-ingested under REINGEST/ALL hit the cache instead of the model.
+    - Value: float32 vector packed as BSON binary (1.5 KB for 384 dims).
+    - Eviction: TTL index on `last_used_at`, refreshed on every hit, so entries
+      unused for `ttl_days` are dropped (LRU by age); past `max_entries`, each write
+      also drops the least recently used entries, so the collection stays bounded
+      even when the corpus grows faster than entries expire.
+    """
+
+    _indexes_ready = False
+
+    def __init__(
+        self,
+        collection,
+        model_id: Optional[str] = None,
+        ttl_days: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.logger = Logger()
+        self.collection = collection
+        self.model_id = model_id or embedding_model_id()
+        self.ttl_days = ttl_days if ttl_days is not None else settings.EMBEDDING_CACHE_TTL_DAYS
+        self.max_entries = max_entries if max_entries is not None else settings.EMBEDDING_CACHE_MAX_ENTRIES
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Unicode-normalize and collapse whitespace so cosmetic PDF differences still hit."""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\x00{self.normalize(text)}".encode("utf-8")).hexdigest()
+
+    async def _ensure_indexes(self):
+        if EmbeddingCache._indexes_ready:
+            return
+        await self.collection.create_index(
+            "last_used_at", expireAfterSeconds=int(self.ttl_days * 24 * 3600)
+        )
+        EmbeddingCache._indexes_ready = True
+
+    async def get_many(self, texts: List[str]) -> Dict[int, List[float]]:
+        """Return {index in texts: vector} for every text already cached."""
+        if not texts:
+            return {}
+        await self._ensure_indexes()
+        keys = [self.key(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        cursor = self.collection.find({"_id": {"$in": list(set(keys))}}, {"vector": 1})
+        async for doc in cursor:
+            found[doc["_id"]] = np.frombuffer(doc["vector"], dtype=np.float32).tolist()
+
+        if found:
+            await self.collection.update_many(
+                {"_id": {"$in": list(found)}},
+                {"$set": {"last_used_at": datetime.utcnow()}},
+            )
+        self.logger.debug(f"Embedding cache: {len(found)}/{len(set(keys))} hits")
+        return {i: found[k] for i, k in enumerate(keys) if k in found}
+
+    async def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Store freshly computed vectors (idempotent upserts)."""
+        if not texts:
+            return
+        await self._ensure_indexes()
+        now = datetime.utcnow()
+        ops = {}
+        for text, vec in zip(texts, vectors):
+            k = self.key(text)
+            ops[k] = UpdateOne(
+                {"_id": k},
+                {"$set": {
+                    "model": self.model_id,
+                    "vector": Binary(np.asarray(vec, dtype=np.float32).tobytes()),
+                    "last_used_at": now,
+                }},
+                upsert=True,
+            )
+        await self.collection.bulk_write(list(ops.values()), ordered=False)
+        await self._evict_overflow()
+
+    async def _evict_overflow(self):
+        """Drop the least recently used entries beyond `max_entries` (0 = unbounded)."""
+        if self.max_entries <= 0:
+            return
+        overflow = await self.collection.estimated_document_count() - self.max_entries
+        if overflow <= 0:
+            return
+        # Served by the TTL index on last_used_at
+        cursor = self.collection.find({}, {"_id": 1}).sort("last_used_at", 1).limit(overflow)
+        stale = [doc["_id"] async for doc in cursor]
+        if stale:
+            await self.collection.delete_many({"_id": {"$in": stale}})
+            self.logger.debug(f"Embedding cache: evicted {len(stale)} least recently used entries")
+
+
+async def embed_with_cache(texts: List[str], executor, cache: Optional[EmbeddingCache], logger: Logger) -> List[List[float]]:
+    """
+    Embed `texts` through `executor`, serving unchanged texts from `cache` when given.
+    Cache failures only cost the lookup: everything is embedded as if uncached.
+    """
+    if cache is None:
+        return await executor.embed_many(texts)
+
+    try:
+        cached = await cache.get_many(texts)
+    except Exception as e:
+        logger.warning(f"Embedding cache lookup failed, embedding all texts: {e}")
+        cached = {}
+
+    miss_idx = [i for i in range(len(texts)) if i not in cached]
+    miss_texts = [texts[i] for i in miss_idx]
+    fresh = await executor.embed_many(miss_texts) if miss_texts else []
+    logger.info(f"Embedding cache: {len(cached)} hits, {len(miss_texts)} misses")
+
+    if miss_texts:
+        try:
+            await cache.put_many(miss_texts, fresh)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    vectors: List[Optional[List[float]]] = [None] * len(texts)
+    for i, vec in cached.items():
+        vectors[i] = vec
+    for i, vec in zip(miss_idx, fresh):
+        vectors[i] = vec
+    return vectors
@@ -0,0 +1,194 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.embeddings import Embedder, get_embedder
+from app.utils.logger import Logger
+
+# Short and long inputs, so warm-up exercises both a tiny and a padded batch shape
+WARMUP_TEXTS = [
+    "warm-up",
+    "Ley de Ohm: la corriente es proporcional a la tension aplicada. " * 24,
+]
+
+
+class EmbeddingQueueFullError(RuntimeError):
+    """Raised when too many query embeddings are already waiting for the model."""
+
+
+class EmbeddingExecutor:
+    """
+    Runs the (blocking) embedding model on a dedicated thread so it never stalls the event loop.
+
+    - `embed(text)`: single-query API. Concurrent callers are coalesced for up to
+      `max_wait_ms` into one padded batch of at most `max_batch_size` texts.
+    - `embed_many(texts)`: bulk API for ingestion, split into slices of
+      `bulk_slice_size` so pending queries can interleave with long ingestion runs
+      (each slice is length-bucketed by Embedder.generate).
+    - At most `max_queue_depth` queries may wait; beyond that `embed` raises
+      EmbeddingQueueFullError so callers can shed load instead of queueing forever.
+    """
+
+    def __init__(
+        self,
+        embedder_provider: Callable[[], Embedder] = get_embedder,
+        *,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue_depth: int = 256,
+        bulk_slice_size: int = 256,
+    ):
+        self.logger = Logger()
+        self.embedder_provider = embedder_provider
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_depth = max_queue_depth
+        self.bulk_slice_size = bulk_slice_size
+        # One thread: the model is not re-entrant and torch already parallelizes each forward pass
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.warmed_up = False
+
+    # ----------------------- Lifecycle -----------------------
+
+    async def start(self):
+        """Start the batching worker on the running loop (idempotent)."""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        self._worker = loop.create_task(self._batch_loop())
+        self.logger.info(
+            f"Embedding executor started (max_batch={self.max_batch_size}, "
+            f"max_wait={self.max_wait * 1000:.1f}ms, max_queue={self.max_queue_depth})"
+        )
+
+    async def close(self):
+        """Stop the worker and fail any query still waiting."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, fut = self._queue.get_nowait()
+                if not fut.done():
+                    fut.set_exception(RuntimeError("Embedding executor closed"))
+            self._queue = None
+        self._pool.shutdown(wait=False)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+
+    async def warm_up(self, rounds: int = 2) -> bool:
+        """
+        Run a few throwaway batches so the first real request does not pay for lazy
+        kernel selection, allocator growth and thread-pool start-up.
+        Returns (and records in `warmed_up`) whether the model produced vectors.
+        """
+        start = time.perf_counter()
+        try:
+            for _ in range(rounds):
+                await self._run(WARMUP_TEXTS)
+                await self._run(WARMUP_TEXTS[:1])
+        except Exception as e:
+            self.logger.error(f"Embedding warm-up failed: {e}")
+            self.warmed_up = False
+            return False
+        self.warmed_up = True
+        self.logger.info(f"Embedding warm-up done in {time.perf_counter() - start:.2f}s")
+        return True
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # ----------------------- Public API -----------------------
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single query, batched together with other concurrent queries."""
+        await self.start()
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((text, fut))
+        except asyncio.QueueFull:
+            raise EmbeddingQueueFullError(
+                f"Embedding queue is full ({self.max_queue_depth} pending queries)"
+            )
+        return await fut
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts off the event loop, preserving input order."""
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), self.bulk_slice_size):
+            batch = texts[i:i + self.bulk_slice_size]
+            vectors.extend(await self._run(batch))
+        return vectors
+
+    # ----------------------- Internals -----------------------
+
+    async def _run(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        embedder = await loop.run_in_executor(self._pool, self.embedder_provider)
+        vectors = await loop.run_in_executor(self._pool, embedder.generate, texts)
+        if len(vectors) != len(texts):
+            # Embedder.generate logs and swallows model errors, returning a short list
+            raise RuntimeError(f"Embedding failed: got {len(vectors)} vectors for {len(texts)} texts")
+        return vectors
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self):
+        while True:
+            batch = await self._collect_batch()
+            # Skip callers that gave up (e.g. request cancelled) while waiting
+            live = [(text, fut) for text, fut in batch if not fut.done()]
+            if not live:
+                continue
+            self.logger.debug(f"Embedding micro-batch of {len(live)} queries")
+            try:
+                vectors = await self._run([text for text, _ in live])
+            except Exception as e:
+                for _, fut in live:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), vec in zip(live, vectors):
+                if not fut.done():
+                    fut.set_result(vec)
+
+
+_executor: Optional[EmbeddingExecutor] = None
+
+
+def get_embedding_executor() -> EmbeddingExecutor:
+    """Process-wide executor shared by every QdrantStore."""
+    global _executor
+    if _executor is None:
+        _executor = EmbeddingExecutor(
+            max_batch_size=settings.EMBEDDING_EXECUTOR_MAX_BATCH,
+            max_wait_ms=settings.EMBEDDING_EXECUTOR_MAX_WAIT_MS,
+            max_queue_depth=settings.EMBEDDING_EXECUTOR_MAX_QUEUE,
+            bulk_slice_size=settings.EMBEDDING_EXECUTOR_BULK_SLICE,
+        )
+    return _executor
@@ -1,40 +1,184 @@
 # src/agentic_rag/ingestion/embedder.py
-from transformers import AutoTokenizer, AutoModel
-import torch
-from typing import List
+import os
+import resource
+import threading
+import time
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.utils.embedding_backends import EmbeddingBackend, create_backend
 from app.utils.logger import Logger
 from app.utils.error_handler import ErrorHandler
 
 class Embedder:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        backend: str = "torch",
+        onnx_quantize: Optional[bool] = None,
+    ):
         self.logger = Logger()
         self.error_handler = ErrorHandler(self.logger)
+        self.model_name = model_name
+        self.backend_name = backend
+        self.onnx_quantize = settings.EMBEDDING_ONNX_QUANTIZE if onnx_quantize is None else onnx_quantize
+        self.backend: Optional[EmbeddingBackend] = None
         try:
+            # Imported lazily so the API can start (and be tested) without the model stack installed
+            from transformers import AutoTokenizer
+
             self.embedding_size = 384  # Dimension for all-MiniLM-L6-v2
-            self.logger.debug(f"Loading embedding model: {model_name}")
+            self.logger.debug(f"Loading embedding model: {model_name} (backend={backend})")
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModel.from_pretrained(model_name)
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model.to(self.device)
-            self.logger.info(f"Loaded embedding model: {model_name}")
+            self.backend = create_backend(
+                backend,
+                model_name,
+                onnx_dir=settings.EMBEDDING_ONNX_DIR,
+                onnx_quantize=self.onnx_quantize,
+                onnx_threads=settings.EMBEDDING_ONNX_THREADS,
+            )
+            self.logger.info(f"Loaded embedding model: {model_name} (backend={self.backend.name})")
         except Exception as e:
             self.error_handler.handle(e, context="Embedder.__init__")
 
-    def generate(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
-        self.logger.debug(f"Generating embeddings for {len(texts)} texts with batch size {batch_size}")
-        embeddings = []
+    @property
+    def is_loaded(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def model_id(self) -> str:
+        """Id of the vectors this embedder produces, honouring its own quantize override."""
+        return embedding_model_id(self.model_name, self.backend_name, onnx_quantize=self.onnx_quantize)
+
+    def generate(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ) -> List[List[float]]:
+        """
+        Embed `texts`, returning vectors in input order.
+
+        Texts are tokenized once, sorted by token length and packed into batches whose
+        padded size (items x longest item) stays within `token_budget`, with at most
+        `batch_size` items each, so short chunks are not padded up to long ones.
+        """
+        batch_size = batch_size or settings.EMBEDDING_MAX_BATCH_SIZE
+        token_budget = token_budget or settings.EMBEDDING_TOKEN_BUDGET
+        self.logger.debug(f"Generating embeddings for {len(texts)} texts (max batch {batch_size}, token budget {token_budget})")
+        if not texts:
+            return []
         try:
-            for i in range(0, len(texts), batch_size):
-                self.logger.debug(f"Processing batch {i // batch_size + 1}")
-                batch = texts[i:i+batch_size]
-                inputs = self.tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=512)
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                batch_embeddings = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-                embeddings.extend(batch_embeddings)
+            encodings = self.tokenizer(list(texts), truncation=True, max_length=512)
+            lengths = [len(ids) for ids in encodings["input_ids"]]
+            embeddings: List[Optional[List[float]]] = [None] * len(texts)
+            for n, batch in enumerate(plan_token_batches(lengths, token_budget, batch_size), start=1):
+                self.logger.debug(f"Processing batch {n}: {len(batch)} texts x {lengths[batch[-1]]} tokens")
+                features = [{k: encodings[k][i] for k in encodings.keys()} for i in batch]
+                inputs = self.tokenizer.pad(features, return_tensors="np")
+                batch_embeddings = self.backend.encode(dict(inputs))
+                for i, vec in zip(batch, batch_embeddings.tolist()):
+                    embeddings[i] = vec
             self.logger.info(f"Generated embeddings for {len(texts)} texts.")
+            return embeddings
         except Exception as e:
             self.error_handler.handle(e, context="Embedder.generate")
-        return embeddings
+            return []
+
+
+def plan_token_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Group indices of `lengths` into length-sorted batches.
+
+    Each batch satisfies len(batch) * max(length in batch) <= token_budget (a single
+    over-budget item still gets its own batch) and len(batch) <= max_batch_size.
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for idx in order:
+        # Ascending order, so the new item is the longest in the batch
+        if current and ((len(current) + 1) * lengths[idx] > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
+
+
+# ----------------------- Process-wide registry -----------------------
+
+logger = Logger()
+_embedders: Dict[str, Embedder] = {}
+_embedders_lock = threading.Lock()
+
+
+def _current_rss_mb() -> float:
+    """Resident set size of this process in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def embedding_model_id(
+    model_name: Optional[str] = None,
+    backend: Optional[str] = None,
+    onnx_quantize: Optional[bool] = None,
+) -> str:
+    """
+    Identifier for the vectors a model/backend pair produces (used to scope caches).
+
+    torch and fp32 ONNX produce the same vectors up to rounding, so they share an id;
+    int8 ONNX vectors are only close, so they get their own. Arguments left as None
+    fall back to the settings, as they do for Embedder.
+    """
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    backend = backend or settings.EMBEDDING_BACKEND
+    if onnx_quantize is None:
+        onnx_quantize = settings.EMBEDDING_ONNX_QUANTIZE
+    if backend == "onnx" and onnx_quantize:
+        return f"{model_name}#onnx-int8"
+    return model_name
+
+
+def get_embedder(model_name: Optional[str] = None, backend: Optional[str] = None) -> Embedder:
+    """
+    Return the process-wide Embedder for `model_name`/`backend`, loading it on first use.
+
+    Every QdrantStore (and anything else that needs embeddings) shares the same
+    tokenizer/model pair instead of loading its own copy per request.
+    """
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    backend = backend or settings.EMBEDDING_BACKEND
+    key = f"{model_name}:{backend}"
+    embedder = _embedders.get(key)
+    if embedder is not None:
+        return embedder
+
+    with _embedders_lock:
+        embedder = _embedders.get(key)
+        if embedder is not None:
+            return embedder
+
+        rss_before = _current_rss_mb()
+        start = time.perf_counter()
+        embedder = Embedder(model_name, backend=backend)
+        embedder.load_seconds = time.perf_counter() - start
+        embedder.load_rss_mb = _current_rss_mb() - rss_before
+
+        if embedder.is_loaded:
+            # Only cache successful loads so a transient failure can be retried
+            _embedders[key] = embedder
+            logger.info(
+                f"Embedding model '{model_name}' ({embedder.backend.name}) ready in {embedder.load_seconds:.2f}s "
+                f"(+{embedder.load_rss_mb:.0f} MB RSS, process RSS {_current_rss_mb():.0f} MB)"
+            )
+        return embedder
+
 
+def loaded_embedders() -> Dict[str, Embedder]:
+    """Snapshot of the embedders currently held in the registry."""
+    return dict(_embedders)
@@ -0,0 +1,590 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from app.core.config import settings
+from app.utils.embeddings import Embedder, get_embedder
+from app.utils.embedding_executor import EmbeddingExecutor, get_embedding_executor
+from app.utils.embedding_cache import EmbeddingCache, embed_with_cache
+from app.utils.qdrant_client import BatchCallback, chunk_content_hash, chunk_point_id, plan_document_sync, search_hit
+from app.utils.logger import Logger
+from app.utils.error_handler import ErrorHandler
+
+# One open store per collection directory, shared by every service instance in the process
+_OPEN_STORES: Dict[Path, "NumpyVectorStore"] = {}
+
+
+class NumpyVectorStore:
+    """
+    In-process vector store with the same surface as QdrantStore, for small subjects,
+    local development and CI (no Qdrant server needed).
+
+    - Vectors: unit-normalized float32/float16 rows in a memory-mapped .npy file
+      (`vectors.npy`), grown by doubling; search is brute-force cosine top-k in blocks.
+      float16 halves disk and page-cache use but pays a float32 conversion per search
+      (see benchmarks/vector_stores.py), so prefer float32 unless memory is the limit.
+    - Payloads: append-only JSONL log (`payloads.jsonl`) of put/delete records, replayed
+      on open; each batch appends only its own records, and the log is compacted to one
+      record per live row once it holds more than twice as many records as rows.
+    - Filters: subject and doc_id are kept as integer codes per row, so subject /
+      doc_ids_any masks (and per-document lookups) are vectorized; topics_any is
+      checked against the payloads.
+    - Search streams the matrix in blocks, keeping a running top-k per query, so memory
+      is bounded by QUERY_BLOCK x BLOCK_ROWS scores however many rows or queries there are.
+    - Dense retrieval only: sparse/hybrid search modes fall back to dense.
+    - Multi-collection: one directory per collection; `for_subject` routes like QdrantStore.
+    """
+
+    BLOCK_ROWS = 8192  # rows scored per matmul; keeps the float32 copy of float16 rows cache-sized
+    QUERY_BLOCK = 256  # queries scored together against each row block
+    COMPACT_MIN_RECORDS = 4096  # never compact logs smaller than this
+
+    def __init__(
+        self,
+        collection_name: str,
+        root_dir: Optional[str] = None,
+        dtype: Optional[str] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        collection_resolver: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+    ):
+        self.logger = Logger()
+        self.error_handler = ErrorHandler(self.logger)
+        self.collection_name = collection_name
+        self.root_dir = Path(root_dir or settings.NUMPY_STORE_DIR)
+        self.path = self.root_dir / collection_name
+        self.dtype = np.dtype(dtype or settings.NUMPY_STORE_DTYPE)
+        self.embedding_cache = embedding_cache
+        self.collection_resolver = collection_resolver
+        self._vectors: Optional[np.memmap] = None
+        self._opened = False
+        self._ids: List[str] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        # Integer code per distinct subject/doc_id value, and the codes of every row
+        self._codes: Dict[Optional[str], int] = {}
+        self._subject_codes = np.full(0, -1, dtype=np.int32)
+        self._doc_codes = np.full(0, -1, dtype=np.int32)
+        self._log_pending: List[Dict[str, Any]] = []
+        self._log_records = 0
+        self._lock = asyncio.Lock()
+        self.logger.info(f"NumPy vector store ready for '{self.collection_name}' at {self.path}")
+
+    @property
+    def embedder(self) -> Embedder:
+        # Loads the model synchronously on first access; nothing here needs it (see init_store)
+        return get_embedder()
+
+    @property
+    def embedding_executor(self) -> EmbeddingExecutor:
+        return get_embedding_executor()
+
+    # ----------------------- Routing -----------------------
+
+    async def collection_for(self, subject_slug: Optional[str]) -> str:
+        if subject_slug and self.collection_resolver is not None:
+            name = await self.collection_resolver(subject_slug)
+            if name:
+                return name
+        return self.collection_name
+
+    def for_collection(self, collection_name: str) -> "NumpyVectorStore":
+        path = self.root_dir / collection_name
+        store = _OPEN_STORES.get(path)
+        if store is None:
+            store = NumpyVectorStore(
+                collection_name,
+                root_dir=str(self.root_dir),
+                dtype=self.dtype.name,
+                embedding_cache=self.embedding_cache,
+                collection_resolver=self.collection_resolver,
+            )
+            _OPEN_STORES[path] = store
+        return store
+
+    async def for_subject(self, subject_slug: Optional[str], *, create: bool = False) -> "NumpyVectorStore":
+        store = self.for_collection(await self.collection_for(subject_slug))
+        if create:
+            await store.ensure_collection()
+        return store
+
+    async def ensure_collection(self):
+        await self.init_store()
+
+    # ----------------------- Setup -----------------------
+
+    @property
+    def _vectors_file(self) -> Path:
+        return self.path / "vectors.npy"
+
+    @property
+    def _log_file(self) -> Path:
+        return self.path / "payloads.jsonl"
+
+    @property
+    def _legacy_payloads_file(self) -> Path:
+        # Single JSON document rewritten on every write, used by earlier versions
+        return self.path / "payloads.json"
+
+    async def init_store(self, vector_size: Optional[int] = None):
+        """
+        Open (or create) the on-disk matrix and payload sidecar (idempotent).
+        Without `vector_size`, a new matrix is allocated by the first write, sized
+        from the vectors themselves, so opening a store never loads the model.
+        """
+        try:
+            if self._opened:
+                return
+            self.path.mkdir(parents=True, exist_ok=True)
+            if self._vectors_file.exists():
+                self._vectors = np.load(self._vectors_file, mmap_mode="r+")
+                if self._log_file.exists():
+                    self._replay_log()
+                elif self._legacy_payloads_file.exists():
+                    data = json.loads(self._legacy_payloads_file.read_text(encoding="utf-8"))
+                    for pid, payload in zip(data["ids"], data["payloads"]):
+                        self._put_row(pid, payload)
+                    self._compact()
+                    self._legacy_payloads_file.unlink()
+                self.logger.info(f"Opened '{self.collection_name}' with {len(self._ids)} vectors")
+            elif vector_size is not None:
+                self._vectors = self._allocate(1024, int(vector_size))
+                self._flush()
+                self.logger.info(f"Created '{self.collection_name}' (size={vector_size}, dtype={self.dtype})")
+            self._opened = True
+        except Exception as e:
+            self.error_handler.handle(e, context="NumpyVectorStore.init_store")
+
+    def _allocate(self, capacity: int, dim: int) -> np.memmap:
+        tmp = self.path / "vectors.npy.tmp"
+        vectors = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.dtype, shape=(capacity, dim))
+        if self._vectors is not None:
+            vectors[: len(self._ids)] = self._vectors[: len(self._ids)]
+            vectors.flush()
+        del vectors
+        os.replace(tmp, self._vectors_file)
+        return np.load(self._vectors_file, mmap_mode="r+")
+
+    def _ensure_capacity(self, rows: int, dim: int):
+        if self._vectors is None:
+            self._vectors = self._allocate(max(1024, rows), dim)
+            self.logger.info(f"Created '{self.collection_name}' (size={dim}, dtype={self.dtype})")
+            return
+        capacity, dim = self._vectors.shape
+        if rows > capacity:
+            while capacity < rows:
+                capacity *= 2
+            self._vectors = self._allocate(capacity, dim)
+
+    def _flush(self):
+        """Persist the vectors, then append this batch's payload records (O(batch), not O(rows))."""
+        if self._vectors is not None:
+            self._vectors.flush()
+        if self._log_pending:
+            with open(self._log_file, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(record) + "\n" for record in self._log_pending))
+            self._log_records += len(self._log_pending)
+            self._log_pending.clear()
+        if self._log_records > max(self.COMPACT_MIN_RECORDS, 2 * len(self._ids)):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log as one put record per live row (amortized: runs after >= rows new records)."""
+        tmp = self.path / "payloads.jsonl.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for pid, payload in zip(self._ids, self._payloads):
+                f.write(json.dumps({"op": "put", "id": pid, "payload": payload}) + "\n")
+        os.replace(tmp, self._log_file)
+        self._log_records = len(self._ids)
+
+    def _replay_log(self):
+        with open(self._log_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from an interrupted append; everything before it is intact
+                    self.logger.warning(f"Ignoring truncated record at the end of {self._log_file}")
+                    break
+                if record["op"] == "put":
+                    self._put_row(record["id"], record["payload"])
+                else:
+                    self._remove_rows(record["ids"])
+                self._log_records += 1
+
+    # ----------------------- Row bookkeeping -----------------------
+
+    def _code(self, value: Optional[str]) -> int:
+        return self._codes.setdefault(value, len(self._codes))
+
+    def _put_row(self, pid: str, payload: Dict[str, Any]) -> int:
+        """Insert or replace `pid`'s payload and filter codes; returns its row."""
+        row = self._rows.get(pid)
+        if row is None:
+            row = len(self._ids)
+            self._ids.append(pid)
+            self._payloads.append(payload)
+            self._rows[pid] = row
+            if row >= len(self._doc_codes):
+                grow = max(1024, 2 * len(self._doc_codes)) - len(self._doc_codes)
+                self._subject_codes = np.concatenate([self._subject_codes, np.full(grow, -1, dtype=np.int32)])
+                self._doc_codes = np.concatenate([self._doc_codes, np.full(grow, -1, dtype=np.int32)])
+        else:
+            self._payloads[row] = payload
+        self._subject_codes[row] = self._code(payload.get("subject"))
+        self._doc_codes[row] = self._code(payload.get("doc_id"))
+        return row
+
+    def _remove_rows(self, point_ids: Iterable[str]) -> List[Tuple[int, int]]:
+        """
+        Swap-remove rows so the matrix stays dense; returns the (from, to) row moves the
+        caller applies to the vectors. IDs are processed in sorted order so replaying a
+        delete record reproduces the same layout.
+        """
+        moves = []
+        for pid in sorted(point_ids):
+            row = self._rows.pop(pid, None)
+            if row is None:
+                continue
+            last = len(self._ids) - 1
+            if row != last:
+                moves.append((last, row))
+                self._ids[row] = self._ids[last]
+                self._payloads[row] = self._payloads[last]
+                self._subject_codes[row] = self._subject_codes[last]
+                self._doc_codes[row] = self._doc_codes[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            self._payloads.pop()
+        return moves
+
+    def _doc_rows(self, doc_ids: Iterable[str]) -> np.ndarray:
+        """Rows belonging to any of `doc_ids`."""
+        codes = [self._codes[d] for d in doc_ids if d in self._codes]
+        if not codes:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.isin(self._doc_codes[:len(self._ids)], codes))
+
+    def _doc_point_ids(self, doc_ids: Iterable[str]) -> Set[str]:
+        return {self._ids[row] for row in self._doc_rows(doc_ids)}
+
+    # ----------------------- Upsert -----------------------
+
+    async def upsert_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        *,
+        text_key: str = "text",
+        batch_size: int = 128,
+        raise_on_error: bool = False,
+        on_batch: Optional[BatchCallback] = None,
+    ):
+        """Same contract as QdrantStore.upsert_chunks (IDs from doc_id/chunk_id/content hash)."""
+        try:
+            await self.init_store()
+            chunks = [c for c in chunks if c.get(text_key) or c.get("text")]
+            for i in range(0, len(chunks), batch_size):
+                batch = chunks[i:i + batch_size]
+                texts = [c.get(text_key) or c.get("text") for c in batch]
+                vectors = [c.get("vector") for c in batch]
+                if any(v is None for v in vectors):
+                    vectors = await embed_with_cache(texts, self.embedding_executor, self.embedding_cache, self.logger)
+                async with self._lock:
+                    self._write_rows(texts, vectors, batch)
+                    self._flush()
+                self.logger.info(f"Upserted {len(batch)} points into '{self.collection_name}'")
+                if on_batch is not None:
+                    last = batch[-1]
+                    await on_batch(last.get("chunk_id"), last.get("content_hash") or chunk_content_hash(texts[-1]), len(batch))
+        except Exception as e:
+            self.error_handler.handle(e, context="NumpyVectorStore.upsert_chunks")
+            if raise_on_error:
+                raise
+
+    def _write_rows(self, texts: List[str], vectors: List[List[float]], metas: List[Dict[str, Any]]):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        self._ensure_capacity(len(self._ids) + len(metas), matrix.shape[1])
+        for text, vec, meta in zip(texts, matrix, metas):
+            content_hash = meta.get("content_hash") or chunk_content_hash(text)
+            pid = chunk_point_id(meta.get("doc_id"), meta.get("chunk_id"), content_hash)
+            payload = {
+                "subject": meta.get("subject"),
+                "topics": meta.get("topics", []),
+                "s3_uri": meta.get("s3_uri"),
+                "doc_id": meta.get("doc_id"),
+                "page": meta.get("page"),
+                "page_end": meta.get("page_end", meta.get("page")),
+                "chunk_id": meta.get("chunk_id"),
+                "title": meta.get("title"),
+                "text": meta.get("text") or meta.get("content"),
+                "content_hash": content_hash,
+            }
+            row = self._put_row(pid, payload)
+            self._vectors[row] = vec.astype(self.dtype)
+            self._log_pending.append({"op": "put", "id": pid, "payload": payload})
+
+    async def sync_document(
+        self,
+        doc_id: str,
+        chunks: List[Dict[str, Any]],
+        *,
+        text_key: str = "text",
+    ) -> Dict[str, int]:
+        """Same contract as QdrantStore.sync_document."""
+        plan = await self.plan_document(doc_id, chunks, text_key=text_key)
+        return await self.apply_document_plan(plan)
+
+    async def plan_document(
+        self,
+        doc_id: str,
+        chunks: List[Dict[str, Any]],
+        *,
+        text_key: str = "text",
+    ) -> Dict[str, Any]:
+        """Same contract as QdrantStore.plan_document."""
+        await self.init_store()
+        existing = self._doc_point_ids([doc_id])
+        to_upsert, desired = plan_document_sync(doc_id, chunks, existing, text_key=text_key)
+        return {
+            "doc_id": doc_id,
+            "to_upsert": to_upsert,
+            "desired": desired,
+            "stale": existing - desired,
+            "subjects": {c.get("subject") for c in chunks},
+            "text_key": text_key,
+        }
+
+    async def embed_chunks(self, chunks: List[Dict[str, Any]], *, text_key: str = "text"):
+        """Same contract as QdrantStore.embed_chunks."""
+        pending = [c for c in chunks if (c.get(text_key) or c.get("text")) and c.get("vector") is None]
+        if not pending:
+            return
+        texts = [c.get(text_key) or c.get("text") for c in pending]
+        vectors = await embed_with_cache(texts, self.embedding_executor, self.embedding_cache, self.logger)
+        for chunk, vec in zip(pending, vectors):
+            chunk["vector"] = vec
+
+    async def export_document(self, doc_id: str) -> List[Dict[str, Any]]:
+        """Same contract as QdrantStore.export_document."""
+        await self.init_store()
+        chunks = [
+            {**self._payloads[row], "vector": self._vectors[row].astype(np.float32).tolist()}
+            for row in self._doc_rows([doc_id])
+            if self._payloads[row].get("text")
+        ]
+        return sorted(chunks, key=lambda c: c.get("chunk_id") or 0)
+
+    async def apply_document_plan(self, plan: Dict[str, Any], *, on_batch: Optional[BatchCallback] = None) -> Dict[str, int]:
+        """Same contract as QdrantStore.apply_document_plan."""
+        to_upsert, desired = plan["to_upsert"], plan["desired"]
+        if to_upsert:
+            await self.upsert_chunks(to_upsert, text_key=plan["text_key"], raise_on_error=True, on_batch=on_batch)
+        stale = plan["stale"]
+        if stale:
+            async with self._lock:
+                self._delete_rows(stale)
+                self._flush()
+        stats = {"upserted": len(to_upsert), "unchanged": len(desired) - len(to_upsert), "deleted": len(stale)}
+        self.logger.info(f"Synced doc_id='{plan['doc_id']}': {stats}")
+        return stats
+
+    def _delete_rows(self, point_ids: Set[str]):
+        point_ids = sorted(pid for pid in point_ids if pid in self._rows)
+        if not point_ids:
+            return
+        for src, dst in self._remove_rows(point_ids):
+            self._vectors[dst] = self._vectors[src]
+        self._log_pending.append({"op": "delete", "ids": point_ids})
+
+    # ----------------------- Search -----------------------
+
+    async def search(
+        self,
+        query: str,
+        *,
+        top_k: int = 8,
+        subject: Optional[str] = None,
+        topics_any: Optional[List[str]] = None,
+        doc_ids_any: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
+        **_qdrant_only: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        Brute-force cosine search with the same filters and hit format as QdrantStore.search.
+        Qdrant-specific knobs (hnsw_ef, exact, rescore, oversampling, mode) are accepted and ignored.
+        """
+        try:
+            await self.init_store()
+            qv = await self.embedding_executor.embed(query)
+            return (await self._search_vectors([qv], top_k, subject, topics_any, doc_ids_any, score_threshold))[0]
+        except Exception as e:
+            self.error_handler.handle(e, context="NumpyVectorStore.search")
+            return []
+
+    async def search_many(
+        self,
+        queries: List[str],
+        *,
+        top_k: int = 8,
+        subject: Optional[str] = None,
+        topics_any: Optional[List[str]] = None,
+        doc_ids_any: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
+        **_qdrant_only: Any,
+    ) -> List[List[Dict[str, Any]]]:
+        """Same contract as QdrantStore.search_many: one embedding call, one scoring pass for all queries."""
+        if not queries:
+            return []
+        try:
+            await self.init_store()
+            vectors = await self.embedding_executor.embed_many(list(queries))
+            return await self._search_vectors(vectors, top_k, subject, topics_any, doc_ids_any, score_threshold)
+        except Exception as e:
+            self.error_handler.handle(e, context="NumpyVectorStore.search_many")
+            return [[] for _ in queries]
+
+    async def _search_vectors(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        subject: Optional[str],
+        topics_any: Optional[List[str]],
+        doc_ids_any: Optional[List[str]],
+        score_threshold: Optional[float],
+    ) -> List[List[Dict[str, Any]]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        # Scoring is CPU-bound; keep it off the event loop
+        async with self._lock:
+            ranked = await asyncio.to_thread(
+                self._top_k_many, queries, top_k, self._mask(subject, topics_any, doc_ids_any)
+            )
+            return [
+                [
+                    search_hit(self._payloads[r], s, self._ids[r])
+                    for r, s in zip(rows, scores)
+                    if score_threshold is None or s >= score_threshold
+                ]
+                for rows, scores in ranked
+            ]
+
+    def _mask(
+        self,
+        subject: Optional[str],
+        topics_any: Optional[List[str]],
+        doc_ids_any: Optional[List[str]],
+    ) -> Optional[np.ndarray]:
+        if not (subject or topics_any or doc_ids_any):
+            return None
+        n = len(self._ids)
+        mask = np.ones(n, dtype=bool)
+        if subject:
+            mask &= self._subject_codes[:n] == self._codes.get(subject, -1)
+        if doc_ids_any:
+            mask &= np.isin(self._doc_codes[:n], [self._codes[d] for d in doc_ids_any if d in self._codes])
+        if topics_any:
+            # Topics are lists per row; only the rows still in the mask are inspected
+            topics = set(topics_any)
+            for row in np.flatnonzero(mask):
+                if not topics.intersection(self._payloads[row].get("topics") or ()):
+                    mask[row] = False
+        return mask
+
+    def _top_k(self, qv: np.ndarray, top_k: int, mask: Optional[np.ndarray]):
+        return self._top_k_many(qv[None, :], top_k, mask)[0]
+
+    def _top_k_many(self, queries: np.ndarray, top_k: int, mask: Optional[np.ndarray]):
+        """(rows, scores) per query row of `queries`, scored QUERY_BLOCK queries at a time."""
+        n = len(self._ids)
+        k = min(top_k, n if mask is None else int(mask.sum()))
+        if n == 0 or k <= 0:
+            return [([], []) for _ in queries]
+        ranked = []
+        for start in range(0, len(queries), self.QUERY_BLOCK):
+            ranked.extend(self._top_k_block(queries[start:start + self.QUERY_BLOCK], k, mask, n))
+        return ranked
+
+    def _top_k_block(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray], n: int):
+        """Stream the matrix once for `queries`, merging each row block into a running top-k."""
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, n, self.BLOCK_ROWS):
+            stop = min(start + self.BLOCK_ROWS, n)
+            if mask is not None and not mask[start:stop].any():
+                continue
+            block = np.asarray(self._vectors[start:stop], dtype=np.float32)
+            scores = queries @ block.T
+            if mask is not None:
+                scores[:, ~mask[start:stop]] = -np.inf
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, stop), (len(queries), stop - start))], axis=1)
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                rows = np.take_along_axis(rows, keep, axis=1)
+            best_scores, best_rows = scores, rows
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [(rows.tolist(), scores.tolist()) for rows, scores in zip(best_rows, best_scores)]
+
+    # ----------------------- Maintenance -----------------------
+
+    async def delete_by_doc(self, doc_id: str, subject: Optional[str] = None) -> int:
+        try:
+            await self.init_store()
+            async with self._lock:
+                stale = self._doc_point_ids([doc_id])
+                self._delete_rows(stale)
+                self._flush()
+            self.logger.info(f"Deleted {len(stale)} points for doc_id='{doc_id}'")
+            return len(stale)
+        except Exception as e:
+            self.error_handler.handle(e, context="NumpyVectorStore.delete_by_doc")
+            return 0
+
+    async def delete_points(self, point_ids: List[str], subject: Optional[str] = None) -> int:
+        """Same contract as QdrantStore.delete_points."""
+        try:
+            await self.init_store()
+            async with self._lock:
+                stale = {pid for pid in point_ids if pid in self._rows}
+                self._delete_rows(stale)
+                self._flush()
+            self.logger.info(f"Deleted {len(stale)} points by ID")
+            return len(stale)
+        except Exception as e:
+            self.error_handler.handle(e, context="NumpyVectorStore.delete_points")
+            return 0
+
+    async def delete_by_docs(self, doc_ids: List[str], subject: Optional[str] = None) -> int:
+        """Same contract as QdrantStore.delete_by_docs."""
+        try:
+            await self.init_store()
+            doc_ids = set(doc_ids)
+            async with self._lock:
+                stale = self._doc_point_ids(doc_ids)
+                self._delete_rows(stale)
+                self._flush()
+            self.logger.info(f"Deleted {len(stale)} points for {len(doc_ids)} documents")
+            return len(stale)
+        except Exception as e:
+            self.error_handler.handle(e, context="NumpyVectorStore.delete_by_docs")
+            return 0
+
+    async def count(self, subject: Optional[str] = None) -> int:
+        await self.init_store()
+        if subject is None:
+            return len(self._ids)
+        return int((self._subject_codes[:len(self._ids)] == self._codes.get(subject, -1)).sum())
+
+    async def close(self):
+        if self._opened:
+            self._flush()
+            self._vectors = None
+            self._opened = False
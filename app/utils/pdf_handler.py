@@ -1,12 +1,99 @@
+import asyncio
+import io
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from PyPDF2 import PdfReader
-from typing import List
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
+from app.core.config import settings
 from app.utils.logger import Logger
 from app.utils.error_handler import ErrorHandler
 
+# A PDF given as a path, its raw bytes or a binary file object (e.g. an S3 download spool)
+PDFSource = Union[str, bytes, IO[bytes]]
+
+# One extraction pool per worker count, shared by every PDFHandler in the process
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+
+
+@contextmanager
+def _reader(source: PDFSource) -> Iterator[PdfReader]:
+    if isinstance(source, (bytes, bytearray)):
+        yield PdfReader(io.BytesIO(source))
+    elif isinstance(source, str):
+        # A handle, not the path: PdfReader(path) reads the whole file into memory first
+        with open(source, "rb") as fh:
+            yield PdfReader(fh)
+    else:
+        source.seek(0)
+        yield PdfReader(source)
+
+
+def _picklable(source: PDFSource) -> Union[str, bytes]:
+    """What pool processes get: a path when the PDF is on disk, else its bytes."""
+    if isinstance(source, (str, bytes)):
+        return source
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        source.flush()
+        return name
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def _extract_page_range(source: PDFSource, start: int, end: int) -> List[str]:
+    """Text of pages [start, end) of one PDF; runs in a pool process."""
+    with _reader(source) as reader:
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def plan_page_ranges(num_pages: int, workers: int, tasks_per_worker: int, max_pages_per_task: int) -> List[Tuple[int, int]]:
+    """
+    Split `num_pages` into contiguous [start, end) ranges: about `workers * tasks_per_worker`
+    tasks (more tasks balance uneven pages better, fewer reparse the PDF less often),
+    never more than `max_pages_per_task` pages each.
+    """
+    if num_pages <= 0:
+        return []
+    tasks = max(1, workers * tasks_per_worker)
+    size = min(max(1, math.ceil(num_pages / tasks)), max(1, max_pages_per_task))
+    return [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+
+
+def get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    pool = _POOLS.get(workers)
+    if pool is None:
+        # spawn: forking a process that runs an event loop and model threads is not safe
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _POOLS[workers] = pool
+    return pool
+
+
+def shutdown_pdf_pools():
+    """Stop the extraction processes (app shutdown)."""
+    for pool in _POOLS.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _POOLS.clear()
+
+
 class PDFHandler:
-    def __init__(self):
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        tasks_per_worker: Optional[int] = None,
+        max_pages_per_task: Optional[int] = None,
+        min_parallel_pages: Optional[int] = None,
+    ):
         self.logger = Logger()
         self.error_handler = ErrorHandler(self.logger)
+        self.workers = workers if workers is not None else (settings.PDF_EXTRACT_WORKERS or multiprocessing.cpu_count())
+        self.tasks_per_worker = tasks_per_worker or settings.PDF_EXTRACT_TASKS_PER_WORKER
+        self.max_pages_per_task = max_pages_per_task or settings.PDF_EXTRACT_MAX_PAGES_PER_TASK
+        self.min_parallel_pages = min_parallel_pages if min_parallel_pages is not None else settings.PDF_EXTRACT_MIN_PARALLEL_PAGES
         self.logger.info("PDFHandler initialized.")
 
     def read(self, file_path: str) -> str:
@@ -15,19 +102,66 @@ class PDFHandler:
         """
         self.logger.debug(f"Reading PDF file: {file_path}")
         try:
-            reader = PdfReader(file_path)
             text = []
-            for page in reader.pages:
-                text.append(page.extract_text() or "")
+            with _reader(file_path) as reader:
+                for page in reader.pages:
+                    text.append(page.extract_text() or "")
             self.logger.info(f"Successfully read PDF: {file_path}")
             return "\n".join(text)
         except Exception as e:
             self.error_handler.handle(e, context=f"PDFHandler.read('{file_path}')")
             return ""
 
+    def read_pages(self, source: PDFSource) -> List[str]:
+        """
+        Text of every page, in order (blocking, single process).
+        """
+        try:
+            with _reader(source) as reader:
+                return [page.extract_text() or "" for page in reader.pages]
+        except Exception as e:
+            self.error_handler.handle(e, context="PDFHandler.read_pages")
+            return []
+
+    async def read_pages_parallel(self, source: PDFSource) -> List[str]:
+        """
+        Text of every page, in order, extracted by page range in a process pool.
+        Small PDFs (or workers <= 1) are read in a thread instead, where the pool's
+        per-task reparse and pickling would cost more than it saves.
+        """
+        try:
+            # Parsing the xref/page tree (and reading a spool file) would block the event loop
+            num_pages, pages = await asyncio.to_thread(self._count_or_read_pages, source)
+            if pages is not None:
+                return pages
+
+            ranges = plan_page_ranges(num_pages, self.workers, self.tasks_per_worker, self.max_pages_per_task)
+            self.logger.debug(f"Extracting {num_pages} pages in {len(ranges)} tasks on {self.workers} processes")
+            loop = asyncio.get_running_loop()
+            pool = get_pdf_pool(self.workers)
+            shared = await asyncio.to_thread(_picklable, source)
+            parts = await asyncio.gather(
+                *(loop.run_in_executor(pool, _extract_page_range, shared, start, end) for start, end in ranges)
+            )
+            return [page for part in parts for page in part]
+        except Exception as e:
+            self.error_handler.handle(e, context="PDFHandler.read_pages_parallel")
+            return []
+
+    def _count_or_read_pages(self, source: PDFSource) -> Tuple[int, Optional[List[str]]]:
+        """
+        (page count, text of every page) for a PDF too small for the pool, else (page count, None);
+        one parse either way (blocking, run in a thread).
+        """
+        with _reader(source) as reader:
+            num_pages = len(reader.pages)
+            if self.workers <= 1 or num_pages < self.min_parallel_pages:
+                return num_pages, [page.extract_text() or "" for page in reader.pages]
+        return num_pages, None
+
     def chunk(self, text: str, chunk_size: int = 2000) -> List[str]:
         """
         Splits the input text into chunks of specified size.
         """
         self.logger.debug(f"Chunking text into chunks of size {chunk_size}")
-        return [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
\ No newline at end of file
+        return [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
@@ -1,10 +1,12 @@
 # src/agentic_rag/vectorstore/qdrant_client.py
 from __future__ import annotations
 
-from typing import List, Dict, Iterable, Optional, Any
-from uuid import uuid4
+import asyncio
+import copy
+import hashlib
+from typing import Awaitable, Callable, List, Dict, Iterable, Optional, Any, Set, Tuple
+from uuid import UUID, uuid5
 
-from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import (
     VectorParams,
     Distance,
@@ -13,35 +15,111 @@ from qdrant_client.models import (
     FieldCondition,
     MatchValue,
     MatchAny,
+    PointIdsList,
+    HnswConfigDiff,
+    VectorParamsDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    SearchParams,
+    QuantizationSearchParams,
+    SparseVectorParams,
+    Modifier,
+    Prefetch,
+    FusionQuery,
+    Fusion,
+    QueryRequest,
 )
+from app.core.config import settings
+from app.core.qdrant import get_qdrant_client
+from app.utils.embeddings import Embedder, get_embedder
+from app.utils.embedding_executor import (
+    EmbeddingExecutor,
+    EmbeddingQueueFullError,
+    get_embedding_executor,
+)
+from app.utils.chunk_store import ChunkTextStore
+from app.utils.embedding_cache import EmbeddingCache, embed_with_cache
+from app.utils.search_cache import SearchCache, search_cache as default_search_cache
+from app.utils.sparse_encoder import SPARSE_VECTOR_NAME, looks_like_keyword_query, sparse_encoder
 from app.utils.logger import Logger
 from app.utils.error_handler import ErrorHandler
 
-# Simple Embedder class to avoid import issues
-class SimpleEmbedder:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        try:
-            from transformers import AutoTokenizer, AutoModel
-            import torch
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModel.from_pretrained(model_name)
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model.to(self.device)
-        except ImportError:
-            raise ImportError("Please install transformers and torch: pip install transformers torch")
-
-    def generate(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
-        import torch
-        embeddings = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
-            inputs = self.tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=512)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            batch_embeddings = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-            embeddings.extend(batch_embeddings.tolist())
-        return embeddings
+# Namespace for deterministic point IDs (uuid5), so re-ingesting the same chunk overwrites it
+POINT_ID_NAMESPACE = UUID("6f3b1c2e-5d0a-4b8e-9a51-2c7f0e9d4a13")
+
+# (url, collection) pairs already created/reconciled by this process, so routing a
+# write to a subject collection costs one init_store per process, not per request
+_READY_COLLECTIONS: Set[Tuple[str, str]] = set()
+
+# Whether each (url, collection) really has the sparse vector. Collections created
+# before QDRANT_SPARSE_ENABLED stay dense-only (Qdrant cannot add a sparse vector to
+# an existing collection), so their points are written and searched dense-only.
+_SPARSE_COLLECTIONS: Dict[Tuple[str, str], bool] = {}
+
+# Awaited after each upserted batch with its last chunk: (chunk_id, content_hash, points in batch)
+BatchCallback = Callable[[Any, Optional[str], int], Awaitable[None]]
+
+# Payload fields returned by searches (content_hash is only needed by sync_document)
+SEARCH_PAYLOAD_FIELDS = ["subject", "topics", "s3_uri", "doc_id", "page", "page_end", "chunk_id", "title", "text"]
+
+
+def chunk_content_hash(text: str) -> str:
+    """sha256 of the whitespace/unicode-normalized chunk text."""
+    return hashlib.sha256(EmbeddingCache.normalize(text).encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(doc_id: str, chunk_id: Any, content_hash: str) -> str:
+    """Deterministic point ID for (doc_id, chunk_id, content hash)."""
+    return str(uuid5(POINT_ID_NAMESPACE, f"{doc_id}:{chunk_id}:{content_hash}"))
+
+
+def plan_document_sync(
+    doc_id: str,
+    chunks: List[Dict[str, Any]],
+    existing: Set[str],
+    *,
+    text_key: str = "text",
+) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    """
+    Diff a document's chunks against its stored point IDs.
+
+    Returns (chunks to upsert, every point ID the document should have); stale
+    points are `existing - desired`.
+    """
+    desired: Set[str] = set()
+    to_upsert: List[Dict[str, Any]] = []
+    for chunk in chunks:
+        t = chunk.get(text_key) or chunk.get("text")
+        if not t:
+            continue
+        content_hash = chunk_content_hash(t)
+        pid = chunk_point_id(doc_id, chunk.get("chunk_id"), content_hash)
+        desired.add(pid)
+        if pid not in existing:
+            to_upsert.append({**chunk, "doc_id": doc_id, "content_hash": content_hash})
+    return to_upsert, desired
+
+
+def search_hit(payload: Optional[Dict[str, Any]], score: Optional[float], point_id: Any) -> Dict[str, Any]:
+    """Normalized hit dict returned by every search API (and every vector store backend)."""
+    payload = payload or {}
+    return {
+        "score": round(score, 6) if score is not None else None,
+        "subject": payload.get("subject"),
+        "topics": payload.get("topics"),
+        "s3_uri": payload.get("s3_uri"),
+        "doc_id": payload.get("doc_id"),
+        "page": payload.get("page"),
+        "page_end": payload.get("page_end", payload.get("page")),
+        "chunk_id": payload.get("chunk_id"),
+        "title": payload.get("title"),
+        "text": payload.get("text"),
+        "point_id": point_id,
+    }
 
 
 class QdrantStore:
@@ -49,21 +127,92 @@ class QdrantStore:
     Opinionated Qdrant wrapper for RAG over S3-hosted PDFs.
 
     - Single collection (e.g., 'academia_docs') for all subjects.
-    - Payload carries: subject, topics, s3_uri, doc_id, page, chunk_id, title, text.
+    - Payload carries: subject, topics, s3_uri, doc_id, page, page_end, chunk_id, title, text, content_hash.
+      With a ChunkTextStore, `text` lives there instead and only the final hits are hydrated.
+    - Point IDs are derived from (doc_id, chunk_id, content_hash), so upserts are idempotent
+      and `sync_document` can diff a document against what is already stored.
+    - Optional BM25-style sparse vector (named 'text-bm25') next to the unnamed dense
+      vector, for hybrid (RRF) and keyword-only retrieval.
     - Fast filtering via payload indexes on 'subject' and 'topics'.
-    - Async client; one Embedder kept warm in RAM.
+    - Async client; the process-wide Embedder is shared by every store instance.
+    - Multi-collection: `for_subject` resolves a subject's `vector_collection` (via
+      `collection_resolver`) and returns a view bound to that collection, sharing
+      this store's client and caches; `collection_name` is the fallback.
     """
 
-    def __init__(self, url: str, api_key: str, collection_name: str):
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        collection_name: str,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        search_cache: Optional[SearchCache] = None,
+        chunk_store: Optional[ChunkTextStore] = None,
+        collection_resolver: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+    ):
         self.logger = Logger()
         self.error_handler = ErrorHandler(self.logger)
         self.url = url
         self.api_key = api_key
         self.collection_name = collection_name
-        self.client = AsyncQdrantClient(url=self.url, api_key=self.api_key)
-        self.embedder = SimpleEmbedder()  # single model in RAM
+        self.embedding_cache = embedding_cache
+        if search_cache is None and settings.SEARCH_CACHE_ENABLED:
+            search_cache = default_search_cache
+        self.search_cache = search_cache
+        self.chunk_store = chunk_store
+        self.collection_resolver = collection_resolver
+        self._views: Dict[str, "QdrantStore"] = {}
+        # Pooled per endpoint and closed at shutdown; stores are cheap to build per request
+        self.client = get_qdrant_client(self.url, self.api_key)
         self.logger.info(f"Qdrant client ready for '{self.collection_name}'")
 
+    @property
+    def embedder(self) -> Embedder:
+        # Resolved on access, so list/delete requests don't load the model. The first access
+        # loads it synchronously: code on the event loop goes through the embedding executor
+        return get_embedder()
+
+    @property
+    def embedding_executor(self) -> EmbeddingExecutor:
+        return get_embedding_executor()
+
+    # ----------------------- Routing -----------------------
+
+    async def collection_for(self, subject_slug: Optional[str]) -> str:
+        """The subject's vector_collection, or the default collection when unset/unknown."""
+        if subject_slug and self.collection_resolver is not None:
+            name = await self.collection_resolver(subject_slug)
+            if name:
+                return name
+        return self.collection_name
+
+    def for_collection(self, collection_name: str) -> "QdrantStore":
+        """A store bound to `collection_name` that shares this store's client and caches."""
+        if collection_name == self.collection_name:
+            return self
+        view = self._views.get(collection_name)
+        if view is None:
+            view = copy.copy(self)
+            view.collection_name = collection_name
+            view._views = {}
+            self._views[collection_name] = view
+        return view
+
+    async def for_subject(self, subject_slug: Optional[str], *, create: bool = False) -> "QdrantStore":
+        """
+        Store routed to the subject's collection. With `create`, the collection is
+        created/reconciled on first use (writes); searches and deletes leave it alone.
+        """
+        store = self.for_collection(await self.collection_for(subject_slug))
+        if create:
+            await store.ensure_collection()
+        return store
+
+    async def ensure_collection(self):
+        """init_store, at most once per process and collection (retried if it failed)."""
+        if (self.url, self.collection_name) not in _READY_COLLECTIONS:
+            await self.init_store()
+
     # ----------------------- Setup -----------------------
 
     async def init_store(self, vector_size: Optional[int] = None):
@@ -76,28 +225,135 @@ class QdrantStore:
         try:
             # Infer vector size if not provided
             if vector_size is None:
-                # Common Embedder patterns: .dim or .embedding_size; fallback to 1536
-                vector_size = getattr(self.embedder, "dim", None) or getattr(self.embedder, "embedding_size", None) or 384
+                # Loading the model blocks, so it runs in a thread (once per process, see get_embedder);
+                # fallback to 384, the dimension of the default all-MiniLM-L6-v2
+                embedder = await asyncio.to_thread(get_embedder)
+                vector_size = getattr(embedder, "dim", None) or getattr(embedder, "embedding_size", None) or 384
 
-            # Create collection if missing
+            # Create collection if missing, otherwise reconcile its layout with settings
             try:
-                await self.client.get_collection(self.collection_name)
+                info = await self.client.get_collection(self.collection_name)
                 self.logger.info(f"Collection '{self.collection_name}' already exists")
             except Exception:
+                info = None
+
+            if info is None:
                 await self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=int(vector_size), distance=Distance.COSINE),
+                    vectors_config=VectorParams(
+                        size=int(vector_size),
+                        distance=Distance.COSINE,
+                        on_disk=settings.QDRANT_ON_DISK,
+                    ),
+                    hnsw_config=self._desired_hnsw_config(),
+                    quantization_config=self._desired_quantization(),
+                    sparse_vectors_config=self._desired_sparse_config(),
+                )
+                _SPARSE_COLLECTIONS[(self.url, self.collection_name)] = self._desired_sparse_config() is not None
+                self.logger.info(
+                    f"Created collection '{self.collection_name}' (size={vector_size}, metric=COSINE, "
+                    f"quantization={settings.QDRANT_QUANTIZATION}, on_disk={settings.QDRANT_ON_DISK})"
                 )
-                self.logger.info(f"Created collection '{self.collection_name}' (size={vector_size}, metric=COSINE)")
+            else:
+                await self._reconcile_collection_config(info)
 
             # Create payload indexes (idempotent)
             await self._ensure_payload_index("subject", "keyword")
             await self._ensure_payload_index("topics", "keyword")  # array of keywords supported
             await self._ensure_payload_index("doc_id", "keyword")
+            _READY_COLLECTIONS.add((self.url, self.collection_name))
 
         except Exception as e:
             self.error_handler.handle(e, context="QdrantStore.init_store")
 
+    def _desired_hnsw_config(self) -> HnswConfigDiff:
+        return HnswConfigDiff(
+            m=settings.QDRANT_HNSW_M,
+            ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+            on_disk=settings.QDRANT_HNSW_ON_DISK,
+        )
+
+    def _desired_sparse_config(self) -> Optional[Dict[str, SparseVectorParams]]:
+        if not settings.QDRANT_SPARSE_ENABLED:
+            return None
+        # IDF is computed server-side, so documents only carry BM25 term-frequency weights
+        return {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+
+    def _desired_quantization(self):
+        mode = (settings.QDRANT_QUANTIZATION or "none").lower()
+        always_ram = settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+        if mode == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=always_ram)
+            )
+        if mode == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+        if mode != "none":
+            self.logger.warning(f"Unknown QDRANT_QUANTIZATION '{mode}', using none")
+        return None
+
+    async def _reconcile_collection_config(self, info):
+        """
+        Apply settings that differ from the live collection (idempotent: no-op when in sync).
+        Qdrant rebuilds the affected segments in the background.
+        """
+        current = info.config
+        changes: Dict[str, Any] = {}
+
+        vectors = current.params.vectors
+        if isinstance(vectors, VectorParams) and bool(vectors.on_disk) != settings.QDRANT_ON_DISK:
+            changes["vectors_config"] = {"": VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK)}
+
+        hnsw = current.hnsw_config
+        desired_hnsw = self._desired_hnsw_config()
+        if (hnsw.m, hnsw.ef_construct, bool(hnsw.on_disk)) != (desired_hnsw.m, desired_hnsw.ef_construct, desired_hnsw.on_disk):
+            changes["hnsw_config"] = desired_hnsw
+
+        desired_q = self._desired_quantization()
+        current_q = current.quantization_config
+        if self._quantization_signature(current_q) != self._quantization_signature(desired_q):
+            changes["quantization_config"] = desired_q if desired_q is not None else Disabled.DISABLED
+
+        has_sparse = self._record_sparse_vector(info)
+        if settings.QDRANT_SPARSE_ENABLED and not has_sparse:
+            # update_collection cannot add a sparse vector, so the collection stays dense-only
+            self.logger.warning(
+                f"Collection '{self.collection_name}' has no sparse vector '{SPARSE_VECTOR_NAME}'; writing and "
+                "searching it dense-only. To enable sparse/hybrid search, point the subject's vector_collection "
+                "at a new collection and re-ingest (mode=all)"
+            )
+
+        if not changes:
+            return
+        await self.client.update_collection(collection_name=self.collection_name, **changes)
+        self.logger.info(f"Updated collection '{self.collection_name}' config: {sorted(changes)}")
+
+    def _record_sparse_vector(self, info) -> bool:
+        has_sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+        _SPARSE_COLLECTIONS[(self.url, self.collection_name)] = has_sparse
+        return has_sparse
+
+    async def _has_sparse_vector(self) -> bool:
+        """Whether points of this collection carry the sparse vector (looked up once per process)."""
+        if not settings.QDRANT_SPARSE_ENABLED:
+            return False
+        known = _SPARSE_COLLECTIONS.get((self.url, self.collection_name))
+        if known is not None:
+            return known
+        try:
+            return self._record_sparse_vector(await self.client.get_collection(self.collection_name))
+        except Exception as e:
+            self.logger.warning(f"Could not inspect collection '{self.collection_name}', assuming dense-only: {e}")
+            return False
+
+    @staticmethod
+    def _quantization_signature(q) -> tuple:
+        if isinstance(q, ScalarQuantization):
+            return ("scalar", bool(q.scalar.always_ram))
+        if isinstance(q, BinaryQuantization):
+            return ("binary", bool(q.binary.always_ram))
+        return ("none",)
+
     async def _ensure_payload_index(self, field_name: str, field_schema: str):
         try:
             await self.client.create_payload_index(
@@ -118,27 +374,41 @@ class QdrantStore:
         *,
         text_key: str = "text",
         batch_size: int = 128,
+        raise_on_error: bool = False,
+        on_batch: Optional[BatchCallback] = None,
     ):
         """
         Upsert a batch of chunks (each chunk is a dict with metadata).
+        Errors are logged and swallowed unless raise_on_error is set.
+        `on_batch(chunk_id, content_hash, count)` is awaited after each stored batch with
+        its last chunk (checkpointing; chunks are stored in the order given).
         Required per-chunk keys:
           - text (or override with text_key)
           - subject: "Math" | "Physics" | "Chemistry"
           - s3_uri: full S3 path (e.g., s3://bucket/Math/file.pdf)
           - doc_id: stable ID for the PDF
-          - page: int
+          - page: int (first page of the chunk; page_end: last page, defaults to page)
           - chunk_id: int (sequential)
           - title: filename or document title
           - topics: list[str] (optional)
         """
         try:
             buf: List[PointStruct] = []
+            text_buf: List[Dict[str, str]] = []
 
             async def _flush():
                 if not buf:
                     return
+                if text_buf:
+                    # Texts first, so a stored point never references a missing text
+                    await self.chunk_store.put_many(text_buf)
+                    text_buf.clear()
                 await self.client.upsert(collection_name=self.collection_name, points=buf)
                 self.logger.info(f"Upserted {len(buf)} points into '{self.collection_name}'")
+                await self._invalidate_search_cache({p.payload.get("subject") for p in buf})
+                if on_batch is not None:
+                    last = buf[-1].payload
+                    await on_batch(last.get("chunk_id"), last.get("content_hash"), len(buf))
                 buf.clear()
 
             texts: List[str] = []
@@ -154,51 +424,190 @@ class QdrantStore:
                 stash.append(chunk)
 
                 if len(texts) >= batch_size:
-                    await self._embed_and_stage_points(texts, stash, buf)
+                    await self._embed_and_stage_points(texts, stash, buf, text_buf)
                     await _flush()
 
             # Tail
             if texts:
-                await self._embed_and_stage_points(texts, stash, buf)
+                await self._embed_and_stage_points(texts, stash, buf, text_buf)
                 await _flush()
 
         except Exception as e:
             self.error_handler.handle(e, context="QdrantStore.upsert_chunks")
+            if raise_on_error:
+                raise
 
     async def _embed_and_stage_points(
         self,
         texts: List[str],
         stash: List[Dict[str, Any]],
         point_buffer: List[PointStruct],
+        text_buffer: List[Dict[str, str]],
     ):
-        # 1) Embed in one go
-        vectors = self.embedder.generate(texts)
-        if hasattr(vectors, "tolist"):
-            vectors = vectors.tolist()
-
-        # 2) Build points with payload
-        for vec, meta in zip(vectors, stash):
-            point_buffer.append(
-                PointStruct(
-                    id=str(uuid4()),
-                    vector=vec,
-                    payload={
-                        "subject": meta.get("subject"),
-                        "topics": meta.get("topics", []),
-                        "s3_uri": meta.get("s3_uri"),
-                        "doc_id": meta.get("doc_id"),
-                        "page": meta.get("page"),
-                        "chunk_id": meta.get("chunk_id"),
-                        "title": meta.get("title"),
-                        "text": meta.get("text") or meta.get("content"),
-                    },
-                )
-            )
+        # 1) Embed in one go (off the event loop), reusing cached vectors for unchanged text;
+        #    chunks embedded ahead of time (see embed_chunks) carry their own vector
+        vectors = [meta.get("vector") for meta in stash]
+        if any(v is None for v in vectors):
+            vectors = await self._embed_with_cache(texts)
+        sparse = await self._has_sparse_vector()
+
+        # 2) Build points with payload (text goes to the chunk store when there is one)
+        for text, vec, meta in zip(texts, vectors, stash):
+            content_hash = meta.get("content_hash") or chunk_content_hash(text)
+            point_id = chunk_point_id(meta.get("doc_id"), meta.get("chunk_id"), content_hash)
+            payload = {
+                "subject": meta.get("subject"),
+                "topics": meta.get("topics", []),
+                "s3_uri": meta.get("s3_uri"),
+                "doc_id": meta.get("doc_id"),
+                "page": meta.get("page"),
+                "page_end": meta.get("page_end", meta.get("page")),
+                "chunk_id": meta.get("chunk_id"),
+                "title": meta.get("title"),
+                "text": meta.get("text") or meta.get("content"),
+                "content_hash": content_hash,
+            }
+            if self.chunk_store is not None:
+                text_buffer.append({"point_id": point_id, "doc_id": meta.get("doc_id"), "text": payload.pop("text") or text})
+            point_buffer.append(PointStruct(id=point_id, vector=self._point_vector(text, vec, sparse), payload=payload))
 
         # 3) Clear staging arrays
         texts.clear()
         stash.clear()
 
+    @staticmethod
+    def _point_vector(text: str, dense: List[float], sparse: bool):
+        if not sparse:
+            return dense
+        return {"": dense, SPARSE_VECTOR_NAME: sparse_encoder.encode_document(text)}
+
+    async def sync_document(
+        self,
+        doc_id: str,
+        chunks: List[Dict[str, Any]],
+        *,
+        text_key: str = "text",
+    ) -> Dict[str, int]:
+        """
+        Make the stored points of `doc_id` match `chunks` exactly.
+
+        - Chunks whose (chunk_id, content) already exist are left untouched (no embedding).
+        - New or changed chunks are embedded and upserted.
+        - Points no longer produced by the document are deleted in one bulk call,
+          after the upsert so the document is never missing from search.
+
+        Returns counts: {"upserted", "unchanged", "deleted"}.
+        """
+        plan = await self.plan_document(doc_id, chunks, text_key=text_key)
+        return await self.apply_document_plan(plan)
+
+    async def plan_document(
+        self,
+        doc_id: str,
+        chunks: List[Dict[str, Any]],
+        *,
+        text_key: str = "text",
+    ) -> Dict[str, Any]:
+        """
+        First half of sync_document: diff `chunks` against the stored points.
+        The plan can be embedded (embed_chunks) and applied (apply_document_plan)
+        in separate steps, e.g. by different ingestion pipeline stages.
+        """
+        existing = await self._existing_point_ids(doc_id)
+        to_upsert, desired = plan_document_sync(doc_id, chunks, existing, text_key=text_key)
+        return {
+            "doc_id": doc_id,
+            "to_upsert": to_upsert,
+            "desired": desired,
+            "stale": existing - desired,
+            "subjects": {c.get("subject") for c in chunks},
+            "text_key": text_key,
+        }
+
+    async def embed_chunks(self, chunks: List[Dict[str, Any]], *, text_key: str = "text"):
+        """Attach a "vector" to every chunk (cache-aware); upserts then skip the embedding call."""
+        texts = [c.get(text_key) or c.get("text") for c in chunks]
+        pending = [(c, t) for c, t in zip(chunks, texts) if t and c.get("vector") is None]
+        if not pending:
+            return
+        vectors = await self._embed_with_cache([t for _, t in pending])
+        for (chunk, _), vec in zip(pending, vectors):
+            chunk["vector"] = vec
+
+    async def apply_document_plan(self, plan: Dict[str, Any], *, on_batch: Optional[BatchCallback] = None) -> Dict[str, int]:
+        """Second half of sync_document: upsert new/changed chunks, then delete stale points."""
+        to_upsert, desired, text_key = plan["to_upsert"], plan["desired"], plan["text_key"]
+        if to_upsert:
+            # Raise so a failed upsert never leads to deleting the old points below
+            await self.upsert_chunks(to_upsert, text_key=text_key, raise_on_error=True, on_batch=on_batch)
+
+        stale = list(plan["stale"])
+        if stale:
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=stale),
+            )
+            if self.chunk_store is not None:
+                await self.chunk_store.delete_many(stale)
+            await self._invalidate_search_cache(plan["subjects"])
+
+        stats = {"upserted": len(to_upsert), "unchanged": len(desired) - len(to_upsert), "deleted": len(stale)}
+        self.logger.info(f"Synced doc_id='{plan['doc_id']}': {stats}")
+        return stats
+
+    async def export_document(self, doc_id: str) -> List[Dict[str, Any]]:
+        """
+        Every stored chunk of `doc_id`, in chunk order, as an upsertable chunk dict with its
+        dense "vector" attached. Upserting them under another doc_id (or collection) copies
+        the document without extracting or embedding it again.
+        """
+        flt = Filter(must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))])
+        points = []
+        offset = None
+        while True:
+            batch, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=flt,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            points.extend(batch)
+            if offset is None:
+                break
+        texts = {}
+        if self.chunk_store is not None:
+            texts = await self.chunk_store.get_many([str(p.id) for p in points if not (p.payload or {}).get("text")])
+        chunks = []
+        for p in points:
+            vector = p.vector.get("") if isinstance(p.vector, dict) else p.vector
+            chunk = {**(p.payload or {}), "vector": vector}
+            chunk["text"] = chunk.get("text") or texts.get(str(p.id))
+            if chunk["text"] and vector is not None:
+                chunks.append(chunk)
+        return sorted(chunks, key=lambda c: c.get("chunk_id") or 0)
+
+    async def _existing_point_ids(self, doc_id: str) -> Set[str]:
+        flt = Filter(must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))])
+        ids: Set[str] = set()
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=flt,
+                limit=1000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            ids.update(str(p.id) for p in points)
+            if offset is None:
+                return ids
+
+    async def _embed_with_cache(self, texts: List[str]) -> List[List[float]]:
+        return await embed_with_cache(texts, self.embedding_executor, self.embedding_cache, self.logger)
+
     # ----------------------- Search -----------------------
 
     async def search(
@@ -210,6 +619,11 @@ class QdrantStore:
         topics_any: Optional[List[str]] = None,
         doc_ids_any: Optional[List[str]] = None,
         score_threshold: Optional[float] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
+        rescore: Optional[bool] = None,
+        oversampling: Optional[float] = None,
+        mode: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
         Vector search with optional payload filters.
@@ -218,53 +632,267 @@ class QdrantStore:
         - doc_ids_any: restrict to any of these documents
         - score_threshold: keep only hits with score >= threshold (COSINE similarity)
 
+        Recall/latency knobs (default to the QDRANT_SEARCH_* settings):
+        - hnsw_ef: HNSW beam width at query time (higher = better recall, slower)
+        - exact: brute-force search, bypassing the index
+        - rescore / oversampling: with quantization, fetch top_k * oversampling
+          candidates from quantized vectors and rescore them with the originals
+
+        Retrieval mode (defaults to QDRANT_SEARCH_MODE):
+        - "dense": embedding similarity only
+        - "sparse": BM25-style term matching only; never touches the embedding model
+        - "hybrid": dense and sparse candidates fused with reciprocal rank fusion
+        - "auto": "sparse" for short keyword-like queries, otherwise "hybrid"
+        RRF scores are rank-based, so score_threshold only applies to "dense".
+
         Returns a normalized list of hits with payload + score.
         """
-        import math
+        mode = self._resolve_mode(query, mode, await self._has_sparse_vector())
 
-        try:
-            # 1) Embed query
-            qv = self.embedder.generate([query])[0]
-            if hasattr(qv, "tolist"):
-                qv = qv.tolist()
+        cache_key = None
+        generation = None
+        if await self._search_cache_ready(subject):
+            cache_key = self._search_cache_key(
+                query,
+                mode,
+                subject=subject,
+                topics_any=topics_any,
+                doc_ids_any=doc_ids_any,
+                top_k=top_k,
+                score_threshold=score_threshold,
+                hnsw_ef=hnsw_ef,
+                exact=exact,
+                rescore=rescore,
+                oversampling=oversampling,
+            )
+            cached = self.search_cache.get(cache_key, subject)
+            if cached is not None:
+                return cached
+            generation = self.search_cache.generation(subject)
 
-            # 2) Build filter
+        try:
+            # 1) Build filter and search params
             flt = self._build_filter(subject=subject, topics_any=topics_any, doc_ids_any=doc_ids_any)
+            params = self._build_search_params(hnsw_ef=hnsw_ef, exact=exact, rescore=rescore, oversampling=oversampling)
+
+            # 2) Encode the query: sparse is pure Python, dense is micro-batched off the event loop
+            qv = None if mode == "sparse" else await self.embedding_executor.embed(query)
+            query_kwargs = self._query_kwargs(query, mode, qv, top_k=top_k, flt=flt, params=params)
 
             # 3) Search
-            hits = await self.client.search(
+            response = await self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=qv,
-                query_filter=flt,
                 limit=top_k,
+                with_payload=SEARCH_PAYLOAD_FIELDS,
+                **query_kwargs,
             )
 
-            # 4) Post-filter by score threshold (if provided)
-            results: List[Dict[str, Any]] = []
-            for h in hits:
-                if score_threshold is not None and (h.score is None or h.score < score_threshold):
-                    continue
-                payload = h.payload or {}
-                results.append(
-                    {
-                        "score": round(h.score, 6) if h.score is not None else None,
-                        "subject": payload.get("subject"),
-                        "topics": payload.get("topics"),
-                        "s3_uri": payload.get("s3_uri"),
-                        "doc_id": payload.get("doc_id"),
-                        "page": payload.get("page"),
-                        "chunk_id": payload.get("chunk_id"),
-                        "title": payload.get("title"),
-                        "text": payload.get("text"),
-                        "point_id": getattr(h, "id", None),
-                    }
-                )
+            # 4) Post-filter by score threshold (if provided), then fetch text for the survivors
+            results = self._normalize_hits(response.points, mode, score_threshold)
+            await self._hydrate_texts(results)
 
+            if cache_key is not None:
+                self.search_cache.put(cache_key, subject, results, generation=generation)
             return results
+        except EmbeddingQueueFullError:
+            # Let callers shed load (e.g. 503) instead of answering with no context
+            raise
         except Exception as e:
             self.error_handler.handle(e, context="QdrantStore.search")
             return []
 
+    async def search_many(
+        self,
+        queries: List[str],
+        *,
+        top_k: int = 8,
+        subject: Optional[str] = None,
+        topics_any: Optional[List[str]] = None,
+        doc_ids_any: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
+        rescore: Optional[bool] = None,
+        oversampling: Optional[float] = None,
+        mode: Optional[str] = None,
+        batch_size: int = 64,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several queries with the same filters and knobs as `search`.
+
+        Cached queries are answered from the search cache; the rest are embedded
+        in one model call and sent in one `query_batch_points` request per
+        `batch_size` queries (evaluation runs can pass thousands).
+
+        Returns one hit list per input query, in input order, with the same hit
+        dicts as `search`. A failed batch yields empty lists for its queries.
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        has_sparse = await self._has_sparse_vector()
+        modes = [self._resolve_mode(q, mode, has_sparse) for q in queries]
+        cache_keys: List[Any] = [None] * len(queries)
+        generation = None
+        pending: List[int] = []
+        use_cache = await self._search_cache_ready(subject)
+
+        for i, (query, query_mode) in enumerate(zip(queries, modes)):
+            if use_cache:
+                cache_keys[i] = self._search_cache_key(
+                    query,
+                    query_mode,
+                    subject=subject,
+                    topics_any=topics_any,
+                    doc_ids_any=doc_ids_any,
+                    top_k=top_k,
+                    score_threshold=score_threshold,
+                    hnsw_ef=hnsw_ef,
+                    exact=exact,
+                    rescore=rescore,
+                    oversampling=oversampling,
+                )
+                results[i] = self.search_cache.get(cache_keys[i], subject)
+            if results[i] is None:
+                pending.append(i)
+        if use_cache:
+            generation = self.search_cache.generation(subject)
+
+        flt = self._build_filter(subject=subject, topics_any=topics_any, doc_ids_any=doc_ids_any)
+        params = self._build_search_params(hnsw_ef=hnsw_ef, exact=exact, rescore=rescore, oversampling=oversampling)
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                # 1) One embedding call for every query that needs a dense vector
+                dense_idx = [i for i in batch if modes[i] != "sparse"]
+                vectors = await self.embedding_executor.embed_many([queries[i] for i in dense_idx]) if dense_idx else []
+                qvs = dict(zip(dense_idx, vectors))
+
+                # 2) One round trip for the whole batch
+                requests = []
+                for i in batch:
+                    kwargs = self._query_kwargs(queries[i], modes[i], qvs.get(i), top_k=top_k, flt=flt, params=params)
+                    requests.append(
+                        QueryRequest(
+                            limit=top_k,
+                            with_payload=SEARCH_PAYLOAD_FIELDS,
+                            filter=kwargs.pop("query_filter", None),
+                            params=kwargs.pop("search_params", None),
+                            **kwargs,
+                        )
+                    )
+                responses = await self.client.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=requests,
+                )
+
+                # 3) Normalize, hydrate all texts in one fetch, and cache per query
+                for i, response in zip(batch, responses):
+                    results[i] = self._normalize_hits(response.points, modes[i], score_threshold)
+                await self._hydrate_texts([hit for i in batch for hit in results[i]])
+                for i in batch:
+                    if cache_keys[i] is not None:
+                        self.search_cache.put(cache_keys[i], subject, results[i], generation=generation)
+            except EmbeddingQueueFullError:
+                raise
+            except Exception as e:
+                self.error_handler.handle(e, context="QdrantStore.search_many")
+                for i in batch:
+                    results[i] = []
+
+        self.logger.info(f"search_many: {len(queries)} queries, {len(queries) - len(pending)} served from cache")
+        return results
+
+    async def _search_cache_ready(self, subject: Optional[str]) -> bool:
+        """Refresh the cache's shared generations; False (search uncached) if disabled or unreadable."""
+        if self.search_cache is None:
+            return False
+        try:
+            await self.search_cache.refresh(subject)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Search cache generations unavailable, searching uncached: {e}")
+            return False
+
+    def _search_cache_key(self, query: str, mode: str, **params: Any):
+        params["topics_any"] = params.get("topics_any") or ()
+        params["doc_ids_any"] = params.get("doc_ids_any") or ()
+        return self.search_cache.make_key(query, collection=self.collection_name, mode=mode, **params)
+
+    def _query_kwargs(
+        self,
+        query: str,
+        mode: str,
+        qv: Optional[List[float]],
+        *,
+        top_k: int,
+        flt: Optional[Filter],
+        params: SearchParams,
+    ) -> Dict[str, Any]:
+        """query_points arguments for one query in `mode` (qv is the dense vector, unused for sparse)."""
+        if mode == "sparse":
+            return {"query": sparse_encoder.encode_query(query), "using": SPARSE_VECTOR_NAME, "query_filter": flt}
+        if mode == "hybrid":
+            candidates = max(top_k * settings.QDRANT_HYBRID_PREFETCH_FACTOR, top_k)
+            return {
+                "prefetch": [
+                    Prefetch(query=qv, filter=flt, params=params, limit=candidates),
+                    Prefetch(query=sparse_encoder.encode_query(query), using=SPARSE_VECTOR_NAME, filter=flt, limit=candidates),
+                ],
+                "query": FusionQuery(fusion=Fusion.RRF),
+            }
+        return {"query": qv, "query_filter": flt, "search_params": params}
+
+    @staticmethod
+    def _normalize_hits(points: List[Any], mode: str, score_threshold: Optional[float]) -> List[Dict[str, Any]]:
+        # RRF/sparse scores are not cosine similarities, so the threshold only applies to dense
+        if mode != "dense":
+            score_threshold = None
+        return [
+            search_hit(h.payload, h.score, getattr(h, "id", None))
+            for h in points
+            if score_threshold is None or (h.score is not None and h.score >= score_threshold)
+        ]
+
+    async def _hydrate_texts(self, hits: List[Dict[str, Any]]):
+        """Fill in `text` from the chunk store for hits whose payload has none (one bulk read)."""
+        if self.chunk_store is None:
+            return
+        missing = [str(h["point_id"]) for h in hits if h.get("text") is None and h.get("point_id") is not None]
+        if not missing:
+            return
+        texts = await self.chunk_store.get_many(missing)
+        for h in hits:
+            if h.get("text") is None:
+                h["text"] = texts.get(str(h.get("point_id")))
+
+    def _resolve_mode(self, query: str, mode: Optional[str], has_sparse: bool = True) -> str:
+        mode = (mode or settings.QDRANT_SEARCH_MODE or "dense").lower()
+        if mode not in ("dense", "sparse", "hybrid", "auto"):
+            raise ValueError(f"Unknown search mode: {mode!r}")
+        if mode != "dense" and not (settings.QDRANT_SPARSE_ENABLED and has_sparse):
+            # Dense-only collection (or sparse disabled): fall back rather than fail
+            return "dense"
+        if mode == "auto":
+            return "sparse" if looks_like_keyword_query(query) else "hybrid"
+        return mode
+
+    def _build_search_params(
+        self,
+        *,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
+        rescore: Optional[bool] = None,
+        oversampling: Optional[float] = None,
+    ) -> SearchParams:
+        hnsw_ef = hnsw_ef if hnsw_ef is not None else (settings.QDRANT_SEARCH_HNSW_EF or None)
+        quantization = None
+        if self._desired_quantization() is not None or rescore is not None or oversampling is not None:
+            quantization = QuantizationSearchParams(
+                rescore=settings.QDRANT_SEARCH_RESCORE if rescore is None else rescore,
+                oversampling=settings.QDRANT_SEARCH_OVERSAMPLING if oversampling is None else oversampling,
+            )
+        return SearchParams(hnsw_ef=hnsw_ef, exact=bool(exact), quantization=quantization)
+
     def _build_filter(
         self,
         *,
@@ -288,10 +916,26 @@ class QdrantStore:
 
     # ----------------------- Maintenance -----------------------
 
-    async def delete_by_doc(self, doc_id: str) -> int:
+    async def _invalidate_search_cache(self, subjects: Iterable[Optional[str]]):
+        if self.search_cache is None:
+            return
+        subjects = set(subjects)
+        if not subjects or None in subjects:
+            self.search_cache.invalidate(None)
+        else:
+            for subject in subjects:
+                self.search_cache.invalidate(subject)
+        try:
+            await self.search_cache.publish_invalidation(subjects)
+        except Exception as e:
+            # The write itself succeeded; other processes catch up at TTL expiry
+            self.logger.warning(f"Could not publish search cache invalidation: {e}")
+
+    async def delete_by_doc(self, doc_id: str, subject: Optional[str] = None) -> int:
         """
         Delete all points that belong to a given doc_id.
         Returns the number of points deleted (best-effort: based on Qdrant response).
+        Cached searches for `subject` are invalidated (all subjects if not given).
         """
         try:
             # First, count how many points we're about to delete for logging
@@ -311,6 +955,10 @@ class QdrantStore:
                 points_selector=count_filter,
             )
             
+            if self.chunk_store is not None:
+                await self.chunk_store.delete_by_doc(doc_id)
+            await self._invalidate_search_cache([subject])
+
             # Log the operation result
             self.logger.info(f"Delete by doc_id='{doc_id}' acknowledged: {res.status}, estimated {estimated_count} points")
             return estimated_count
@@ -318,6 +966,47 @@ class QdrantStore:
             self.error_handler.handle(e, context="QdrantStore.delete_by_doc")
             return 0
 
+    async def delete_points(self, point_ids: List[str], subject: Optional[str] = None) -> int:
+        """
+        Delete specific points (e.g. the ones a canceled ingestion wrote for a document it was re-syncing).
+        Returns the number of IDs requested.
+        """
+        if not point_ids:
+            return 0
+        try:
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(point_ids)),
+            )
+            if self.chunk_store is not None:
+                await self.chunk_store.delete_many(list(point_ids))
+            await self._invalidate_search_cache([subject])
+            self.logger.info(f"Deleted {len(point_ids)} points by ID from '{self.collection_name}'")
+            return len(point_ids)
+        except Exception as e:
+            self.error_handler.handle(e, context="QdrantStore.delete_points")
+            return 0
+
+    async def delete_by_docs(self, doc_ids: List[str], subject: Optional[str] = None) -> int:
+        """
+        Delete every point of several documents in one call (e.g. rolling back a canceled ingestion).
+        Returns the approximate number of points deleted.
+        """
+        if not doc_ids:
+            return 0
+        try:
+            flt = Filter(must=[FieldCondition(key="doc_id", match=MatchAny(any=list(doc_ids)))])
+            count_result = await self.client.count(collection_name=self.collection_name, count_filter=flt, exact=False)
+            await self.client.delete(collection_name=self.collection_name, points_selector=flt)
+            if self.chunk_store is not None:
+                await self.chunk_store.delete_by_docs(doc_ids)
+            await self._invalidate_search_cache([subject])
+            self.logger.info(f"Deleted ~{count_result.count} points for {len(doc_ids)} documents")
+            return count_result.count
+        except Exception as e:
+            self.error_handler.handle(e, context="QdrantStore.delete_by_docs")
+            return 0
+
     async def count(self, subject: Optional[str] = None) -> int:
         """
         Count points in the collection (optionally filtered by subject).
@@ -331,7 +1020,5 @@ class QdrantStore:
             return 0
 
     async def close(self):
-        try:
-            await self.client.close()
-        except Exception as e:
-            self.logger.debug(f"Qdrant client close error: {e}")
+        """No-op: the pooled client is shared and closed by close_qdrant_clients() on shutdown."""
+        self.logger.debug(f"QdrantStore for '{self.collection_name}' released (pooled client stays open)")
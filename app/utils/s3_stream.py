@@ -0,0 +1,78 @@
+import hashlib
+import io
+import tempfile
+from typing import IO, Callable, Optional
+from app.core.config import settings
+
+
+class DownloadAborted(Exception):
+    """The caller's `should_stop` asked to abandon the download."""
+
+
+def download_to_spool(
+    s3_client,
+    bucket: str,
+    key: str,
+    *,
+    max_memory_bytes: Optional[int] = None,
+    chunk_bytes: Optional[int] = None,
+    spool_dir: Optional[str] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    hasher=None,
+) -> IO[bytes]:
+    """
+    Stream an S3 object into a spool file positioned at 0 (blocking; run in a thread).
+
+    Objects up to `max_memory_bytes` (per ContentLength) are kept in memory; larger ones
+    are written chunk by chunk to a named temporary file, so at most one chunk is in
+    memory and extraction processes can open the file by path. Closing the returned
+    file deletes it. `should_stop` is checked between chunks; when it returns True the
+    connection and spool are closed and DownloadAborted is raised. A `hasher`
+    (e.g. hashlib.sha256()) is fed every chunk, hashing the object in the same pass.
+    """
+    max_memory_bytes = settings.S3_SPOOL_MAX_MEMORY_BYTES if max_memory_bytes is None else max_memory_bytes
+    chunk_bytes = chunk_bytes or settings.S3_DOWNLOAD_CHUNK_BYTES
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    body = response["Body"]
+    size = response.get("ContentLength")
+    if size is not None and size <= max_memory_bytes:
+        spool: IO[bytes] = io.BytesIO()
+    else:
+        spool = tempfile.NamedTemporaryFile(suffix=".pdf", dir=spool_dir or settings.S3_SPOOL_DIR or None)
+    try:
+        for chunk in body.iter_chunks(chunk_bytes):
+            if should_stop is not None and should_stop():
+                raise DownloadAborted(f"Download of s3://{bucket}/{key} aborted")
+            spool.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+        spool.flush()
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        body.close()
+
+
+class HashingReader:
+    """
+    Read-only wrapper that hashes a stream as it is consumed (e.g. by `upload_fileobj`),
+    so an upload is hashed without a second pass. It deliberately has no seek/tell:
+    boto3 then reads it sequentially, which keeps the digest valid.
+    """
+
+    def __init__(self, raw: IO[bytes], hasher=None):
+        self.raw = raw
+        self.hasher = hasher or hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.hasher.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+# Generation bucket for searches without a subject filter; bumped by every write
+ANY_SUBJECT = "*"
+# Shared generation bumped by writes that may touch any subject
+ALL_SUBJECTS = "**"
+
+
+class SearchCache:
+    """
+    In-process LRU + TTL cache for QdrantStore.search results.
+
+    - Keys: normalized query text plus every argument that changes the result
+      (subject, topics_any, doc_ids_any, top_k, threshold, search params).
+    - Invalidation: a generation counter per subject. Entries remember the
+      generation they were computed at and are discarded once it moves.
+      Local counters only see writes made by this process; with
+      `share_generations`, writes also bump counters in a Mongo collection that
+      every process re-reads (`refresh`) before a lookup, so ingestion in
+      `python -m app.worker` or another replica invalidates this cache too.
+      Without it, other processes' writes are only picked up at TTL expiry.
+    - Counters: hits, misses, evictions (LRU/TTL) and invalidations (stale drops).
+
+    Local operations never await, so they are atomic on the event loop; the lock
+    only matters when the cache is touched from worker threads.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Tuple[int, ...], List[Dict[str, Any]]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._shared = None
+        self._shared_generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query: str, **params: Any) -> Tuple:
+        normalized = " ".join(query.lower().split())
+        frozen = tuple(
+            sorted((k, tuple(sorted(v)) if isinstance(v, (list, set, tuple)) else v) for k, v in params.items())
+        )
+        return (normalized, frozen)
+
+    def generation(self, subject: Optional[str]) -> Tuple[int, int, int, int]:
+        """Current generation for `subject`; capture it before searching and pass it to put()."""
+        bucket = subject or ANY_SUBJECT
+        return (
+            self._generations.get(bucket, 0),
+            self._global_generation,
+            self._shared_generations.get(bucket, 0),
+            self._shared_generations.get(ALL_SUBJECTS, 0),
+        )
+
+    def share_generations(self, collection):
+        """Also keep generations in `collection` (Mongo), shared by every process using it."""
+        self._shared = collection
+
+    async def refresh(self, subject: Optional[str]):
+        """Read the shared generations for `subject`; call before get() (no-op when not shared)."""
+        if self._shared is None:
+            return
+        buckets = [subject or ANY_SUBJECT, ALL_SUBJECTS]
+        found = {doc["_id"]: doc.get("generation", 0) async for doc in self._shared.find({"_id": {"$in": buckets}})}
+        with self._lock:
+            for bucket in buckets:
+                self._shared_generations[bucket] = found.get(bucket, 0)
+
+    async def publish_invalidation(self, subjects: Iterable[Optional[str]]):
+        """Bump the shared generations of `subjects` (None = every subject) for other processes."""
+        if self._shared is None:
+            return
+        subjects = set(subjects)
+        buckets = [ALL_SUBJECTS] if not subjects or None in subjects else [*subjects, ANY_SUBJECT]
+        for bucket in buckets:
+            await self._shared.update_one({"_id": bucket}, {"$inc": {"generation": 1}}, upsert=True)
+
+    def get(self, key: Hashable, subject: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, generation, results = entry
+            if generation != self.generation(subject):
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(r) for r in results]
+
+    def put(
+        self,
+        key: Hashable,
+        subject: Optional[str],
+        results: List[Dict[str, Any]],
+        generation: Optional[Tuple[int, int, int, int]] = None,
+    ):
+        """
+        Store results. Passing the generation captured before the search means a
+        write that lands mid-search leaves the entry already stale.
+        """
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + self.ttl_seconds,
+                generation if generation is not None else self.generation(subject),
+                [dict(r) for r in results],
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, subject: Optional[str] = None):
+        """Mark results for `subject` (and unfiltered searches) stale; None invalidates everything."""
+        with self._lock:
+            if subject is None:
+                self._global_generation += 1
+                return
+            self._generations[subject] = self._generations.get(subject, 0) + 1
+            self._generations[ANY_SUBJECT] = self._generations.get(ANY_SUBJECT, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+search_cache = SearchCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+)
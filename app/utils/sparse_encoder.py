@@ -0,0 +1,81 @@
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, List
+from qdrant_client.models import SparseVector
+
+# Name of the sparse vector in the Qdrant collection (the dense vector stays unnamed)
+SPARSE_VECTOR_NAME = "text-bm25"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Very common Spanish/English words that only add noise to lexical matching
+_STOPWORDS = frozenset(
+    """
+    a al como con de del el en es la las lo los o para por que se su un una y
+    the of and to in is are for on with as by an be this that it or from at
+    """.split()
+)
+
+_QUESTION_WORDS = frozenset(
+    """
+    que como cual cuales cuando donde por porque quien explica explicame
+    what how why when where which who explain describe
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case, accent-folded word tokens ("Schrödinger" -> "schrodinger")."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return [t for t in _TOKEN_RE.findall(folded) if t not in _STOPWORDS]
+
+
+def token_index(token: str) -> int:
+    """Stable 31-bit index for a token (hashing trick, no vocabulary to persist)."""
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+def looks_like_keyword_query(query: str, max_terms: int = 3) -> bool:
+    """Short, question-word-free queries such as "Thevenin" or "ecuacion de Schrödinger"."""
+    if "?" in query or "¿" in query:
+        return False
+    terms = tokenize(query)
+    return 0 < len(terms) <= max_terms and not any(t in _QUESTION_WORDS for t in terms)
+
+
+class SparseEncoder:
+    """
+    BM25-style sparse vectors for Qdrant.
+
+    Documents carry the saturated term-frequency part of BM25; the IDF part is
+    computed by Qdrant at query time (sparse vector configured with Modifier.IDF),
+    so no corpus statistics have to be kept here. Queries are plain term sets.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_len: float = 150.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_len = avg_doc_len
+
+    def _to_vector(self, weights: Dict[int, float]) -> SparseVector:
+        indices = sorted(weights)
+        return SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+    def encode_document(self, text: str) -> SparseVector:
+        tokens = tokenize(text)
+        doc_len = len(tokens) or 1
+        norm = self.k1 * (1 - self.b + self.b * doc_len / self.avg_doc_len)
+        weights: Dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            idx = token_index(token)
+            weights[idx] = weights.get(idx, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        return self._to_vector(weights)
+
+    def encode_query(self, text: str) -> SparseVector:
+        return self._to_vector({token_index(t): 1.0 for t in set(tokenize(text))})
+
+
+sparse_encoder = SparseEncoder()
@@ -0,0 +1,46 @@
+from typing import Awaitable, Callable, Optional, Union
+from app.core.config import settings
+from app.utils.chunk_store import ChunkTextStore
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.numpy_store import NumpyVectorStore
+from app.utils.qdrant_client import QdrantStore
+
+VectorStore = Union[QdrantStore, NumpyVectorStore]
+
+
+def subject_collection_resolver(db) -> Callable[[str], Awaitable[Optional[str]]]:
+    """Look up Subject.vector_collection by slug (None when the subject or field is missing)."""
+    subjects = db["subjects"]
+
+    async def resolve(subject_slug: str) -> Optional[str]:
+        doc = await subjects.find_one({"slug": subject_slug}, {"vector_collection": 1})
+        return (doc or {}).get("vector_collection") or None
+
+    return resolve
+
+
+def create_vector_store(
+    collection_name: Optional[str] = None,
+    embedding_cache: Optional[EmbeddingCache] = None,
+    chunk_store: Optional[ChunkTextStore] = None,
+    collection_resolver: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+) -> VectorStore:
+    """
+    Build the vector store selected by VECTOR_STORE_BACKEND (qdrant | numpy).
+    `chunk_store` only applies to Qdrant; the NumPy store keeps text in its local sidecar.
+    `collection_resolver` maps a subject slug to its collection (see `for_subject`).
+    """
+    collection_name = collection_name or settings.QDRANT_COLLECTION_NAME or "academia_docs"
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+    if backend == "numpy":
+        return NumpyVectorStore(collection_name, embedding_cache=embedding_cache, collection_resolver=collection_resolver)
+    if backend != "qdrant":
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND '{settings.VECTOR_STORE_BACKEND}' (expected qdrant or numpy)")
+    return QdrantStore(
+        url=settings.QDRANT_URL,
+        api_key=settings.QDRANT_API_KEY,
+        collection_name=collection_name,
+        embedding_cache=embedding_cache,
+        chunk_store=chunk_store,
+        collection_resolver=collection_resolver,
+    )
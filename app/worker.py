@@ -0,0 +1,77 @@
+"""
+Standalone ingestion worker: claims jobs from the Mongo queue shared with the API.
+
+    python -m app.worker [--workers N] [--processes P]
+
+Set INGESTION_WORKERS_IN_API=false on the API replicas to keep ingestion out of them.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+from app.core.config import settings
+from app.core.database import connect_to_mongo, close_mongo_connection, db
+from app.core.qdrant import close_qdrant_clients
+from app.services.ingestion_worker import IngestionWorkerPool
+from app.utils.embeddings import get_embedder
+from app.utils.embedding_executor import get_embedding_executor
+from app.utils.logger import Logger
+from app.utils.pdf_handler import shutdown_pdf_pools
+from app.utils.search_cache import search_cache
+
+
+async def run(workers: int):
+    logger = Logger()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await connect_to_mongo()
+    if settings.SEARCH_CACHE_SHARED:
+        # Ingestion here must invalidate the API replicas' search caches
+        search_cache.share_generations(db.database["search_generations"])
+    if settings.EMBEDDING_PRELOAD:
+        await asyncio.to_thread(get_embedder)
+    await get_embedding_executor().start()
+    pool = IngestionWorkerPool(db.database, workers)
+    await pool.start()
+    logger.info("Ingestion worker running; send SIGTERM to stop")
+    try:
+        await stop.wait()
+    finally:
+        await pool.close()
+        await get_embedding_executor().close()
+        await close_qdrant_clients()
+        shutdown_pdf_pools()
+        await close_mongo_connection()
+
+
+def _run_process(workers: int):
+    asyncio.run(run(workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.INGESTION_WORKERS, help="worker coroutines per process")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (each loads its own model)")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _run_process(args.workers)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_run_process, args=(args.workers,), daemon=False) for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT and release their jobs on the way out
+        for p in procs:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
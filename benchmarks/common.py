@@ -0,0 +1,38 @@
+"""Helpers shared by the benchmark scripts (run from the repo root, e.g. `python -m benchmarks.embedding_backends`)."""
+import glob
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from app.models.ingestion import IngestionOptions
+from app.utils.chunker import chunk_pages
+from app.utils.pdf_handler import PDFHandler
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def sample_pdfs(pattern: str = "*.pdf") -> List[str]:
+    return sorted(glob.glob(os.path.join(DATA_DIR, pattern)))
+
+
+def sample_chunks(limit: Optional[int] = None, chunk_size: Optional[int] = None, pattern: str = "*.pdf") -> List[str]:
+    """Chunks from the bundled data/ PDFs, cut the same way ingestion does (default IngestionOptions)."""
+    options = IngestionOptions()
+    handler = PDFHandler(workers=1)
+    chunks: List[str] = []
+    for path in sample_pdfs(pattern):
+        pages = handler.read_pages(path)
+        for chunk in chunk_pages(pages, chunk_size=chunk_size or options.chunk_size, chunk_overlap=options.chunk_overlap):
+            chunks.append(chunk["text"])
+            if limit is not None and len(chunks) >= limit:
+                return chunks
+    return chunks
+
+
+@contextmanager
+def timed(label: str, items: Optional[int] = None, unit: str = "items") -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    rate = f", {items / elapsed:,.1f} {unit}/s" if items else ""
+    print(f"{label:<40} {elapsed:8.3f}s{rate}")
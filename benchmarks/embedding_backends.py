@@ -0,0 +1,41 @@
+"""
+Throughput of the torch and ONNX Runtime embedding backends on chunks from data/.
+
+    python -m benchmarks.embedding_backends [--limit 2000] [--batch-size 32]
+"""
+import argparse
+import numpy as np
+from app.utils.embeddings import Embedder
+from benchmarks.common import sample_chunks, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    chunks = sample_chunks(limit=args.limit)
+    print(f"{len(chunks)} chunks from data/")
+
+    results = {}
+    for label, backend, quantize in [("torch fp32", "torch", False), ("onnx fp32", "onnx", False), ("onnx int8", "onnx", True)]:
+        embedder = Embedder(backend=backend, onnx_quantize=quantize)
+        if not embedder.is_loaded:
+            print(f"{label}: backend unavailable, skipped")
+            continue
+        embedder.generate(chunks[:args.batch_size])  # warm-up
+        with timed(label, items=len(chunks), unit="chunks"):
+            results[label] = np.asarray(embedder.generate(chunks, batch_size=args.batch_size))
+
+    if "torch fp32" in results:
+        ref = results["torch fp32"]
+        ref = ref / np.linalg.norm(ref, axis=1, keepdims=True)
+        for label, vecs in results.items():
+            vecs = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+            dist = 1 - (ref * vecs).sum(axis=1)
+            print(f"{label:<40} cosine distance vs torch: max={dist.max():.5f} mean={dist.mean():.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Fixed-size vs token-budget batching on the real chunk length distribution of data/.
+
+    python -m benchmarks.embedding_batching [--limit 2000] [--token-budget 8192]
+
+Padding efficiency (real tokens / padded tokens) only needs the tokenizer; wall-clock
+numbers are printed when the model itself can be loaded.
+"""
+import argparse
+from app.core.config import settings
+from app.utils.embeddings import Embedder, plan_token_batches
+from benchmarks.common import sample_chunks, timed
+
+
+def fixed_batches(n: int, size: int):
+    return [list(range(i, min(i + size, n))) for i in range(0, n, size)]
+
+
+def padding_efficiency(lengths, batches):
+    real = sum(lengths)
+    padded = sum(len(b) * max(lengths[i] for i in b) for b in batches)
+    return real / padded, padded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--token-budget", type=int, default=settings.EMBEDDING_TOKEN_BUDGET)
+    parser.add_argument("--max-batch", type=int, default=settings.EMBEDDING_MAX_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    chunks = sample_chunks(limit=args.limit)
+    tokenizer = AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL_NAME)
+    lengths = [len(ids) for ids in tokenizer(chunks, truncation=True, max_length=512)["input_ids"]]
+    print(f"{len(chunks)} chunks, tokens min/mean/max = {min(lengths)}/{sum(lengths) / len(lengths):.0f}/{max(lengths)}")
+
+    for label, batches in [
+        ("fixed 32, input order", fixed_batches(len(lengths), 32)),
+        (f"token budget {args.token_budget}", plan_token_batches(lengths, args.token_budget, args.max_batch)),
+    ]:
+        eff, padded = padding_efficiency(lengths, batches)
+        print(f"{label:<40} {len(batches):5d} batches, {padded:9d} padded tokens, {eff:6.1%} useful")
+
+    embedder = Embedder()
+    if not embedder.is_loaded:
+        print("model unavailable, skipping wall-clock comparison")
+        return
+    embedder.generate(chunks[:32])  # warm-up
+    # A budget of 32 * 512 with batch size 32 reproduces the old fixed batching
+    with timed("fixed 32, input order", items=len(chunks), unit="chunks"):
+        for b in fixed_batches(len(chunks), 32):
+            embedder.generate([chunks[i] for i in b], batch_size=32, token_budget=32 * 512)
+    with timed(f"token budget {args.token_budget}", items=len(chunks), unit="chunks"):
+        embedder.generate(chunks, batch_size=args.max_batch, token_budget=args.token_budget)
+
+
+if __name__ == "__main__":
+    main()
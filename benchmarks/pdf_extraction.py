@@ -0,0 +1,55 @@
+"""
+Single-process vs page-range process-pool text extraction on the bundled data/ PDFs.
+
+    python -m benchmarks.pdf_extraction [--workers 1,2,4] [--tasks-per-worker 2] [--max-pages 32]
+
+The pool is started (and its workers imported) before timing, as it is in a running API.
+"""
+import argparse
+import asyncio
+import os
+from app.core.config import settings
+from app.utils.pdf_handler import PDFHandler, shutdown_pdf_pools
+from benchmarks.common import sample_pdfs, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count()}")
+    parser.add_argument("--tasks-per-worker", type=int, default=settings.PDF_EXTRACT_TASKS_PER_WORKER)
+    parser.add_argument("--max-pages", type=int, default=settings.PDF_EXTRACT_MAX_PAGES_PER_TASK)
+    parser.add_argument("--pattern", default="*.pdf")
+    args = parser.parse_args()
+
+    pdfs = []
+    for path in sample_pdfs(args.pattern):
+        with open(path, "rb") as f:
+            pdfs.append(f.read())
+    baseline_handler = PDFHandler(workers=1)
+    with timed("sequential read_pages", items=len(pdfs), unit="pdfs"):
+        baseline = [baseline_handler.read_pages(pdf) for pdf in pdfs]
+    pages = sum(len(p) for p in baseline)
+    print(f"{len(pdfs)} PDFs, {pages} pages")
+
+    for workers in sorted({int(w) for w in args.workers.split(",") if int(w) > 1}):
+        handler = PDFHandler(
+            workers=workers,
+            tasks_per_worker=args.tasks_per_worker,
+            max_pages_per_task=args.max_pages,
+            min_parallel_pages=1,
+        )
+
+        async def run():
+            await handler.read_pages_parallel(pdfs[0])  # warm up the pool
+            with timed(f"pool[{workers}] one PDF at a time", items=pages, unit="pages"):
+                one_by_one = [await handler.read_pages_parallel(pdf) for pdf in pdfs]
+            with timed(f"pool[{workers}] all PDFs at once", items=pages, unit="pages"):
+                together = await asyncio.gather(*(handler.read_pages_parallel(pdf) for pdf in pdfs))
+            assert one_by_one == baseline and list(together) == baseline, "page text differs from sequential"
+
+        asyncio.run(run())
+    shutdown_pdf_pools()
+
+
+if __name__ == "__main__":
+    main()
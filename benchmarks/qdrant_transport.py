@@ -0,0 +1,117 @@
+"""
+REST vs gRPC, and pooled vs per-request clients, for upsert and search against a live Qdrant.
+
+    python -m benchmarks.qdrant_transport [--limit 2000] [--queries 200] [--concurrency 8]
+
+Payloads are the chunks of the bundled data/ PDFs. Vectors come from the embedding
+model when it can be loaded, otherwise random unit vectors of the same size (the
+transport cost does not depend on their values). A scratch collection is created
+and dropped for each transport.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+from app.core.config import settings
+from app.core.qdrant import QdrantClientPool
+from benchmarks.common import sample_chunks
+
+
+def corpus_vectors(chunks, dim: int = 384) -> np.ndarray:
+    try:
+        from app.utils.embeddings import get_embedder
+
+        vectors = get_embedder().generate(chunks)
+        if len(vectors) == len(chunks):
+            return np.asarray(vectors, dtype=np.float32)
+    except Exception as e:
+        print(f"embedding model unavailable ({e.__class__.__name__}); using random vectors")
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((len(chunks), dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def run_transport(label, client_factory, chunks, vectors, queries, concurrency, pooled):
+    name = f"bench-{uuid.uuid4().hex[:8]}"
+    admin = client_factory()
+    await admin.create_collection(name, vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE))
+    try:
+        start = time.perf_counter()
+        for i in range(0, len(chunks), 128):
+            points = [
+                PointStruct(id=j, vector=vectors[j].tolist(), payload={"text": chunks[j], "chunk_id": j})
+                for j in range(i, min(i + 128, len(chunks)))
+            ]
+            await admin.upsert(name, points=points, wait=True)
+        upsert_s = time.perf_counter() - start
+
+        sem = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(q):
+            async with sem:
+                client = admin if pooled else client_factory()
+                t = time.perf_counter()
+                await client.query_points(name, query=q.tolist(), limit=8, with_payload=True)
+                latencies.append((time.perf_counter() - t) * 1000)
+                if not pooled:
+                    await client.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in queries))
+        search_s = time.perf_counter() - start
+        latencies.sort()
+        print(
+            f"{label:<28} upsert {len(chunks) / upsert_s:8.0f} pts/s   "
+            f"search {len(queries) / search_s:7.0f} q/s  p50={latencies[len(latencies) // 2]:6.2f}ms  "
+            f"p95={latencies[int(0.95 * (len(latencies) - 1))]:6.2f}ms"
+        )
+    finally:
+        await admin.delete_collection(name)
+        await admin.close()
+
+
+async def main_async(args):
+    chunks = sample_chunks(limit=args.limit)
+    if not chunks:
+        print("no sample PDFs found under data/")
+        return
+    vectors = corpus_vectors(chunks)
+    queries = vectors[np.random.default_rng(1).integers(0, len(vectors), args.queries)]
+    print(f"{len(chunks)} chunks, dim={vectors.shape[1]}, {args.queries} queries, concurrency={args.concurrency}")
+
+    try:
+        probe = AsyncQdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY or None)
+        await probe.get_collections()
+        await probe.close()
+    except Exception as e:
+        print(f"Qdrant at {settings.QDRANT_URL} unreachable ({e.__class__.__name__}); nothing to measure")
+        return
+
+    for prefer_grpc in (False, True):
+        transport = "grpc" if prefer_grpc else "rest"
+
+        def pooled_factory():
+            # A fresh pool per run so each transport starts cold, like a new process
+            return QdrantClientPool().get(settings.QDRANT_URL, settings.QDRANT_API_KEY, prefer_grpc=prefer_grpc)
+
+        def bare_factory():
+            return AsyncQdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY or None, prefer_grpc=prefer_grpc)
+
+        await run_transport(f"{transport}, pooled client", pooled_factory, chunks, vectors, queries, args.concurrency, True)
+        await run_transport(f"{transport}, client per request", bare_factory, chunks, vectors, queries, args.concurrency, False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
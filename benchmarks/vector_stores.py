@@ -0,0 +1,120 @@
+"""
+Brute-force NumPy store vs Qdrant search latency on synthetic unit vectors.
+
+    python -m benchmarks.vector_stores [--sizes 10000,100000,500000] [--dim 384] [--queries 50]
+
+Vectors are written straight into the stores (no embedding model needed). Qdrant is
+only measured when QDRANT_URL is reachable; its collection is created and dropped here.
+"""
+import argparse
+import asyncio
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+import numpy as np
+from app.core.config import settings
+from app.utils.numpy_store import NumpyVectorStore
+from benchmarks.common import timed
+
+SUBJECTS = ["fisica", "quimica", "circuitos", "calculo"]
+
+
+def synthetic(n: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metas = [
+        {"doc_id": f"doc-{i // 50}", "chunk_id": i % 50, "subject": SUBJECTS[i % len(SUBJECTS)], "text": f"chunk {i}"}
+        for i in range(n)
+    ]
+    return vectors, metas
+
+
+def report(label: str, latencies_ms):
+    latencies_ms = sorted(latencies_ms)
+    p95 = latencies_ms[int(0.95 * (len(latencies_ms) - 1))]
+    print(f"{label:<40} p50={statistics.median(latencies_ms):8.2f}ms  p95={p95:8.2f}ms")
+
+
+def bench_numpy(vectors, metas, queries, dtype: str, top_k: int):
+    root = tempfile.mkdtemp(prefix="numpy-store-")
+    try:
+        store = NumpyVectorStore("bench", root_dir=root, dtype=dtype)
+        asyncio.run(store.init_store(vector_size=vectors.shape[1]))
+        with timed(f"numpy[{dtype}] insert", items=len(vectors), unit="vectors"):
+            for i in range(0, len(vectors), 10000):
+                store._write_rows(
+                    [m["text"] for m in metas[i:i + 10000]], vectors[i:i + 10000], metas[i:i + 10000]
+                )
+            store._flush()
+        for label, subject in [("all", None), ("subject", SUBJECTS[0])]:
+            mask = store._mask(subject, None, None)
+            latencies = []
+            for q in queries:
+                start = time.perf_counter()
+                store._top_k(q, top_k, mask)
+                latencies.append((time.perf_counter() - start) * 1000)
+            report(f"numpy[{dtype}] search ({label})", latencies)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_qdrant(vectors, metas, queries, top_k: int):
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, FieldCondition, Filter, MatchValue, PointStruct, VectorParams
+
+    client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY or None, timeout=60)
+    try:
+        client.get_collections()
+    except Exception as e:
+        print(f"qdrant: skipped ({settings.QDRANT_URL} unreachable: {e.__class__.__name__})")
+        return
+    name = f"bench-{uuid.uuid4().hex[:8]}"
+    client.create_collection(name, vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE))
+    try:
+        with timed("qdrant insert", items=len(vectors), unit="vectors"):
+            for i in range(0, len(vectors), 1000):
+                client.upsert(
+                    name,
+                    points=[
+                        PointStruct(id=j, vector=vectors[j].tolist(), payload=metas[j])
+                        for j in range(i, min(i + 1000, len(vectors)))
+                    ],
+                    wait=True,
+                )
+        subject_filter = Filter(must=[FieldCondition(key="subject", match=MatchValue(value=SUBJECTS[0]))])
+        for label, query_filter in [("all", None), ("subject", subject_filter)]:
+            latencies = []
+            for q in queries:
+                start = time.perf_counter()
+                client.query_points(name, query=q.tolist(), limit=top_k, query_filter=query_filter)
+                latencies.append((time.perf_counter() - start) * 1000)
+            report(f"qdrant search ({label})", latencies)
+    finally:
+        client.delete_collection(name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,500000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--skip-qdrant", action="store_true")
+    args = parser.parse_args()
+
+    for n in (int(s) for s in args.sizes.split(",")):
+        print(f"\n== {n:,} chunks, dim={args.dim} ==")
+        vectors, metas = synthetic(n, args.dim)
+        queries, _ = synthetic(args.queries, args.dim, seed=1)
+        for dtype in ("float32", "float16"):
+            bench_numpy(vectors, metas, queries, dtype, args.top_k)
+        if not args.skip_qdrant:
+            bench_qdrant(vectors, metas, queries, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
+from app.core.readiness import readiness
 from app.main import app
 
 client = TestClient(app)
@@ -10,11 +11,49 @@ def test_health_check():
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
 
-def test_readiness_check():
-    """Test readiness check endpoint"""
+@pytest.fixture
+def fake_checks(monkeypatch):
+    """Replace the real dependency probes and start from an empty cache"""
+    calls = []
+
+    def make(name, fail=False):
+        async def check():
+            calls.append(name)
+            if fail:
+                raise RuntimeError(f"{name} down")
+        return check
+
+    monkeypatch.setattr(readiness, "checks", {})
+    monkeypatch.setattr(readiness, "results", {})
+    monkeypatch.setattr(readiness, "_lock", None)
+    return make, calls
+
+def test_readiness_check(fake_checks):
+    """Test readiness check endpoint reports every dependency and caches probes"""
+    make, calls = fake_checks
+    for name in ("mongo", "qdrant", "s3", "embedder"):
+        readiness.register(name, make(name))
     response = client.get("/api/v1/readyz")
     assert response.status_code == 200
-    assert response.json() == {"status": "ready"}
+    body = response.json()
+    assert body["status"] == "ready"
+    assert set(body["checks"]) == {"mongo", "qdrant", "s3", "embedder"}
+    assert all(c["status"] == "ok" and "latency_ms" in c for c in body["checks"].values())
+
+    assert client.get("/api/v1/readyz").json()["cached"] is True
+    assert len(calls) == 4
+
+def test_readiness_check_failing_dependency(fake_checks):
+    """Test readiness is 503 while any dependency is down"""
+    make, _ = fake_checks
+    readiness.register("mongo", make("mongo"))
+    readiness.register("qdrant", make("qdrant", fail=True))
+    response = client.get("/api/v1/readyz")
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "not_ready"
+    assert body["checks"]["qdrant"] == {"status": "error", "error": "RuntimeError: qdrant down", "latency_ms": body["checks"]["qdrant"]["latency_ms"]}
+    assert body["checks"]["mongo"]["status"] == "ok"
 
 def test_docs_available():
     """Test that API documentation is available"""
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+from app.utils import qdrant_client
+from app.utils.qdrant_client import SEARCH_PAYLOAD_FIELDS, QdrantStore
+
+class FakeExecutor:
+    async def embed(self, text):
+        return [1.0, 0.0]
+
+    async def embed_many(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+class FakeChunkStore:
+    def __init__(self):
+        self.texts = {}
+        self.reads = []
+
+    async def put_many(self, items):
+        self.texts.update({i["point_id"]: i["text"] for i in items})
+
+    async def get_many(self, point_ids):
+        self.reads.append(list(point_ids))
+        return {pid: self.texts[pid] for pid in point_ids if pid in self.texts}
+
+class FakeQdrant:
+    def __init__(self):
+        self.points = {}
+        self.with_payload = None
+
+    async def upsert(self, collection_name, points):
+        self.points.update({p.id: p for p in points})
+
+    async def query_points(self, collection_name, query, query_filter, limit, search_params, with_payload):
+        self.with_payload = with_payload
+        hits = [SimpleNamespace(id=p.id, score=1.0 - i / 10, payload=p.payload) for i, p in enumerate(self.points.values())]
+        return SimpleNamespace(points=hits[:limit])
+
+def test_text_is_kept_out_of_payload_and_hydrated_for_top_k(monkeypatch):
+    """Points carry no text; search selects payload fields and fetches text for the final hits in one read"""
+    monkeypatch.setattr(qdrant_client, "get_embedding_executor", lambda: FakeExecutor())
+    chunk_store = FakeChunkStore()
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="test", chunk_store=chunk_store)
+    store.search_cache = None
+    store.client = FakeQdrant()
+
+    async def run():
+        chunks = [{"text": f"chunk {i}", "doc_id": "doc-1", "chunk_id": i, "subject": "Physics"} for i in range(5)]
+        await store.upsert_chunks(chunks)
+        return await store.search("chunk", top_k=2)
+
+    hits = asyncio.run(run())
+    assert all("text" not in p.payload for p in store.client.points.values())
+    assert len(chunk_store.texts) == 5
+    assert store.client.with_payload == SEARCH_PAYLOAD_FIELDS
+    assert [h["text"] for h in hits] == ["chunk 0", "chunk 1"]
+    assert chunk_store.reads == [[h["point_id"] for h in hits]]
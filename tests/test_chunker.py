@@ -0,0 +1,52 @@
+from app.utils.chunker import MAX_CHUNK_TOKENS, approximate_token_count, chunk_pages
+
+def _page(n, sentences=12):
+    return "\n\n".join(
+        " ".join(f"Oración {n}.{p}.{i} sobre circuitos en serie." for i in range(sentences // 3))
+        for p in range(3)
+    )
+
+def test_chunks_respect_token_budget_sentences_and_pages():
+    """No chunk exceeds chunk_size tokens, every chunk is whole sentences, pages are tracked"""
+    pages = [_page(n) for n in range(1, 6)]
+    chunks = list(chunk_pages(pages, chunk_size=40, chunk_overlap=12))
+
+    assert [c["chunk_id"] for c in chunks] == list(range(len(chunks)))
+    for c in chunks:
+        assert c["tokens"] == approximate_token_count(c["text"]) <= 40
+        assert c["text"].startswith("Oración") and c["text"].endswith("serie.")
+        assert 1 <= c["page_start"] <= c["page_end"] <= 5
+    assert chunks[0]["page_start"] == 1 and chunks[-1]["page_end"] == 5
+    assert any(c["page_start"] < c["page_end"] for c in chunks)
+    # Every sentence is covered, in order
+    text = " ".join(c["text"] for c in chunks)
+    assert all(f"Oración {n}.2.3 " in text for n in range(1, 6))
+
+def test_overlap_repeats_trailing_sentences():
+    sentences = [f"Frase número {i} del texto." for i in range(20)]
+    chunks = list(chunk_pages([" ".join(sentences)], chunk_size=30, chunk_overlap=8))
+    for prev, cur in zip(chunks, chunks[1:]):
+        last_sentence = prev["text"].rsplit(". ", 1)[-1]
+        assert cur["text"].startswith(last_sentence.rstrip("."))
+    without = list(chunk_pages([" ".join(sentences)], chunk_size=30, chunk_overlap=0))
+    assert len(without) < len(chunks)
+    assert " ".join(c["text"] for c in without) == " ".join(sentences)
+
+def test_long_sentences_split_between_words_and_budget_is_capped():
+    words = ["palabra"] * 2000
+    chunks = list(chunk_pages([" ".join(words)], chunk_size=5000))
+    assert all(c["tokens"] <= MAX_CHUNK_TOKENS for c in chunks)
+    assert sum(c["tokens"] for c in chunks) == 2000 and all(" palabra" in c["text"] for c in chunks)
+
+def test_pages_are_consumed_lazily():
+    """The chunker streams: it only pulls a page when the current one is exhausted"""
+    pulled = []
+
+    def pages():
+        for n in range(1, 100):
+            pulled.append(n)
+            yield _page(n)
+
+    first = next(chunk_pages(pages(), chunk_size=30))
+    assert first["page_start"] == 1 and pulled == [1]
+    assert list(chunk_pages(["", "   ", ""], chunk_size=30)) == []
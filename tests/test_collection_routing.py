@@ -0,0 +1,47 @@
+import asyncio
+from app.utils import qdrant_client
+from app.utils.numpy_store import NumpyVectorStore
+from app.utils.qdrant_client import QdrantStore
+
+COLLECTIONS = {"fisica-1": "fisica_docs", "quimica-1": "quimica_docs", "sin-coleccion": ""}
+
+async def resolve(slug):
+    return COLLECTIONS.get(slug)
+
+def test_subjects_route_to_their_collection_with_shared_client(monkeypatch):
+    """Each subject gets a view on its own collection; unknown/empty falls back to the default"""
+    monkeypatch.setattr(qdrant_client, "_READY_COLLECTIONS", set())
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="documents", collection_resolver=resolve)
+    initialized = []
+
+    async def fake_init_store(self, vector_size=None):
+        initialized.append(self.collection_name)
+        qdrant_client._READY_COLLECTIONS.add((self.url, self.collection_name))
+
+    monkeypatch.setattr(QdrantStore, "init_store", fake_init_store)
+
+    async def run():
+        fisica = await store.for_subject("fisica-1", create=True)
+        again = await store.for_subject("fisica-1", create=True)
+        quimica = await store.for_subject("quimica-1")
+        fallback = [await store.for_subject(s) for s in ("sin-coleccion", "desconocida", None)]
+        return fisica, again, quimica, fallback
+
+    fisica, again, quimica, fallback = asyncio.run(run())
+    assert (fisica.collection_name, quimica.collection_name) == ("fisica_docs", "quimica_docs")
+    assert fisica is again and fisica.client is store.client
+    assert all(s is store for s in fallback)
+    assert initialized == ["fisica_docs"]
+
+def test_numpy_store_routes_per_subject_directory(tmp_path):
+    """The NumPy backend keeps one matrix per collection, shared across store instances"""
+    store = NumpyVectorStore("documents", root_dir=str(tmp_path), collection_resolver=resolve)
+
+    async def run():
+        fisica = await store.for_subject("fisica-1", create=True)
+        other_instance = NumpyVectorStore("documents", root_dir=str(tmp_path), collection_resolver=resolve)
+        return fisica, await other_instance.for_subject("fisica-1")
+
+    fisica, shared = asyncio.run(run())
+    assert fisica is shared
+    assert (tmp_path / "fisica_docs").is_dir()
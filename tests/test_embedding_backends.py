@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from app.utils.embedding_backends import ONNX_INT8_COSINE_TOLERANCE, ONNX_FP32_COSINE_TOLERANCE
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+
+from app.utils.embeddings import Embedder
+from benchmarks.common import sample_chunks
+
+def _cosine_distance(a, b):
+    a = np.asarray(a) / np.linalg.norm(a, axis=1, keepdims=True)
+    b = np.asarray(b) / np.linalg.norm(b, axis=1, keepdims=True)
+    return 1 - (a * b).sum(axis=1)
+
+@pytest.fixture(scope="module")
+def reference():
+    torch_embedder = Embedder(backend="torch")
+    if not torch_embedder.is_loaded:
+        pytest.skip("embedding model not available (offline?)")
+    chunks = sample_chunks(limit=64)
+    return chunks, torch_embedder.generate(chunks)
+
+@pytest.mark.parametrize("quantize,tolerance", [(False, ONNX_FP32_COSINE_TOLERANCE), (True, ONNX_INT8_COSINE_TOLERANCE)])
+def test_onnx_vectors_match_torch(reference, tmp_path_factory, quantize, tolerance, monkeypatch):
+    """ONNX vectors stay within the documented cosine tolerance of the torch vectors"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "EMBEDDING_ONNX_DIR", str(tmp_path_factory.mktemp("onnx")))
+    chunks, expected = reference
+    onnx_embedder = Embedder(backend="onnx", onnx_quantize=quantize)
+    assert onnx_embedder.is_loaded
+    assert _cosine_distance(expected, onnx_embedder.generate(chunks)).max() <= tolerance
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import numpy as np
+from app.utils import embeddings, qdrant_client
+from app.utils.embeddings import Embedder, get_embedder, loaded_embedders, plan_token_batches
+from app.utils.error_handler import ErrorHandler
+from app.utils.logger import Logger
+
+class FakeTokenizer:
+    """Whitespace 'tokenizer' with the two calls Embedder.generate relies on"""
+    def __call__(self, texts, truncation=True, max_length=512):
+        return {"input_ids": [[len(w) for w in t.split()][:max_length] for t in texts]}
+
+    def pad(self, features, return_tensors="np"):
+        longest = max(len(f["input_ids"]) for f in features)
+        ids = [f["input_ids"] + [0] * (longest - len(f["input_ids"])) for f in features]
+        return {"input_ids": np.array(ids)}
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.shapes = []
+
+    def encode(self, inputs):
+        self.shapes.append(inputs["input_ids"].shape)
+        # Vector = number of real tokens, so outputs can be matched to inputs
+        return (inputs["input_ids"] > 0).sum(axis=1, keepdims=True).astype(np.float32)
+
+def test_batches_respect_budget_and_cover_every_item():
+    """Every index is scheduled once and no batch exceeds the padded-token budget"""
+    lengths = [5, 300, 12, 7, 512, 40, 3, 256, 9, 11]
+    batches = plan_token_batches(lengths, token_budget=600, max_batch_size=4)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    for b in batches:
+        assert len(b) <= 4
+        assert len(b) == 1 or len(b) * max(lengths[i] for i in b) <= 600
+
+def test_generate_restores_input_order():
+    """Length-bucketed batches are scattered back into the original order"""
+    # Bypass __init__ so no real model is loaded
+    embedder = Embedder.__new__(Embedder)
+    embedder.logger = Logger()
+    embedder.error_handler = ErrorHandler(embedder.logger)
+    embedder.tokenizer = FakeTokenizer()
+    embedder.backend = FakeBackend()
+
+    texts = ["a " * 30, "b", "c " * 4, "d " * 2, "e " * 30]
+    vectors = embedder.generate(texts, batch_size=8, token_budget=16)
+
+    assert vectors == [[30.0], [1.0], [4.0], [2.0], [30.0]]
+    # Short texts were never padded to the long ones
+    assert (3, 4) in embedder.backend.shapes
+
+def test_registry_shares_one_embedder_per_key_and_retries_failed_loads(monkeypatch):
+    """One instance per model/backend, failed loads are not cached, loaded_embedders lists what is held"""
+    monkeypatch.setattr(embeddings, "_embedders", {})
+    created = []
+    failing = {"bad"}
+
+    class StubEmbedder:
+        embedding_size = 8
+
+        def __init__(self, model_name, backend="torch"):
+            created.append((model_name, backend, threading.current_thread()))
+            self.backend = None if model_name in failing else FakeBackend()
+
+        @property
+        def is_loaded(self):
+            return self.backend is not None
+
+    monkeypatch.setattr(embeddings, "Embedder", StubEmbedder)
+    first = get_embedder("mini", "torch")
+    assert get_embedder("mini", "torch") is first
+    assert get_embedder("mini", "onnx") is not first
+    assert not get_embedder("bad", "torch").is_loaded
+    failing.clear()
+    assert get_embedder("bad", "torch").is_loaded
+    assert [c[:2] for c in created] == [("mini", "torch"), ("mini", "onnx"), ("bad", "torch"), ("bad", "torch")]
+    assert set(loaded_embedders()) == {"mini:torch", "mini:onnx", "bad:torch"}
+
+    # A Qdrant collection sized from the embedder loads it off the event loop
+    class Client:
+        async def get_collection(self, collection_name):
+            raise ValueError("missing")
+
+        async def create_collection(self, collection_name, vectors_config, **kwargs):
+            self.size = vectors_config.size
+
+        async def create_payload_index(self, collection_name, field_name, field_schema):
+            pass
+
+    monkeypatch.setattr(embeddings, "_embedders", {})
+    created.clear()
+    store = qdrant_client.QdrantStore(url="http://localhost:6333", api_key="", collection_name="sized")
+    store.client = Client()
+    asyncio.run(store.init_store())
+    assert store.client.size == 8
+    assert len(created) == 1 and created[0][2] is not threading.main_thread()
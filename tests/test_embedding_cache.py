@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+from mongomock_motor import AsyncMongoMockClient
+from app.core.config import settings
+from app.utils import qdrant_client
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.embeddings import Embedder, embedding_model_id
+from app.utils.qdrant_client import QdrantStore
+
+class FakeExecutor:
+    def __init__(self):
+        self.calls = []
+
+    async def embed_many(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+class FakeCache:
+    def __init__(self, entries):
+        self.entries = dict(entries)
+
+    async def get_many(self, texts):
+        return {i: self.entries[t] for i, t in enumerate(texts) if t in self.entries}
+
+    async def put_many(self, texts, vectors):
+        self.entries.update(zip(texts, vectors))
+
+def test_cache_key_ignores_whitespace_but_not_model():
+    """Keys are stable under cosmetic whitespace changes and scoped by model"""
+    cache = EmbeddingCache(collection=None, model_id="model-a")
+    assert cache.key("Ley de  Ohm\n V = IR") == cache.key("Ley de Ohm V = IR")
+    assert cache.key("Ley de Ohm") != EmbeddingCache(collection=None, model_id="model-b").key("Ley de Ohm")
+
+def test_model_id_follows_the_embedders_quantize_override(monkeypatch):
+    """An embedder overriding EMBEDDING_ONNX_QUANTIZE caches under its own vectors' id"""
+    monkeypatch.setattr(settings, "EMBEDDING_ONNX_QUANTIZE", True)
+    assert embedding_model_id("m", "onnx") == "m#onnx-int8"
+    assert embedding_model_id("m", "onnx", onnx_quantize=False) == "m"
+
+    # Bypass __init__ so no real model is loaded
+    embedder = Embedder.__new__(Embedder)
+    embedder.model_name, embedder.backend_name, embedder.onnx_quantize = "m", "onnx", False
+    assert embedder.model_id == "m"
+    embedder.backend_name, embedder.onnx_quantize = "torch", True
+    assert embedder.model_id == "m"
+
+def test_store_only_embeds_cache_misses(monkeypatch):
+    """Cached chunks skip the model; results keep input order"""
+    executor = FakeExecutor()
+    monkeypatch.setattr(qdrant_client, "get_embedding_executor", lambda: executor)
+    cache = FakeCache({"cached one": [42.0]})
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="test", embedding_cache=cache)
+
+    vectors = asyncio.run(store._embed_with_cache(["new", "cached one", "newer"]))
+
+    assert vectors == [[3.0], [42.0], [5.0]]
+    assert executor.calls == [["new", "newer"]]
+    assert cache.entries["newer"] == [5.0]
+
+def test_writes_past_max_entries_evict_least_recently_used():
+    """The cache stays bounded by dropping the entries unused for longest"""
+    collection = AsyncMongoMockClient()["test"]["embedding_cache"]
+    cache = EmbeddingCache(collection, model_id="model-a", max_entries=3)
+    t0 = datetime(2024, 1, 1)
+
+    async def run():
+        await collection.insert_many([
+            {"_id": key, "last_used_at": t0 + timedelta(minutes=minute)}
+            for key, minute in [("a", 9), ("b", 1), ("c", 5), ("d", 3), ("e", 7)]
+        ])
+        await cache._evict_overflow()
+        return sorted([doc["_id"] async for doc in collection.find()])
+
+    assert asyncio.run(run()) == ["a", "c", "e"]
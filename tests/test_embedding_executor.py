@@ -0,0 +1,78 @@
+import asyncio
+import time
+import pytest
+from app.utils.embedding_executor import EmbeddingExecutor, EmbeddingQueueFullError
+
+class FakeEmbedder:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    def generate(self, texts, batch_size=None, token_budget=None):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [[float(len(t))] for t in texts]
+
+def test_concurrent_queries_are_micro_batched():
+    """Concurrent single-query embeds share one model call and keep their own results"""
+    embedder = FakeEmbedder()
+
+    async def run():
+        executor = EmbeddingExecutor(lambda: embedder, max_batch_size=16, max_wait_ms=20)
+        texts = ["a" * n for n in range(1, 9)]
+        results = await asyncio.gather(*(executor.embed(t) for t in texts))
+        await executor.close()
+        return results
+
+    results = asyncio.run(run())
+    assert results == [[float(n)] for n in range(1, 9)]
+    assert len(embedder.batches) == 1
+
+def test_embed_many_preserves_order_across_slices():
+    """Bulk embeds are split into slices but returned in input order"""
+    embedder = FakeEmbedder()
+
+    async def run():
+        executor = EmbeddingExecutor(lambda: embedder, bulk_slice_size=3)
+        vectors = await executor.embed_many(["x" * n for n in range(1, 8)])
+        await executor.close()
+        return vectors
+
+    assert asyncio.run(run()) == [[float(n)] for n in range(1, 8)]
+    assert [len(b) for b in embedder.batches] == [3, 3, 1]
+
+def test_queue_depth_limit():
+    """Queries beyond the queue depth are rejected instead of waiting"""
+    embedder = FakeEmbedder(delay=0.2)
+
+    async def run():
+        executor = EmbeddingExecutor(lambda: embedder, max_batch_size=1, max_queue_depth=2)
+        first = asyncio.ensure_future(executor.embed("busy"))
+        await asyncio.sleep(0.05)  # worker is now blocked on the first query
+        queued = [asyncio.ensure_future(executor.embed("q")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(EmbeddingQueueFullError):
+            await executor.embed("overflow")
+        await asyncio.gather(first, *queued)
+        await executor.close()
+
+    asyncio.run(run())
+
+def test_warm_up_records_model_state():
+    """Warm-up runs throwaway batches and only reports warm when the model answers"""
+    embedder = FakeEmbedder()
+
+    class BrokenEmbedder:
+        def generate(self, texts, batch_size=None, token_budget=None):
+            return []
+
+    async def run():
+        ok = EmbeddingExecutor(lambda: embedder)
+        broken = EmbeddingExecutor(lambda: BrokenEmbedder())
+        results = await ok.warm_up(), await broken.warm_up()
+        await ok.close()
+        await broken.close()
+        return results, ok.warmed_up, broken.warmed_up
+
+    assert asyncio.run(run()) == ((True, False), True, False)
+    assert len(embedder.batches) == 4
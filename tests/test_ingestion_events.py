@@ -0,0 +1,67 @@
+import asyncio
+from mongomock_motor import AsyncMongoMockClient
+from app.services.ingestion_events import IngestionEventHub, JobProgress
+
+async def _collect(stream):
+    return [event async for event in stream if event is not None]
+
+def test_local_job_fans_out_to_every_watcher_without_reads():
+    """One emitter, many watchers: each gets every snapshot and the stream ends on a terminal status"""
+    hub = IngestionEventHub(poll_seconds=0.01, keepalive_seconds=1)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return None
+
+    async def run():
+        hub.attach("job")
+        tracker = JobProgress("job", docs_total=4, hub=hub, min_interval=0)
+        tracker.publish(force=True)
+        watchers = [asyncio.create_task(_collect(hub.watch("job", load))) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        for _ in range(4):
+            tracker.add(pages_parsed=10, chunks_embedded=5)
+            tracker.update(docs_done=tracker.counters["docs_done"] + 1)
+            await asyncio.sleep(0)
+        hub.close_job("job", "completed")
+        return await asyncio.gather(*watchers)
+
+    results = asyncio.run(run())
+    assert loads == []
+    assert all(r == results[0] for r in results)
+    last = results[0][-1]
+    assert last["status"] == "completed" and last["docs_done"] == 4 and last["pages_parsed"] == 40
+    assert last["pages_per_second"] > 0 and last["eta_seconds"] == 0.0
+    assert any(e["eta_seconds"] not in (None, 0.0) for e in results[0])
+    assert hub._subscribers == {} and hub._latest == {} and hub._pollers == {}
+
+def test_remote_job_is_polled_once_for_all_watchers():
+    """A job running in another process is read from Mongo by a single shared poller"""
+    hub = IngestionEventHub(poll_seconds=0.01, keepalive_seconds=1)
+    jobs = AsyncMongoMockClient()["test"]["ingestion_jobs"]
+    loads = []
+
+    async def load():
+        loads.append(1)
+        doc = await jobs.find_one({"_id": "job"})
+        return {"job_id": "job", "status": doc["status"], "docs_done": doc["docs_done"]}
+
+    async def run():
+        await jobs.insert_one({"_id": "job", "status": "running", "docs_done": 0})
+        initial = await load()
+        watchers = [asyncio.create_task(_collect(hub.watch("job", load, initial))) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        pollers = len(hub._pollers)
+        await jobs.update_one({"_id": "job"}, {"$set": {"docs_done": 3}})
+        await asyncio.sleep(0.05)
+        await jobs.update_one({"_id": "job"}, {"$set": {"status": "completed"}})
+        return pollers, await asyncio.gather(*watchers)
+
+    pollers, results = asyncio.run(run())
+    assert pollers == 1
+    assert all([e["docs_done"] for e in r] == [0, 3, 3] for r in results)
+    assert all(r[-1]["status"] == "completed" for r in results)
+    # ~0.1 s of polling at 10 ms: one reader, not one per watcher
+    assert len(loads) < 30
+    assert hub._pollers == {} and hub._subscribers == {}
@@ -0,0 +1,519 @@
+import asyncio
+import io
+import json
+import time
+from mongomock_motor import AsyncMongoMockClient
+from app.core.config import settings
+from app.services.ingestion_pipeline import PipelineStage, StagedPipeline
+from app.services import ingestion_service
+from app.services.ingestion_cancel import CancellationToken, IngestionCanceled
+from app.services.ingestion_service import IngestionService
+from app.services.ingestion_worker import IngestionWorkerPool
+from app.utils import numpy_store
+from app.utils.s3_stream import DownloadAborted
+from app.models.ingestion import IngestionOptions
+from app.utils.chunker import chunk_pages
+from app.utils.qdrant_client import chunk_content_hash
+
+def test_pipeline_overlaps_stages_with_bounded_queues():
+    """Items flow through every stage concurrently; queues never exceed their bound; errors drop the item"""
+    seen, errors = [], []
+
+    async def slow(item):
+        await asyncio.sleep(0.01)
+        return item
+
+    async def picky(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return item if item % 5 else None
+
+    async def sink(item):
+        seen.append(item)
+        return item
+
+    async def on_error(stage, item, exc):
+        errors.append((stage, item))
+
+    pipeline = StagedPipeline(
+        [PipelineStage("a", slow, 4), PipelineStage("b", picky, 1), PipelineStage("c", sink, 1)],
+        queue_size=2,
+        on_error=on_error,
+    )
+    stats = asyncio.run(pipeline.run(range(20)))
+
+    assert sorted(seen) == [i for i in range(20) if i % 5 and i != 3]
+    assert errors == [("b", 3)]
+    assert stats["b"]["dropped"] == 4 and stats["b"]["failed"] == 1
+    assert all(s["max_queue_depth"] <= 2 for s in stats.values())
+    assert stats["a"]["items_per_second"] > 50  # 4 workers of 10 ms each: ~400/s
+
+DELAYS = {"fetch": 0.04, "parse": 0.03, "embed": 0.03, "upsert": 0.03}
+
+class FakeVectorStore:
+    collection_name = "fisica"
+
+    def __init__(self):
+        self.applied = []
+        self.deleted = []
+        self.deleted_points = []
+        self.upserted = {}
+
+    async def for_subject(self, subject_slug, *, create=False):
+        return self
+
+    async def plan_document(self, doc_id, chunks, *, text_key="text"):
+        return {"doc_id": doc_id, "to_upsert": list(chunks)}
+
+    async def embed_chunks(self, chunks, *, text_key="text"):
+        await asyncio.sleep(DELAYS["embed"])
+        for chunk in chunks:
+            chunk["vector"] = [0.0]
+
+    async def apply_document_plan(self, plan, *, on_batch=None):
+        await asyncio.sleep(DELAYS["upsert"])
+        self.applied.append(plan["doc_id"])
+        self.upserted[plan["doc_id"]] = [c["chunk_id"] for c in plan["to_upsert"]]
+        if on_batch and plan["to_upsert"]:
+            last = plan["to_upsert"][-1]
+            await on_batch(last["chunk_id"], chunk_content_hash(last["text"]), len(plan["to_upsert"]))
+        return {"upserted": len(plan["to_upsert"]), "unchanged": 0, "deleted": 0}
+
+    async def delete_by_docs(self, doc_ids, subject=None):
+        self.deleted.extend(doc_ids)
+        return len(doc_ids)
+
+    async def delete_points(self, point_ids, subject=None):
+        self.deleted_points.extend(point_ids)
+        return len(point_ids)
+
+def test_twelve_pdf_subject_ingests_faster_than_sequential(monkeypatch, tmp_path):
+    """The staged pipeline beats one-document-at-a-time processing and marks failures per document"""
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "numpy")
+    monkeypatch.setattr(settings, "NUMPY_STORE_DIR", str(tmp_path))
+    db = AsyncMongoMockClient()["test"]
+    service = IngestionService(db)
+    store = FakeVectorStore()
+    service.qdrant_store = store
+
+    async def download(s3_key, should_stop=None, hasher=None):
+        if hasher is not None:
+            hasher.update(s3_key.encode())
+        await asyncio.sleep(DELAYS["fetch"])
+        return io.BytesIO(s3_key.encode())
+
+    async def extract(pdf):
+        await asyncio.sleep(DELAYS["parse"])
+        if pdf.getvalue() == b"doc-7.pdf":
+            raise RuntimeError("corrupt PDF")
+        return ["texto " * 150, "texto " * 150]
+
+    service._download_pdf_from_s3 = download
+    service._extract_pages = extract
+
+    async def run():
+        await db["documents"].insert_many([
+            {"_id": f"doc-{i}", "subject_slug": "fisica", "status": "uploaded",
+             "filename": f"doc-{i}.pdf", "s3_key": f"doc-{i}.pdf"}
+            for i in range(12)
+        ])
+        await db["ingestion_jobs"].insert_one({"_id": "job", "subject_slug": "fisica"})
+        started = time.perf_counter()
+        result = await service._process_ingestion("job", "fisica", {"subject_slug": "fisica"})
+        elapsed = time.perf_counter() - started
+        statuses = {d["_id"]: d["status"] async for d in db["documents"].find()}
+        return result, elapsed, statuses, await db["ingestion_jobs"].find_one({"_id": "job"})
+
+    (docs_done, vectors), elapsed, statuses, job = asyncio.run(run())
+
+    sequential = 12 * sum(DELAYS.values())
+    assert elapsed < sequential / 2.5, (elapsed, sequential)
+    assert docs_done == 12 and job["docs_done"] == 12 and vectors == job["vectors"] > 0
+    assert statuses.pop("doc-7") == "failed"
+    assert set(statuses.values()) == {"ingested"} and len(store.applied) == 11
+    assert job["stages"]["parse"]["failed"] == 1 and job["stages"]["status"]["processed"] == 11
+
+def _slow_service(db, monkeypatch, tmp_path, fetch_delay):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "numpy")
+    monkeypatch.setattr(settings, "NUMPY_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "INGESTION_FETCH_CONCURRENCY", 1)
+    service = IngestionService(db)
+    service.qdrant_store = FakeVectorStore()
+
+    async def download(s3_key, should_stop=None, hasher=None):
+        if hasher is not None:
+            hasher.update(s3_key.encode())
+        await asyncio.sleep(fetch_delay)
+        return io.BytesIO(s3_key.encode())
+
+    async def extract(pdf):
+        return ["Una oración de prueba."]
+
+    service._download_pdf_from_s3 = download
+    service._extract_pages = extract
+    return service
+
+async def _seed(db, n=12):
+    await db["documents"].insert_many([
+        {"_id": f"doc-{i}", "subject_slug": "fisica", "status": "uploaded",
+         "filename": f"doc-{i}.pdf", "s3_key": f"doc-{i}.pdf"}
+        for i in range(n)
+    ])
+    await db["ingestion_jobs"].insert_one(
+        {"_id": "job", "subject_slug": "fisica", "status": "queued", "attempts": 0, "request": {"mode": "new"}}
+    )
+
+async def _wait_for(predicate, attempts=300):
+    for _ in range(attempts):
+        if await predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+def test_local_cancel_interrupts_the_worker_and_rolls_back(monkeypatch, tmp_path):
+    """Cancel with rollback stops the running job at once, deletes its vectors and resets its documents"""
+    db = AsyncMongoMockClient()["test"]
+    service = _slow_service(db, monkeypatch, tmp_path, fetch_delay=0.05)
+    monkeypatch.setattr(ingestion_service, "IngestionService", lambda _db: service)
+    pool = IngestionWorkerPool(db, 1, poll_seconds=0.01)
+    user = type("U", (), {"id": "teacher"})()
+
+    async def run():
+        await _seed(db)
+        await pool.start()
+        assert await _wait_for(lambda: db["documents"].count_documents({"status": "ingested"}))
+        started = time.perf_counter()
+        assert await IngestionService.cancel_ingestion(service, "job", user, rollback=True)
+        await _wait_for(lambda: db["ingestion_jobs"].count_documents({"_id": "job", "rolled_back": {"$exists": True}}))
+        elapsed = time.perf_counter() - started
+        await pool.close()
+        statuses = [d["status"] async for d in db["documents"].find()]
+        return elapsed, await db["ingestion_jobs"].find_one({"_id": "job"}), statuses
+
+    elapsed, job, statuses = asyncio.run(run())
+    assert elapsed < 0.5
+    assert job["status"] == "canceled" and job["rolled_back"] and job["vectors"] == 0
+    assert job["docs_done"] < 12 and job["attempts"] == 1  # not requeued
+    assert sorted(service.qdrant_store.deleted) == sorted(service.qdrant_store.applied)
+    assert set(statuses) == {"uploaded"}
+
+def test_cancel_from_another_replica_stops_at_next_stage_and_keeps_vectors(monkeypatch, tmp_path):
+    """Without a local token, the between-stage status check picks the cancel up from Mongo"""
+    monkeypatch.setattr(settings, "INGESTION_CANCEL_POLL_SECONDS", 0)
+    db = AsyncMongoMockClient()["test"]
+    service = _slow_service(db, monkeypatch, tmp_path, fetch_delay=0.02)
+
+    async def run():
+        await _seed(db)
+        await db["ingestion_jobs"].update_one({"_id": "job"}, {"$set": {"status": "running"}})
+
+        async def cancel_soon():
+            await _wait_for(lambda: db["documents"].count_documents({"status": "ingested"}))
+            await db["ingestion_jobs"].update_one({"_id": "job"}, {"$set": {"status": "canceled", "cancel_rollback": False}})
+
+        canceller = asyncio.create_task(cancel_soon())
+        try:
+            await service.run_job(await db["ingestion_jobs"].find_one({"_id": "job"}))
+        except IngestionCanceled:
+            pass
+        else:
+            raise AssertionError("job was not canceled")
+        await canceller
+        return await db["ingestion_jobs"].find_one({"_id": "job"})
+
+    job = asyncio.run(run())
+    assert job["status"] == "canceled" and job["rolled_back"] is False
+    assert 0 < job["vectors"] and job["docs_done"] < 12
+    assert service.qdrant_store.deleted == [] and service.qdrant_store.applied
+
+def test_rollback_only_undoes_what_the_canceled_job_wrote(monkeypatch, tmp_path):
+    """New documents lose their vectors, a half re-ingested one only this run's points, a finished re-ingest is kept"""
+    db = AsyncMongoMockClient()["test"]
+    service = _slow_service(db, monkeypatch, tmp_path, fetch_delay=0)
+    store = service.qdrant_store
+    touched = {
+        "doc-a": ingestion_service._touched("ingested", synced=True, vectors=4),
+        "doc-b": ingestion_service._touched("ingested"),
+        "doc-c": ingestion_service._touched("uploaded", vectors=2),
+    }
+    touched["doc-b"]["points"].update({"p2", "p3"})
+    progress = {"docs": 2, "vectors": 6, "touched": touched}
+
+    async def run():
+        await db["documents"].insert_many([
+            {"_id": "doc-a", "status": "ingested"},
+            {"_id": "doc-b", "status": "failed"},
+            {"_id": "doc-c", "status": "ingested"},
+        ])
+        await db["ingestion_jobs"].insert_one({"_id": "job", "status": "canceled", "checkpoints": {
+            "doc-a": {"state": "ingested", "vectors": 4, "previous_status": "ingested"},
+            "doc-b": {"state": "partial", "chunk_id": 0, "previous_status": "ingested"},
+            "doc-c": {"state": "ingested", "vectors": 2, "previous_status": "uploaded"},
+        }})
+        await service._finish_canceled("job", store, progress, rollback=True)
+        statuses = {d["_id"]: d["status"] async for d in db["documents"].find({})}
+        return statuses, await db["ingestion_jobs"].find_one({"_id": "job"})
+
+    statuses, job = asyncio.run(run())
+    assert store.deleted == ["doc-c"]
+    assert sorted(store.deleted_points) == ["p2", "p3"]
+    assert statuses == {"doc-a": "ingested", "doc-b": "ingested", "doc-c": "uploaded"}
+    assert job["rollback_kept"] == ["doc-a"] and job["rolled_back"]
+    assert job["docs_done"] == 1 and job["vectors"] == 4
+    assert list(job["checkpoints"]) == ["doc-a"]
+
+def test_rollback_restores_a_reingested_document_that_failed_before_upsert(monkeypatch, tmp_path):
+    """A previously ingested document that fails in parse is INGESTED again after a rollback cancel"""
+    db = AsyncMongoMockClient()["test"]
+    service = _slow_service(db, monkeypatch, tmp_path, fetch_delay=0)
+    token = CancellationToken("job")
+
+    async def download(s3_key, should_stop=None, hasher=None):
+        if s3_key == "doc-1.pdf":
+            # Cancel once doc-0 has been marked FAILED
+            await _wait_for(lambda: db["documents"].count_documents({"_id": "doc-0", "status": "failed"}))
+            token.mark(rollback=True)
+        return io.BytesIO(s3_key.encode())
+
+    async def extract(pdf):
+        raise ValueError("broken PDF")
+
+    service._download_pdf_from_s3 = download
+    service._extract_pages = extract
+
+    async def run():
+        await _seed(db, n=2)
+        await db["documents"].update_one({"_id": "doc-0"}, {"$set": {"status": "ingested"}})
+        await db["ingestion_jobs"].update_one({"_id": "job"}, {"$set": {"status": "canceled"}})
+        try:
+            await service._process_ingestion("job", "fisica", {"subject_slug": "fisica"}, cancel_token=token)
+        except IngestionCanceled:
+            pass
+        return {d["_id"]: d["status"] async for d in db["documents"].find()}
+
+    statuses = asyncio.run(run())
+    assert statuses == {"doc-0": "ingested", "doc-1": "uploaded"}
+    assert service.qdrant_store.deleted == [] and service.qdrant_store.deleted_points == []
+
+def test_download_aborted_by_cancel_is_not_counted_as_done(monkeypatch, tmp_path):
+    """A cancel that ends an S3 download stops the job instead of counting the document as finished"""
+    db = AsyncMongoMockClient()["test"]
+    service = _slow_service(db, monkeypatch, tmp_path, fetch_delay=0)
+    del service._download_pdf_from_s3  # the real download, with a fake S3 stream below
+    token = CancellationToken("job")
+
+    def download_to_spool(s3_client, bucket, key, should_stop=None, hasher=None):
+        token.mark()  # canceled mid-download
+        if should_stop():
+            raise DownloadAborted(key)
+        return io.BytesIO(key.encode())
+
+    monkeypatch.setattr(ingestion_service, "download_to_spool", download_to_spool)
+
+    async def run():
+        await _seed(db, n=1)
+        await db["ingestion_jobs"].update_one({"_id": "job"}, {"$set": {"status": "canceled"}})
+        try:
+            await service._process_ingestion("job", "fisica", {"subject_slug": "fisica"}, cancel_token=token)
+        except IngestionCanceled:
+            canceled = True
+        else:
+            canceled = False
+        return canceled, await db["ingestion_jobs"].find_one({"_id": "job"}), await db["documents"].find_one({"_id": "doc-0"})
+
+    canceled, job, doc = asyncio.run(run())
+    assert canceled
+    assert job["docs_done"] == 0
+    assert doc["status"] == "uploaded"
+    assert service.qdrant_store.applied == []
+
+def test_retry_resumes_from_checkpoints(monkeypatch, tmp_path):
+    """Finished documents are skipped; a half-written one continues after its last checkpointed batch"""
+    db = AsyncMongoMockClient()["test"]
+    service = _slow_service(db, monkeypatch, tmp_path, fetch_delay=0)
+    pages = ["Primera oración del documento. " * 40, "Segunda página con otra oración. " * 40]
+    fetched = []
+
+    async def download(s3_key, should_stop=None, hasher=None):
+        if hasher is not None:
+            hasher.update(s3_key.encode())
+        fetched.append(s3_key)
+        return io.BytesIO(s3_key.encode())
+
+    async def extract(pdf):
+        return pages
+
+    service._download_pdf_from_s3 = download
+    service._extract_pages = extract
+    options = IngestionOptions()
+    chunks = list(chunk_pages(pages, chunk_size=options.chunk_size, chunk_overlap=options.chunk_overlap))
+
+    async def run():
+        await _seed(db, n=3)
+        # A crash after doc-0 finished and doc-1's first batch (chunk 0) was stored
+        await db["ingestion_jobs"].update_one({"_id": "job"}, {"$set": {
+            "status": "running",
+            "checkpoints": {
+                "doc-0": {"state": "ingested", "vectors": 5},
+                "doc-1": {"state": "partial", "chunk_id": 0, "content_hash": chunk_content_hash(chunks[0]["text"])},
+            }
+        }})
+        result = await service.run_job(await db["ingestion_jobs"].find_one({"_id": "job"}))
+        return result, await db["ingestion_jobs"].find_one({"_id": "job"})
+
+    (docs_done, vectors), job = asyncio.run(run())
+    upserted = service.qdrant_store.upserted
+    assert len(chunks) > 1
+    assert sorted(fetched) == ["doc-1.pdf", "doc-2.pdf"]
+    assert upserted["doc-1"] == [c["chunk_id"] for c in chunks[1:]]
+    assert upserted["doc-2"] == [c["chunk_id"] for c in chunks]
+    assert docs_done == 3 and vectors == 5 + 2 * len(chunks)
+    checkpoints = job["checkpoints"]
+    assert {d: c["state"] for d, c in checkpoints.items()} == {"doc-0": "ingested", "doc-1": "ingested", "doc-2": "ingested"}
+    assert checkpoints["doc-2"]["chunk_id"] == chunks[-1]["chunk_id"]
+
+class CountingExecutor:
+    def __init__(self):
+        self.embedded = 0
+
+    async def embed_many(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+def test_identical_pdf_copies_vectors_instead_of_reembedding(monkeypatch, tmp_path):
+    """Same bytes in another subject: points are copied across collections, nothing is parsed or embedded"""
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "numpy")
+    monkeypatch.setattr(settings, "NUMPY_STORE_DIR", str(tmp_path))
+    executor = CountingExecutor()
+    monkeypatch.setattr(numpy_store, "get_embedding_executor", lambda: executor)
+    db = AsyncMongoMockClient()["test"]
+    service = IngestionService(db)
+    content = {"a.pdf": b"libro", "b.pdf": b"libro", "c.pdf": b"libro"}
+    downloads, extractions = [], []
+
+    async def download(s3_key, should_stop=None, hasher=None):
+        downloads.append(s3_key)
+        if hasher is not None:
+            hasher.update(content[s3_key])
+        return io.BytesIO(content[s3_key])
+
+    async def extract(pdf):
+        extractions.append(pdf.getvalue())
+        return ["Una oración sobre la ley de Ohm. " * 30, "Otra sobre Kirchhoff. " * 30]
+
+    service._download_pdf_from_s3 = download
+    service._extract_pages = extract
+
+    async def run():
+        await db["subjects"].insert_many([
+            {"slug": "fisica", "vector_collection": "fisica_vec"},
+            {"slug": "quimica", "vector_collection": "quimica_vec"},
+        ])
+        await db["documents"].insert_many([
+            {"_id": "a", "subject_slug": "fisica", "status": "uploaded", "filename": "a.pdf", "s3_key": "a.pdf"},
+            {"_id": "b", "subject_slug": "quimica", "status": "uploaded", "filename": "b.pdf", "s3_key": "b.pdf"},
+        ])
+        await db["ingestion_jobs"].insert_many([{"_id": j, "subject_slug": s} for j, s in
+                                                [("j1", "fisica"), ("j2", "quimica"), ("j3", "quimica")]])
+        await service._process_ingestion("j1", "fisica", {"_id": "a"})
+        embedded = executor.embedded
+        await service._process_ingestion("j2", "quimica", {"_id": "b"})
+        # Hash recorded at upload: no download either
+        a = await db["documents"].find_one({"_id": "a"})
+        await db["documents"].insert_one({"_id": "c", "subject_slug": "quimica", "status": "uploaded",
+                                          "filename": "c.pdf", "s3_key": "c.pdf", "sha256": a["sha256"]})
+        await service._process_ingestion("j3", "quimica", {"_id": "c"})
+        source = await service.qdrant_store.for_subject("fisica")
+        target = await service.qdrant_store.for_subject("quimica")
+        docs = {d["_id"]: d async for d in db["documents"].find()}
+        return embedded, docs, await source.export_document("a"), await target.export_document("b"), await target.export_document("c")
+
+    embedded, docs, a_chunks, b_chunks, c_chunks = asyncio.run(run())
+    assert embedded == executor.embedded > 0
+    assert len(extractions) == 1 and downloads == ["a.pdf", "b.pdf"]
+    assert docs["b"]["status"] == docs["c"]["status"] == "ingested"
+    assert docs["b"]["copied_from"] == docs["c"]["copied_from"] == "a"
+    assert docs["a"]["sha256"] == docs["b"]["sha256"]
+    assert [c["text"] for c in b_chunks] == [c["text"] for c in a_chunks] == [c["text"] for c in c_chunks]
+    assert {c["subject"] for c in b_chunks} == {"Chemistry"} and {c["title"] for c in c_chunks} == {"c.pdf"}
+    assert b_chunks[0]["vector"] == a_chunks[0]["vector"]
+
+def test_duplicate_embedded_by_another_model_id_is_not_reused(monkeypatch, tmp_path):
+    """After a switch to int8 ONNX, identical bytes are embedded again rather than copied from torch vectors"""
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "numpy")
+    monkeypatch.setattr(settings, "NUMPY_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "torch")
+    executor = CountingExecutor()
+    monkeypatch.setattr(numpy_store, "get_embedding_executor", lambda: executor)
+    db = AsyncMongoMockClient()["test"]
+    service = IngestionService(db)
+
+    async def download(s3_key, should_stop=None, hasher=None):
+        if hasher is not None:
+            hasher.update(b"libro")
+        return io.BytesIO(b"libro")
+
+    async def extract(pdf):
+        return ["Una oración sobre la ley de Ohm. " * 30]
+
+    service._download_pdf_from_s3 = download
+    service._extract_pages = extract
+
+    async def run():
+        await db["documents"].insert_many([
+            {"_id": d, "subject_slug": "fisica", "status": "uploaded", "filename": f"{d}.pdf", "s3_key": f"{d}.pdf"}
+            for d in ("a", "b", "c")
+        ])
+        await db["ingestion_jobs"].insert_many([{"_id": j, "subject_slug": "fisica"} for j in ("j1", "j2", "j3")])
+        await service._process_ingestion("j1", "fisica", {"_id": "a"})
+        embedded = [executor.embedded]
+        monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "onnx")
+        monkeypatch.setattr(settings, "EMBEDDING_ONNX_QUANTIZE", True)
+        await service._process_ingestion("j2", "fisica", {"_id": "b"})
+        embedded.append(executor.embedded)
+        await service._process_ingestion("j3", "fisica", {"_id": "c"})
+        embedded.append(executor.embedded)
+        return embedded, {d["_id"]: d async for d in db["documents"].find()}
+
+    embedded, docs = asyncio.run(run())
+    assert embedded[0] > 0 and embedded[1] == 2 * embedded[0] and embedded[2] == embedded[1]
+    assert "copied_from" not in docs["b"] and docs["c"]["copied_from"] == "b"
+    assert docs["a"]["ingest_signature"] != docs["b"]["ingest_signature"] == docs["c"]["ingest_signature"]
+
+def test_event_stream_reports_stage_progress_until_the_job_ends(monkeypatch, tmp_path):
+    """SSE watchers of a pool-run job see pages/chunks/vectors with rates, then one `end` event"""
+    db = AsyncMongoMockClient()["test"]
+    service = _slow_service(db, monkeypatch, tmp_path, fetch_delay=0.01)
+    monkeypatch.setattr(ingestion_service, "IngestionService", lambda _db: service)
+    monkeypatch.setattr(ingestion_service.ingestion_events, "poll_seconds", 0.01)
+    pool = IngestionWorkerPool(db, 1, poll_seconds=0.01)
+
+    async def run():
+        await _seed(db)
+        await db["ingestion_jobs"].update_one({"_id": "job"}, {"$set": {"docs_total": 12}})
+        stream = service.stream_job_events("job", await service.get_job_event("job"))
+        messages = []
+
+        async def watch():
+            async for message in stream:
+                messages.append(message)
+
+        watcher = asyncio.create_task(watch())
+        await pool.start()
+        await asyncio.wait_for(watcher, 5)
+        await pool.close()
+        return messages
+
+    messages = asyncio.run(run())
+    events = [(m.split("\n")[0][len("event: "):], json.loads(m.split("\n")[1][len("data: "):])) for m in messages]
+    assert events[0][1]["status"] == "queued" and events[-1][0] == "end"
+    assert [name for name, _ in events].count("end") == 1
+    end = events[-1][1]
+    assert end["status"] == "completed" and end["docs_done"] == 12 and end["eta_seconds"] == 0.0
+    assert end["pages_parsed"] == 12 and end["vectors_upserted"] > 0 and end["pages_per_second"] > 0
+    running = [data for name, data in events if name == "progress" and data["status"] == "running"]
+    assert running and any(0 < data["docs_done"] < 12 and data["eta_seconds"] for data in running)
@@ -0,0 +1,138 @@
+import asyncio
+from datetime import datetime, timedelta
+from mongomock_motor import AsyncMongoMockClient
+from app.services import ingestion_service
+from app.services.ingestion_queue import IngestionQueue
+from app.services.ingestion_worker import IngestionWorkerPool
+
+def _job(job_id, **extra):
+    doc = {"_id": job_id, "subject_slug": "fisica", "status": "queued", "attempts": 0,
+           "available_at": datetime.utcnow() - timedelta(seconds=1), "created_at": datetime.utcnow()}
+    doc.update(extra)
+    return doc
+
+def _db():
+    return AsyncMongoMockClient()["test"]
+
+def test_claim_is_exclusive_and_respects_available_at():
+    """Only one worker wins a job; future and non-queued jobs are skipped; legacy jobs are due"""
+    db = _db()
+    queue = IngestionQueue(db["ingestion_jobs"], lease_seconds=30)
+
+    async def run():
+        await db["ingestion_jobs"].insert_many([
+            _job("due"),
+            _job("later", available_at=datetime.utcnow() + timedelta(hours=1)),
+            _job("legacy", available_at=None),
+        ])
+        await db["ingestion_jobs"].update_one({"_id": "legacy"}, {"$unset": {"available_at": ""}})
+        claims = await asyncio.gather(*(queue.claim(f"w{i}") for i in range(4)))
+        return [c["_id"] for c in claims if c], await db["ingestion_jobs"].find_one({"_id": "due"})
+
+    claimed, due = asyncio.run(run())
+    assert sorted(claimed) == ["due", "legacy"]
+    assert due["status"] == "running" and due["attempts"] == 1 and due["lease_owner"].startswith("w")
+
+def test_failures_back_off_then_fail():
+    """Failed attempts are requeued with growing delay until max_attempts"""
+    db = _db()
+    queue = IngestionQueue(db["ingestion_jobs"], max_attempts=2, backoff_seconds=10)
+
+    async def run():
+        await db["ingestion_jobs"].insert_one(_job("j"))
+        job = await queue.claim("w")
+        await queue.fail(job, "w", "boom")
+        first = await db["ingestion_jobs"].find_one({"_id": "j"})
+        await db["ingestion_jobs"].update_one({"_id": "j"}, {"$set": {"available_at": datetime.utcnow()}})
+        job = await queue.claim("w")
+        await queue.fail(job, "w", "boom again")
+        return first, await db["ingestion_jobs"].find_one({"_id": "j"})
+
+    first, final = asyncio.run(run())
+    assert first["status"] == "queued" and first["available_at"] > datetime.utcnow() + timedelta(seconds=5)
+    assert final["status"] == "failed" and final["attempts"] == 2 and final["last_error"] == "boom again"
+
+def test_expired_leases_are_requeued_or_failed():
+    """RUNNING jobs nobody heartbeats go back to the queue, or FAIL once out of attempts"""
+    db = _db()
+    queue = IngestionQueue(db["ingestion_jobs"], max_attempts=2)
+    past, future = datetime.utcnow() - timedelta(seconds=5), datetime.utcnow() + timedelta(seconds=60)
+
+    async def run():
+        await db["ingestion_jobs"].insert_many([
+            _job("crashed", status="running", attempts=1, lease_owner="gone:1", lease_expires_at=past),
+            _job("exhausted", status="running", attempts=2, lease_owner="gone:1", lease_expires_at=past),
+            _job("alive", status="running", attempts=1, lease_owner="w", lease_expires_at=future),
+            _job("legacy", status="running", attempts=0),
+        ])
+        count = await queue.requeue_expired()
+        claimed = await queue.claim("w2")
+        return count, claimed, {d["_id"]: d async for d in db["ingestion_jobs"].find()}
+
+    count, claimed, jobs = asyncio.run(run())
+    assert count == 3
+    assert jobs["exhausted"]["status"] == "failed" and "Lease expired" in jobs["exhausted"]["last_error"]
+    assert jobs["alive"]["status"] == "running" and jobs["alive"]["lease_owner"] == "w"
+    # Both requeued jobs are due again; the claim takes one, the other waits in the queue
+    assert claimed["_id"] in ("crashed", "legacy") and claimed["lease_owner"] == "w2"
+    waiting = ({"crashed", "legacy"} - {claimed["_id"]}).pop()
+    assert jobs[waiting]["status"] == "queued" and jobs[waiting]["lease_owner"] is None
+
+class FakeService:
+    runs = []
+    fail_first = set()
+    delay = 0.0
+
+    def __init__(self, db):
+        pass
+
+    async def run_job(self, job):
+        FakeService.runs.append(job["_id"])
+        await asyncio.sleep(FakeService.delay)
+        if job["_id"] in FakeService.fail_first and job["attempts"] == 1:
+            raise RuntimeError("transient")
+        return 1, 10
+
+def test_worker_pool_runs_and_retries_jobs(monkeypatch):
+    """Workers drain the queue concurrently, retrying a transient failure"""
+    monkeypatch.setattr(ingestion_service, "IngestionService", FakeService)
+    monkeypatch.setattr(FakeService, "runs", [])
+    monkeypatch.setattr(FakeService, "fail_first", {"b"})
+    db = _db()
+    queue = IngestionQueue(db["ingestion_jobs"], backoff_seconds=0)
+    pool = IngestionWorkerPool(db, 2, poll_seconds=0.01, queue=queue)
+
+    async def run():
+        await db["ingestion_jobs"].insert_many([_job(j) for j in "abc"])
+        await pool.start()
+        for _ in range(200):
+            if await db["ingestion_jobs"].count_documents({"status": "completed"}) == 3:
+                break
+            await asyncio.sleep(0.01)
+        await pool.close()
+        return {d["_id"]: d async for d in db["ingestion_jobs"].find()}
+
+    jobs = asyncio.run(run())
+    assert all(j["status"] == "completed" and j["vectors"] == 10 for j in jobs.values())
+    assert jobs["b"]["attempts"] == 2
+    assert sorted(FakeService.runs) == ["a", "b", "b", "c"]
+
+def test_shutdown_releases_running_jobs(monkeypatch):
+    """Closing the pool puts in-flight jobs back in the queue without spending an attempt"""
+    monkeypatch.setattr(ingestion_service, "IngestionService", FakeService)
+    monkeypatch.setattr(FakeService, "delay", 10.0)
+    db = _db()
+    pool = IngestionWorkerPool(db, 1, poll_seconds=0.01)
+
+    async def run():
+        await db["ingestion_jobs"].insert_one(_job("slow"))
+        await pool.start()
+        for _ in range(100):
+            if await db["ingestion_jobs"].count_documents({"status": "running"}):
+                break
+            await asyncio.sleep(0.01)
+        await pool.close()
+        return await db["ingestion_jobs"].find_one({"_id": "slow"})
+
+    job = asyncio.run(run())
+    assert job["status"] == "queued" and job["attempts"] == 0 and job["lease_owner"] is None
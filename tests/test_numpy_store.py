@@ -0,0 +1,135 @@
+import asyncio
+import json
+import numpy as np
+from app.utils import numpy_store
+from app.utils.numpy_store import NumpyVectorStore
+
+VECTORS = {
+    "ohm": [1.0, 0.0, 0.0],
+    "kirchhoff": [0.9, 0.1, 0.0],
+    "enlace covalente": [0.0, 1.0, 0.0],
+    "enlace ionico": [0.1, 0.8, 0.2],
+}
+
+class FakeExecutor:
+    async def embed(self, text):
+        return VECTORS[text]
+
+    async def embed_many(self, texts):
+        return [VECTORS[t] for t in texts]
+
+def _store(monkeypatch, tmp_path, dtype="float32"):
+    monkeypatch.setattr(numpy_store, "get_embedding_executor", lambda: FakeExecutor())
+    store = NumpyVectorStore("test", root_dir=str(tmp_path), dtype=dtype)
+    asyncio.run(store.init_store(vector_size=3))
+    return store
+
+def _chunks(doc_id, subject, texts):
+    return [{"text": t, "chunk_id": i, "doc_id": doc_id, "subject": subject, "topics": [subject.lower()]}
+            for i, t in enumerate(texts)]
+
+def test_search_ranks_by_cosine_and_filters(monkeypatch, tmp_path):
+    """Hits come back in cosine order, restricted by subject/doc filters"""
+    store = _store(monkeypatch, tmp_path)
+    asyncio.run(store.upsert_chunks(_chunks("doc-1", "Circuits", ["ohm", "kirchhoff"])))
+    asyncio.run(store.upsert_chunks(_chunks("doc-2", "Chemistry", ["enlace covalente", "enlace ionico"])))
+
+    hits = asyncio.run(store.search("ohm", top_k=3))
+    assert [h["text"] for h in hits] == ["ohm", "kirchhoff", "enlace ionico"]
+    assert hits[0]["score"] == 1.0
+
+    hits = asyncio.run(store.search("ohm", top_k=5, subject="Chemistry"))
+    assert [h["doc_id"] for h in hits] == ["doc-2", "doc-2"]
+    assert asyncio.run(store.search("ohm", doc_ids_any=["doc-1"], score_threshold=0.95))[0]["text"] == "ohm"
+    assert asyncio.run(store.search("ohm", topics_any=["physics"])) == []
+
+def test_sync_and_delete_keep_rows_consistent(monkeypatch, tmp_path):
+    """Resync replaces stale rows; delete_by_doc swap-removes without disturbing other docs"""
+    store = _store(monkeypatch, tmp_path)
+    asyncio.run(store.upsert_chunks(_chunks("doc-1", "Circuits", ["ohm", "kirchhoff"])))
+    asyncio.run(store.upsert_chunks(_chunks("doc-2", "Chemistry", ["enlace covalente"])))
+
+    stats = asyncio.run(store.sync_document("doc-1", _chunks("doc-1", "Circuits", ["ohm"])))
+    assert stats == {"upserted": 0, "unchanged": 1, "deleted": 1}
+    assert asyncio.run(store.delete_by_doc("doc-1")) == 1
+    assert asyncio.run(store.count()) == 1
+    hits = asyncio.run(store.search("enlace covalente", top_k=5))
+    assert [h["text"] for h in hits] == ["enlace covalente"]
+
+def test_reopen_from_disk_float16(monkeypatch, tmp_path):
+    """Vectors and payloads persist across instances (memory-mapped matrix + sidecar)"""
+    store = _store(monkeypatch, tmp_path, dtype="float16")
+    asyncio.run(store.upsert_chunks(_chunks("doc-1", "Circuits", ["ohm", "kirchhoff"])))
+    asyncio.run(store.close())
+
+    reopened = NumpyVectorStore("test", root_dir=str(tmp_path), dtype="float16")
+    assert asyncio.run(reopened.count(subject="Circuits")) == 2
+    hits = asyncio.run(reopened.search("kirchhoff", top_k=1))
+    assert hits[0]["text"] == "kirchhoff"
+    assert abs(hits[0]["score"] - 1.0) < 1e-3
+
+def test_search_many_matches_single_searches(monkeypatch, tmp_path):
+    """Batched scoring returns the same ranked hits as one search per query"""
+    store = _store(monkeypatch, tmp_path)
+    asyncio.run(store.upsert_chunks(_chunks("doc-1", "Circuits", ["ohm", "kirchhoff"])))
+    asyncio.run(store.upsert_chunks(_chunks("doc-2", "Chemistry", ["enlace covalente", "enlace ionico"])))
+
+    queries = ["enlace ionico", "ohm"]
+    batched = asyncio.run(store.search_many(queries, top_k=2))
+    assert batched == [asyncio.run(store.search(q, top_k=2)) for q in queries]
+
+def _vector_chunks(doc_id, subject, vectors):
+    return [{"text": f"{doc_id}-{i}", "chunk_id": i, "doc_id": doc_id, "subject": subject, "vector": v}
+            for i, v in enumerate(vectors)]
+
+def test_payload_log_appends_replays_and_compacts(monkeypatch, tmp_path):
+    """Writes only append to the payload log; reopening replays puts and deletes into the same rows"""
+    store = _store(monkeypatch, tmp_path)
+    store.COMPACT_MIN_RECORDS = 8
+    rng = np.random.default_rng(0)
+    log = tmp_path / "test" / "payloads.jsonl"
+    sizes = []
+    for doc in ("doc-1", "doc-2", "doc-3"):
+        asyncio.run(store.upsert_chunks(_vector_chunks(doc, "Circuits" if doc != "doc-2" else "Chemistry", rng.random((2, 3)).tolist())))
+        sizes.append(log.stat().st_size)
+    assert sizes[0] < sizes[1] < sizes[2]
+    assert asyncio.run(store.delete_by_doc("doc-1")) == 2  # swap-removes doc-3's rows into doc-1's slots
+
+    reopened = NumpyVectorStore("test", root_dir=str(tmp_path))
+    asyncio.run(reopened.init_store())
+    assert reopened._ids == store._ids
+    assert asyncio.run(reopened.count(subject="Circuits")) == 2
+    query = np.asarray(store._vectors[0], dtype=np.float32)
+    assert reopened._top_k(query, 4, None) == store._top_k(query, 4, None)
+
+    # Past 2x the live rows (and the minimum), the log is rewritten with one record per row
+    store.COMPACT_MIN_RECORDS = 0
+    asyncio.run(store.delete_by_doc("doc-3"))
+    assert len(log.read_text().splitlines()) == asyncio.run(store.count()) == 2
+
+def test_legacy_payload_sidecar_is_migrated(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    asyncio.run(store.upsert_chunks(_chunks("doc-1", "Circuits", ["ohm", "kirchhoff"])))
+    folder = tmp_path / "test"
+    (folder / "payloads.json").write_text(json.dumps({"ids": store._ids, "payloads": store._payloads}))
+    (folder / "payloads.jsonl").unlink()
+
+    reopened = NumpyVectorStore("test", root_dir=str(tmp_path))
+    assert asyncio.run(reopened.count(subject="Circuits")) == 2
+    assert (folder / "payloads.jsonl").exists() and not (folder / "payloads.json").exists()
+
+def test_streaming_top_k_matches_full_scoring(monkeypatch, tmp_path):
+    """Block-wise running top-k (rows and queries) equals scoring the whole matrix at once"""
+    store = _store(monkeypatch, tmp_path)
+    store.BLOCK_ROWS, store.QUERY_BLOCK = 7, 3
+    rng = np.random.default_rng(1)
+    asyncio.run(store.upsert_chunks(_vector_chunks("doc-1", "Circuits", rng.random((30, 3)).tolist())))
+    asyncio.run(store.upsert_chunks(_vector_chunks("doc-2", "Chemistry", rng.random((30, 3)).tolist())))
+    queries = rng.random((5, 3)).astype(np.float32)
+    mask = store._mask("Chemistry", None, None)
+
+    full = queries @ np.asarray(store._vectors[:60], dtype=np.float32).T
+    full[:, ~mask] = -np.inf
+    expected = [np.argsort(-row)[:4].tolist() for row in full]
+    assert [rows for rows, _ in store._top_k_many(queries, 4, mask)] == expected
+    assert all(store._payloads[r]["subject"] == "Chemistry" for r in expected[0])
@@ -0,0 +1,61 @@
+import asyncio
+import io
+import tempfile
+import threading
+from PyPDF2 import PdfReader, PdfWriter
+from app.utils import pdf_handler
+from app.utils.pdf_handler import PDFHandler, plan_page_ranges, shutdown_pdf_pools
+from benchmarks.common import sample_pdfs
+
+def test_plan_page_ranges_covers_every_page_once():
+    """Ranges are contiguous, capped at max_pages_per_task and sized for workers * tasks_per_worker"""
+    assert plan_page_ranges(0, 4, 2, 32) == []
+    assert plan_page_ranges(10, 2, 2, 32) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    ranges = plan_page_ranges(113, 4, 2, 8)
+    assert all(end - start <= 8 for start, end in ranges)
+    assert [p for start, end in ranges for p in range(start, end)] == list(range(113))
+
+def test_parallel_extraction_matches_sequential_page_order():
+    """The process pool returns the same per-page text, in order, as a single-process read"""
+    reader = PdfReader(sample_pdfs("Quantum Physics - V*")[0])
+    writer = PdfWriter()
+    for page in reader.pages[:6]:
+        writer.add_page(page)
+    buf = io.BytesIO()
+    writer.write(buf)
+    pdf = buf.getvalue()
+
+    handler = PDFHandler(workers=2, tasks_per_worker=2, max_pages_per_task=2, min_parallel_pages=1)
+    try:
+        pages = asyncio.run(handler.read_pages_parallel(pdf))
+    finally:
+        shutdown_pdf_pools()
+    assert len(pages) == 6 and all(pages)
+    assert pages == handler.read_pages(pdf)
+
+    # Download spools: on-disk ones reach the pool by path, in-memory ones as bytes
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as spool:
+        spool.write(pdf)
+        try:
+            assert asyncio.run(handler.read_pages_parallel(spool)) == pages
+        finally:
+            shutdown_pdf_pools()
+    assert handler.read_pages(io.BytesIO(pdf)) == pages
+    assert asyncio.run(PDFHandler(workers=2).read_pages_parallel(b"not a pdf")) == []
+
+def test_pdfs_are_never_parsed_on_the_event_loop_thread(monkeypatch):
+    """Counting pages (and reading small PDFs) happens in a worker thread, not on the loop"""
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    buf = io.BytesIO()
+    writer.write(buf)
+    parsed_on = []
+
+    def reader(stream):
+        parsed_on.append(threading.current_thread())
+        return PdfReader(stream)
+
+    monkeypatch.setattr(pdf_handler, "PdfReader", reader)
+    pages = asyncio.run(PDFHandler(workers=2, min_parallel_pages=8).read_pages_parallel(buf))
+    assert pages == [""]
+    assert len(parsed_on) == 1 and threading.main_thread() not in parsed_on
@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+from qdrant_client.models import (
+    VectorParams, Distance, HnswConfig, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    SparseVectorParams, Modifier
+)
+from app.core.config import settings
+from app.utils import qdrant_client
+from app.utils.qdrant_client import QdrantStore
+from app.utils.sparse_encoder import SPARSE_VECTOR_NAME
+
+class RecordingClient:
+    def __init__(self, info=None):
+        self.info = info
+        self.updates = []
+        self.points = []
+        self.queries = []
+
+    async def get_collection(self, collection_name):
+        return self.info
+
+    async def update_collection(self, collection_name, **changes):
+        self.updates.append(changes)
+
+    async def create_payload_index(self, collection_name, field_name, field_schema):
+        pass
+
+    async def upsert(self, collection_name, points):
+        self.points.extend(points)
+
+    async def query_points(self, collection_name, limit, with_payload, **kwargs):
+        self.queries.append(kwargs)
+        return SimpleNamespace(points=[])
+
+class FakeExecutor:
+    async def embed(self, text):
+        return [1.0, 0.0]
+
+    async def embed_many(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+def _info(on_disk=False, m=16, ef_construct=100, quantization=None, sparse=True):
+    sparse_vectors = {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)} if sparse else None
+    return SimpleNamespace(config=SimpleNamespace(
+        params=SimpleNamespace(
+            vectors=VectorParams(size=384, distance=Distance.COSINE, on_disk=on_disk),
+            sparse_vectors=sparse_vectors,
+        ),
+        hnsw_config=HnswConfig(m=m, ef_construct=ef_construct, full_scan_threshold=10000, on_disk=False),
+        quantization_config=quantization,
+    ))
+
+def _store():
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="test")
+    store.client = RecordingClient()
+    return store
+
+def test_reconcile_is_noop_when_in_sync(monkeypatch):
+    """Matching collections are left alone"""
+    monkeypatch.setattr(settings, "QDRANT_QUANTIZATION", "none")
+    store = _store()
+    asyncio.run(store._reconcile_collection_config(_info()))
+    assert store.client.updates == []
+
+def test_reconcile_applies_only_changed_settings(monkeypatch):
+    """Turning on scalar quantization and on-disk vectors updates just those parts"""
+    monkeypatch.setattr(settings, "QDRANT_QUANTIZATION", "scalar")
+    monkeypatch.setattr(settings, "QDRANT_ON_DISK", True)
+    store = _store()
+    asyncio.run(store._reconcile_collection_config(_info()))
+    assert len(store.client.updates) == 1
+    assert set(store.client.updates[0]) == {"quantization_config", "vectors_config"}
+
+    quantized = ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True))
+    store.client.updates.clear()
+    asyncio.run(store._reconcile_collection_config(_info(on_disk=True, quantization=quantized)))
+    assert store.client.updates == []
+
+def test_search_params_per_request_override(monkeypatch):
+    """Per-call knobs win over settings defaults"""
+    monkeypatch.setattr(settings, "QDRANT_QUANTIZATION", "binary")
+    params = _store()._build_search_params(hnsw_ef=256, oversampling=3.0)
+    assert params.hnsw_ef == 256
+    assert params.quantization.oversampling == 3.0
+    assert params.quantization.rescore is settings.QDRANT_SEARCH_RESCORE
+
+def test_dense_only_collection_is_written_and_searched_dense(monkeypatch):
+    """A collection created before sparse vectors keeps working: dense points, dense search"""
+    monkeypatch.setattr(settings, "QDRANT_QUANTIZATION", "none")
+    monkeypatch.setattr(settings, "QDRANT_SPARSE_ENABLED", True)
+    monkeypatch.setattr(qdrant_client, "_SPARSE_COLLECTIONS", {})
+    monkeypatch.setattr(qdrant_client, "get_embedding_executor", lambda: FakeExecutor())
+    store = _store()
+    store.search_cache = None
+    store.client.info = _info(sparse=False)
+
+    async def run():
+        await store.init_store(vector_size=2)
+        await store.upsert_chunks([{"text": "Teorema de Thevenin", "subject": "Physics", "doc_id": "d1", "chunk_id": 0}], raise_on_error=True)
+        await store.search("Thevenin", mode="hybrid")
+
+    asyncio.run(run())
+    # No attempt to add the sparse vector (Qdrant rejects it on existing collections)
+    assert store.client.updates == []
+    assert store.client.points[0].vector == [1.0, 0.0]
+    assert store.client.queries[0]["query"] == [1.0, 0.0] and "using" not in store.client.queries[0]
+
+    # New collections get the sparse vector and hybrid points
+    monkeypatch.setattr(qdrant_client, "_SPARSE_COLLECTIONS", {})
+    store.client = RecordingClient(_info(sparse=True))
+    asyncio.run(store.upsert_chunks([{"text": "Norton", "subject": "Physics", "doc_id": "d1", "chunk_id": 1}], raise_on_error=True))
+    assert set(store.client.points[0].vector) == {"", SPARSE_VECTOR_NAME}
@@ -0,0 +1,28 @@
+import asyncio
+from app.core import qdrant
+from app.core.qdrant import QdrantClientPool
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+def test_one_client_per_endpoint_closed_on_shutdown(monkeypatch):
+    """Stores on the same endpoint share a client; close() closes every pooled client once"""
+    monkeypatch.setattr(qdrant, "AsyncQdrantClient", FakeClient)
+    pool = QdrantClientPool()
+
+    a = pool.get("http://qdrant:6333", "key")
+    assert pool.get("http://qdrant:6333", "key") is a
+    b = pool.get("http://qdrant:6333", "key", prefer_grpc=True)
+    c = pool.get("http://other:6333")
+    assert len({id(a), id(b), id(c)}) == 3
+    assert b.kwargs["prefer_grpc"] is True
+    assert a.kwargs["limits"].max_keepalive_connections > 0
+
+    asyncio.run(pool.close())
+    assert a.closed and b.closed and c.closed
+    assert pool.clients == {}
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+from app.utils import qdrant_client
+from app.utils.qdrant_client import QdrantStore, chunk_content_hash, chunk_point_id
+
+class FakeExecutor:
+    def __init__(self):
+        self.embedded = []
+
+    async def embed_many(self, texts):
+        self.embedded.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+class FakeQdrant:
+    """Just enough of AsyncQdrantClient for doc-scoped scroll/upsert/delete"""
+    def __init__(self):
+        self.points = {}
+
+    async def scroll(self, collection_name, scroll_filter, limit, offset=None, with_payload=True, with_vectors=False):
+        doc_id = scroll_filter.must[0].match.value
+        ids = [pid for pid, p in self.points.items() if p.payload["doc_id"] == doc_id]
+        return [SimpleNamespace(id=pid) for pid in ids], None
+
+    async def upsert(self, collection_name, points):
+        for p in points:
+            self.points[p.id] = p
+
+    async def delete(self, collection_name, points_selector):
+        for pid in points_selector.points:
+            self.points.pop(pid, None)
+
+def _store(monkeypatch):
+    executor = FakeExecutor()
+    monkeypatch.setattr(qdrant_client, "get_embedding_executor", lambda: executor)
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="test")
+    store.client = FakeQdrant()
+    return store, executor
+
+def _chunks(texts):
+    return [{"text": t, "chunk_id": i, "subject": "Physics", "page": 1} for i, t in enumerate(texts)]
+
+def test_point_ids_are_deterministic():
+    """Same doc/chunk/content gives the same ID; changed content gives a new one"""
+    h = chunk_content_hash("Ley de Ohm")
+    assert chunk_point_id("doc-1", 0, h) == chunk_point_id("doc-1", 0, chunk_content_hash("Ley  de Ohm"))
+    assert chunk_point_id("doc-1", 0, h) != chunk_point_id("doc-1", 0, chunk_content_hash("Ley de Kirchhoff"))
+
+def test_resync_only_touches_changed_chunks(monkeypatch):
+    """Re-ingesting upserts changed chunks, deletes stale ones and never duplicates"""
+    store, executor = _store(monkeypatch)
+    first = asyncio.run(store.sync_document("doc-1", _chunks(["alpha", "beta", "gamma"])))
+    assert first == {"upserted": 3, "unchanged": 0, "deleted": 0}
+
+    executor.embedded.clear()
+    second = asyncio.run(store.sync_document("doc-1", _chunks(["alpha", "BETA"])))
+    assert second == {"upserted": 1, "unchanged": 1, "deleted": 2}
+    assert executor.embedded == ["BETA"]
+    assert sorted(p.payload["text"] for p in store.client.points.values()) == ["BETA", "alpha"]
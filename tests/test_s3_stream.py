@@ -0,0 +1,72 @@
+import hashlib
+import io
+import os
+import pytest
+from app.utils.s3_stream import DownloadAborted, HashingReader, download_to_spool
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+        self.chunk_sizes = []
+        self.closed = False
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            self.chunk_sizes.append(len(self.data[i:i + chunk_size]))
+            yield self.data[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+class FakeS3:
+    def __init__(self, data, content_length=True):
+        self.body = FakeBody(data)
+        self.content_length = content_length
+
+    def get_object(self, Bucket, Key):
+        response = {"Body": self.body}
+        if self.content_length:
+            response["ContentLength"] = len(self.body.data)
+        return response
+
+def test_small_objects_spool_in_memory():
+    s3 = FakeS3(b"%PDF-small")
+    spool = download_to_spool(s3, "bucket", "a.pdf", max_memory_bytes=1024, chunk_bytes=4)
+    assert isinstance(spool, io.BytesIO) and spool.read() == b"%PDF-small"
+    assert s3.body.closed
+
+def test_large_or_unsized_objects_stream_to_disk_in_chunks(tmp_path):
+    """Above the threshold only one chunk is held at a time; closing the spool deletes the file"""
+    data = os.urandom(10_000)
+    for s3 in (FakeS3(data), FakeS3(data[:100], content_length=False)):
+        spool = download_to_spool(s3, "bucket", "big.pdf", max_memory_bytes=1024, chunk_bytes=4096, spool_dir=str(tmp_path))
+        assert os.path.dirname(spool.name) == str(tmp_path)
+        assert spool.read() == s3.body.data
+        assert max(s3.body.chunk_sizes) <= 4096 and s3.body.closed
+        spool.close()
+    assert os.listdir(tmp_path) == []
+
+def test_should_stop_aborts_between_chunks(tmp_path):
+    """A canceled job stops reading after the current chunk and leaves no spool behind"""
+    s3 = FakeS3(os.urandom(10_000))
+    calls = []
+
+    def should_stop():
+        calls.append(1)
+        return len(calls) > 2
+
+    with pytest.raises(DownloadAborted):
+        download_to_spool(s3, "bucket", "big.pdf", max_memory_bytes=0, chunk_bytes=1000, spool_dir=str(tmp_path), should_stop=should_stop)
+    assert len(s3.body.chunk_sizes) == 3 and s3.body.closed
+    assert os.listdir(tmp_path) == []
+
+def test_hashes_are_computed_while_streaming():
+    """Downloads and uploads produce the file's SHA-256 in the same pass, without seeking"""
+    data = os.urandom(5_000)
+    hasher = hashlib.sha256()
+    download_to_spool(FakeS3(data), "bucket", "a.pdf", max_memory_bytes=0, chunk_bytes=512, hasher=hasher).close()
+    reader = HashingReader(io.BytesIO(data))
+    while reader.read(700):
+        pass
+    assert hasher.hexdigest() == reader.hexdigest() == hashlib.sha256(data).hexdigest()
+    assert reader.size == len(data) and not hasattr(reader, "seek")
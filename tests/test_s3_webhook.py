@@ -0,0 +1,175 @@
+import asyncio
+import io
+import json
+from datetime import datetime, timedelta
+from urllib.parse import quote_plus
+import boto3
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from starlette.datastructures import Headers
+from app.core.config import settings
+from app.core.database import get_database
+from app.main import app
+from app.services.document_service import DocumentService
+from app.services.ingestion_batcher import IngestionBatcher
+from app.services.webhook_service import S3WebhookService
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "cetec-test"
+KNOWN_KEY = "fisica/0b7e1c52-8d0e-4a8e-9c7e-2f1d5a7b9c01_apunte.pdf"
+
+def _record(key, sequencer, bucket=BUCKET):
+    return {
+        "eventName": "ObjectCreated:Put",
+        "s3": {"bucket": {"name": bucket},
+               "object": {"key": quote_plus(key, safe="/"), "size": 9, "eTag": "abc", "sequencer": sequencer}},
+    }
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "numpy")
+    monkeypatch.setattr(settings, "NUMPY_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        for key in (KNOWN_KEY, "docentes/fisica/guia 2.pdf", "quimica/tabla.pdf", "fisica/notas.txt"):
+            s3.put_object(Bucket=BUCKET, Key=key, Body=b"%PDF-1.4 ", ContentType="application/pdf")
+        yield s3
+
+def test_notifications_map_keys_dedupe_and_batch_per_subject(env):
+    """Known and new keys become documents, retries are ignored, and each subject gets one job"""
+    db = AsyncMongoMockClient()["test"]
+    batcher = IngestionBatcher(db, debounce_seconds=30, max_wait_seconds=300)
+    service = S3WebhookService(db, s3_client=env, batcher=batcher)
+    first = {"Records": [
+        _record(KNOWN_KEY, "01"),
+        _record("docentes/fisica/guia 2.pdf", "02"),
+        _record("fisica/fantasma.pdf", "03"),  # not in S3
+        _record("fisica/notas.txt", "04"),  # not a PDF
+        _record("quimica/tabla.pdf", "05", bucket="otro-bucket"),
+    ]}
+    # SNS delivery wrapping the next S3 event, plus a retry of the first one
+    second = {"Type": "Notification", "Message": json.dumps({"Records": [_record("quimica/tabla.pdf", "06"), _record(KNOWN_KEY, "01")]})}
+
+    async def run():
+        await db["subjects"].insert_many([{"slug": "fisica"}, {"slug": "quimica"}])
+        await db["documents"].insert_one({"_id": "known", "subject_slug": "fisica", "status": "uploaded",
+                                          "filename": "apunte.pdf", "s3_key": KNOWN_KEY})
+        counts = [await service.handle_notification(first), await service.handle_notification(second),
+                  await service.handle_notification(first)]
+        now = datetime.utcnow()
+        early = await batcher.flush_due(now)
+        jobs = await batcher.flush_due(now + timedelta(seconds=31))
+        return counts, early, jobs, [j async for j in db["ingestion_jobs"].find()], {d["s3_key"]: d async for d in db["documents"].find()}
+
+    counts, early, job_ids, jobs, docs = asyncio.run(run())
+    assert counts == [{"queued": 2, "duplicates": 0, "ignored": 3},
+                      {"queued": 1, "duplicates": 1, "ignored": 0},
+                      {"queued": 0, "duplicates": 4, "ignored": 1}]
+    assert early == [] and len(job_ids) == 2
+    created = docs["docentes/fisica/guia 2.pdf"]
+    assert created["subject_slug"] == "fisica" and created["filename"] == "guia 2.pdf" and created["size"] == 9
+    by_subject = {j["subject_slug"]: j for j in jobs}
+    assert sorted(by_subject["fisica"]["request"]["doc_ids"]) == sorted(["known", created["_id"]])
+    assert by_subject["quimica"]["request"]["doc_ids"] == [docs["quimica/tabla.pdf"]["_id"]]
+    assert all(j["request"]["mode"] == "selected" and j["created_by"] == "s3-webhook" for j in jobs)
+    assert by_subject["fisica"]["docs_total"] == 2
+
+def test_notification_makes_a_failed_document_pending_again(env):
+    """A presigned upload whose ingestion failed before the object existed is ingested once it arrives"""
+    db = AsyncMongoMockClient()["test"]
+    batcher = IngestionBatcher(db, debounce_seconds=30, max_wait_seconds=300)
+    service = S3WebhookService(db, s3_client=env, batcher=batcher)
+
+    async def run():
+        await db["subjects"].insert_one({"slug": "fisica"})
+        await db["documents"].insert_one({"_id": "known", "subject_slug": "fisica", "status": "failed", "size": 1,
+                                          "sha256": "old", "filename": "apunte.pdf", "s3_key": KNOWN_KEY})
+        counts = await service.handle_notification({"Records": [_record(KNOWN_KEY, "01")]})
+        await batcher.flush_due(datetime.utcnow() + timedelta(seconds=31))
+        return counts, await db["documents"].find_one({"_id": "known"}), await db["ingestion_jobs"].find_one()
+
+    counts, doc, job = asyncio.run(run())
+    assert counts["queued"] == 1
+    assert doc["status"] == "uploaded" and doc["size"] == 9 and "sha256" not in doc
+    assert job["request"]["doc_ids"] == ["known"] and job["docs_total"] == 1
+
+def test_direct_upload_records_the_document_before_the_object_exists(env):
+    """The notification for a direct upload maps to its record instead of creating a second document"""
+    db = AsyncMongoMockClient()["test"]
+    documents = DocumentService(db)
+    webhook = S3WebhookService(db, s3_client=env, batcher=IngestionBatcher(db))
+    calls = []
+
+    class RecordingS3:
+        def upload_fileobj(self, reader, bucket, key, **kwargs):
+            calls.append(("upload", key))
+            return env.upload_fileobj(reader, bucket, key, **kwargs)
+
+    class RecordingDocuments:
+        def __getattr__(self, name):
+            return getattr(db["documents"], name)
+
+        async def insert_one(self, record):
+            calls.append(("insert", record["s3_key"]))
+            return await db["documents"].insert_one(record)
+
+    documents.s3_client = RecordingS3()
+    documents.collection = RecordingDocuments()
+
+    async def run():
+        await db["subjects"].insert_one({"slug": "fisica"})
+        file = UploadFile(io.BytesIO(b"%PDF-1.4 directo"), filename="guia.pdf",
+                          headers=Headers({"content-type": "application/pdf"}))
+        document = await documents.upload_document_direct("fisica", file, type("U", (), {"id": "teacher"})())
+        counts = await webhook.handle_notification({"Records": [_record(document.s3_key, "01")]})
+        return document, counts, [d async for d in db["documents"].find()]
+
+    document, counts, docs = asyncio.run(run())
+    assert [c[0] for c in calls] == ["insert", "upload"]
+    assert counts["queued"] == 1
+    assert [d["_id"] for d in docs] == [document.id]
+    assert docs[0]["sha256"] == document.sha256 and docs[0]["size"] == len(b"%PDF-1.4 directo")
+
+def test_batches_flush_after_quiet_period_or_max_wait():
+    """Steady uploads keep extending the window, but never past max_wait"""
+    db = AsyncMongoMockClient()["test"]
+    batcher = IngestionBatcher(db, debounce_seconds=30, max_wait_seconds=60)
+    started = []
+
+    async def start_job(batch):
+        started.append((batch["_id"], sorted(batch["doc_ids"])))
+        return batch["_id"]
+
+    batcher._start_job = start_job
+    t0 = datetime.utcnow()
+
+    async def run():
+        flushed = []
+        for i in range(5):  # one upload every 20 s
+            now = t0 + timedelta(seconds=20 * i)
+            await batcher.add("fisica", sorted({f"doc-{i}", "doc-0"}), now=now)
+            flushed.append(await batcher.flush_due(now + timedelta(seconds=10)))
+        return flushed
+
+    flushed = asyncio.run(run())
+    assert flushed == [[], [], [], ["fisica"], []]
+    assert started == [("fisica", ["doc-0", "doc-1", "doc-2", "doc-3"])]
+
+def test_webhook_token_is_required_when_configured(monkeypatch):
+    monkeypatch.setattr(settings, "S3_WEBHOOK_TOKEN", "s3cret")
+    app.dependency_overrides[get_database] = lambda: AsyncMongoMockClient()["test"]
+    try:
+        client = TestClient(app)
+        assert client.post("/api/v1/webhooks/s3?token=nope", json={"Records": []}).status_code == 401
+        assert client.post("/api/v1/webhooks/s3", json={"Records": []},
+                           headers={"X-Webhook-Token": "s3cret"}).status_code == 204
+    finally:
+        app.dependency_overrides.pop(get_database, None)
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+from mongomock_motor import AsyncMongoMockClient
+from app.utils import qdrant_client
+from app.utils.qdrant_client import QdrantStore
+from app.utils.search_cache import SearchCache
+
+class FakeExecutor:
+    async def embed(self, text):
+        return [1.0, 0.0]
+
+    async def embed_many(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+class FakeQdrant:
+    def __init__(self):
+        self.queries = 0
+
+    async def query_points(self, collection_name, query, query_filter, limit, search_params, with_payload):
+        self.queries += 1
+        payload = {"subject": "Physics", "doc_id": "doc-1", "text": "Thevenin"}
+        return SimpleNamespace(points=[SimpleNamespace(id="p1", score=0.9, payload=payload)])
+
+    async def upsert(self, collection_name, points):
+        pass
+
+def test_lru_and_ttl_eviction():
+    """Oldest entries are evicted past capacity and expired entries are not served"""
+    cache = SearchCache(max_entries=2, ttl_seconds=60)
+    for q in ("a", "b", "c"):
+        cache.put(cache.make_key(q), None, [{"q": q}])
+    assert cache.get(cache.make_key("a"), None) is None
+    assert cache.get(cache.make_key("c"), None) == [{"q": "c"}]
+    assert cache.evictions == 1
+
+    expired = SearchCache(ttl_seconds=-1)
+    expired.put(expired.make_key("a"), None, [])
+    assert expired.get(expired.make_key("a"), None) is None
+
+def test_subject_generation_invalidation():
+    """Writes to one subject invalidate it and unfiltered searches, not other subjects"""
+    cache = SearchCache()
+    key_p, key_c, key_all = cache.make_key("q", s="P"), cache.make_key("q", s="C"), cache.make_key("q")
+    cache.put(key_p, "Physics", [{}])
+    cache.put(key_c, "Chemistry", [{}])
+    cache.put(key_all, None, [{}])
+    cache.invalidate("Physics")
+    assert cache.get(key_p, "Physics") is None
+    assert cache.get(key_all, None) is None
+    assert cache.get(key_c, "Chemistry") == [{}]
+    assert cache.invalidations == 2
+
+def test_shared_generations_see_writes_from_other_processes():
+    """A write published by another process (worker, replica) invalidates this cache"""
+    shared = AsyncMongoMockClient()["test"]["search_generations"]
+    api, worker = SearchCache(), SearchCache()
+    api.share_generations(shared)
+    worker.share_generations(shared)
+    key_p, key_c = api.make_key("q", s="P"), api.make_key("q", s="C")
+
+    async def lookup(key, subject):
+        await api.refresh(subject)
+        return api.get(key, subject)
+
+    async def run():
+        for key, subject in ((key_p, "Physics"), (key_c, "Chemistry")):
+            await api.refresh(subject)
+            api.put(key, subject, [{}])
+        before = await lookup(key_p, "Physics")
+        await worker.publish_invalidation({"Physics"})
+        return before, await lookup(key_p, "Physics"), await lookup(key_c, "Chemistry")
+
+    before, physics, chemistry = asyncio.run(run())
+    assert before == [{}] and physics is None and chemistry == [{}]
+
+def test_store_serves_cached_results_until_upsert(monkeypatch):
+    """Repeated searches hit the cache; an upsert for the subject forces a fresh search"""
+    monkeypatch.setattr(qdrant_client, "get_embedding_executor", lambda: FakeExecutor())
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="test", search_cache=SearchCache())
+    store.client = FakeQdrant()
+
+    async def run():
+        first = await store.search("  Thevenin ", subject="Physics")
+        second = await store.search("thevenin", subject="Physics")
+        await store.upsert_chunks([{"text": "new", "subject": "Physics", "doc_id": "doc-2", "chunk_id": 0}])
+        third = await store.search("thevenin", subject="Physics")
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == second == third
+    assert store.client.queries == 2
+    assert store.search_cache.hits == 1
@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+from app.utils import qdrant_client
+from app.utils.qdrant_client import QdrantStore
+from app.utils.search_cache import SearchCache
+
+class FakeExecutor:
+    def __init__(self):
+        self.calls = []
+
+    async def embed(self, text):
+        raise AssertionError("search_many must embed in one batch")
+
+    async def embed_many(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.0] for t in texts]
+
+class FakeQdrant:
+    def __init__(self):
+        self.batches = []
+
+    async def query_batch_points(self, collection_name, requests):
+        self.batches.append(requests)
+        responses = []
+        for r in requests:
+            label = r.query[0] if isinstance(r.query, list) else r.using
+            payload = {"subject": "Physics", "doc_id": "doc-1", "text": str(label)}
+            responses.append(SimpleNamespace(points=[SimpleNamespace(id=f"p-{label}", score=0.5, payload=payload)]))
+        return responses
+
+def _store(monkeypatch):
+    executor = FakeExecutor()
+    monkeypatch.setattr(qdrant_client, "get_embedding_executor", lambda: executor)
+    monkeypatch.setattr(qdrant_client, "_SPARSE_COLLECTIONS", {("http://localhost:6333", "test"): True})
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="test", search_cache=SearchCache())
+    store.client = FakeQdrant()
+    return store, executor
+
+def test_results_are_aligned_with_one_embed_and_one_request(monkeypatch):
+    """All queries share one embedding call and one query_batch_points round trip"""
+    store, executor = _store(monkeypatch)
+    results = asyncio.run(store.search_many(["ab", "abcd", "a"], subject="Physics", mode="dense"))
+
+    assert [r[0]["text"] for r in results] == ["2.0", "4.0", "1.0"]
+    assert set(results[0][0]) == {"score", "subject", "topics", "s3_uri", "doc_id", "page", "page_end", "chunk_id", "title", "text", "point_id"}
+    assert executor.calls == [["ab", "abcd", "a"]]
+    assert len(store.client.batches) == 1
+    assert all(r.filter.must[0].match.value == "Physics" for r in store.client.batches[0])
+
+def test_cached_and_sparse_queries_skip_the_model(monkeypatch):
+    """Cached queries are not re-sent; sparse-mode queries are never embedded"""
+    store, executor = _store(monkeypatch)
+
+    async def run():
+        await store.search_many(["ab"], mode="dense")
+        return await store.search_many(["ab", "abc"], mode="dense"), await store.search_many(["ohm"], mode="sparse")
+
+    dense, sparse = asyncio.run(run())
+    assert [r[0]["text"] for r in dense] == ["2.0", "3.0"]
+    assert executor.calls == [["ab"], ["abc"]]
+    assert sparse[0][0]["text"] == "text-bm25"
+    assert store.search_cache.hits == 1
+
+def test_batches_are_split_by_batch_size(monkeypatch):
+    """Large query sets are sent in batch_size chunks, still returned in input order"""
+    store, _ = _store(monkeypatch)
+    queries = ["x" * n for n in range(1, 6)]
+    results = asyncio.run(store.search_many(queries, mode="dense", batch_size=2))
+    assert [len(b) for b in store.client.batches] == [2, 2, 1]
+    assert [r[0]["text"] for r in results] == [f"{n}.0" for n in range(1, 6)]
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+from app.core.config import settings
+from app.utils import qdrant_client
+from app.utils.qdrant_client import QdrantStore
+from app.utils.sparse_encoder import SPARSE_VECTOR_NAME, SparseEncoder, looks_like_keyword_query, token_index, tokenize
+
+class ExplodingExecutor:
+    async def embed(self, text):
+        raise AssertionError("sparse search must not call the embedding model")
+
+class RecordingQdrant:
+    def __init__(self):
+        self.calls = []
+
+    async def query_points(self, collection_name, limit, with_payload, **kwargs):
+        self.calls.append(kwargs)
+        payload = {"subject": "Physics", "text": "Teorema de Thevenin"}
+        return SimpleNamespace(points=[SimpleNamespace(id="p1", score=3.2, payload=payload)])
+
+def test_tokenize_folds_accents_and_drops_stopwords():
+    """Lexical matching is accent and case insensitive"""
+    assert tokenize("La ecuación de Schrödinger") == ["ecuacion", "schrodinger"]
+
+def test_document_weights_saturate():
+    """Repeated terms gain weight sub-linearly (BM25 tf saturation)"""
+    encoder = SparseEncoder()
+    vec = encoder.encode_document("thevenin thevenin thevenin norton")
+    weights = dict(zip(vec.indices, vec.values))
+    assert weights[token_index("norton")] < weights[token_index("thevenin")] < 3 * weights[token_index("norton")]
+
+def test_keyword_query_detection():
+    assert looks_like_keyword_query("Thevenin")
+    assert looks_like_keyword_query("ecuación de Schrödinger")
+    assert not looks_like_keyword_query("¿Cómo se calcula el equivalente de Thevenin?")
+
+def test_sparse_mode_skips_embedding_model(monkeypatch):
+    """Sparse-only search queries the named sparse vector without embedding the query"""
+    monkeypatch.setattr(settings, "QDRANT_SPARSE_ENABLED", True)
+    monkeypatch.setattr(qdrant_client, "get_embedding_executor", lambda: ExplodingExecutor())
+    monkeypatch.setattr(qdrant_client, "_SPARSE_COLLECTIONS", {("http://localhost:6333", "test"): True})
+    store = QdrantStore(url="http://localhost:6333", api_key="", collection_name="test")
+    store.search_cache = None
+    store.client = RecordingQdrant()
+
+    results = asyncio.run(store.search("Thevenin", mode="auto"))
+
+    assert results[0]["text"] == "Teorema de Thevenin"
+    assert store.client.calls[0]["using"] == SPARSE_VECTOR_NAME